@@ -0,0 +1,140 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: benchmark_genetic_backends.py
+# Description:  Measures the genetic simulation backends of Netlist_Parser
+#               ("numpy" and "numba") on random circuits of NOT and NOR gates
+#               of increasing size - one parameter set per call, as in a 
+#               simulated annealing move (run_circuit_genetic_vectorized), and
+#               a population of candidates per call (score_population).
+#               Times are the best of several runs, with the first call (Numba
+#               compilation) excluded.
+# Status:   Standalone script, run with: python benchmark_genetic_backends.py
+# ------------------------------------------------------------------------------
+
+# Imports
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+import record as rec
+from circuit_netlist_parser import Netlist_Parser, GENETIC_BACKENDS
+
+# Circuits to measure - (inputs, gates)
+CIRCUIT_SIZES = [(2, 4), (3, 8), (4, 12), (3, 50), (6, 20), (8, 30), (10, 40)]
+
+# Number of candidates scored per score_population call
+POPULATION_SIZE = 64
+
+'''
+Function:       make_circuit
+Args:           num_inputs: Number of primary inputs
+                num_gates: Number of NOT/NOR gates
+                backend: Genetic backend of the parser
+                netlist_path: Where to write the netlist JSON
+Return:         Netlist_Parser of the circuit, populated and logically
+                simulated
+Description:    Each gate is driven by earlier nodes picked at random, and the
+                last gate drives the output.  The parameters are drawn from the
+                ranges of the gates in the Cello chassis files.
+'''
+def make_circuit(num_inputs, num_gates, backend, netlist_path):
+
+    rng = random.Random(num_inputs * 1000 + num_gates)
+    nodes = []
+    edges = []
+    input_records = {}
+    gate_records = {}
+
+    available = []
+    for i in range(num_inputs):
+        nodes.append({"name": "in%d" % i, "nodeType": "PRIMARY_INPUT", "deviceName": "Sensor%d" % i})
+        available.append("in%d" % i)
+        input_records["Sensor%d" % i] = rec.Input_Signal_Record()
+        input_records["Sensor%d" % i].ymax = rng.uniform(1, 4)
+        input_records["Sensor%d" % i].ymin = rng.uniform(0.002, 0.05)
+
+    for g in range(num_gates):
+        tag = "$%d" % g
+        node_type = "NOT" if rng.random() < 0.3 else "NOR"
+        nodes.append({"name": tag, "nodeType": node_type, "deviceName": "G%d_Repressor" % g})
+        for source in rng.sample(available, 1 if node_type == "NOT" else 2):
+            edges.append({"name": "e", "src": source, "dst": tag})
+        available.append(tag)
+
+        gate_record = rec.Repressor_Record()
+        gate_record.ymax = rng.uniform(1, 4)
+        gate_record.ymin = rng.uniform(0.005, 0.1)
+        gate_record.K = rng.uniform(0.05, 0.5)
+        gate_record.n = rng.uniform(1.5, 4)
+        gate_records["G%d_Repressor" % g] = gate_record
+
+    nodes.append({"name": "out", "nodeType": "PRIMARY_OUTPUT", "deviceName": "YFP_reporter"})
+    edges.append({"name": "e", "src": available[-1], "dst": "out"})
+    output_records = {"YFP_reporter": rec.Output_Signal_Record()}
+    output_records["YFP_reporter"].unit_conversion = 1.0
+
+    with open(netlist_path, "w") as netlist_file:
+        json.dump({"name": "benchmark", "nodes": nodes, "edges": edges}, netlist_file)
+
+    parser = Netlist_Parser(netlist_path, backend = backend)
+    parser.parse_netlist()
+    parser.populate_input_values(input_records)
+    parser.populate_response_functions(gate_records)
+    parser.populate_output_converters(output_records)
+    parser.run_circuit_logical()
+
+    return parser
+
+'''
+Function:       time_call
+Args:           func: Function to time
+                repeats: Number of timed batches
+Return:         Best time of a single call, in seconds
+Description:    Each batch calls the function enough times to last about 20 ms,
+                so that the timer resolution does not matter for fast calls.
+'''
+def time_call(func, repeats = 7):
+
+    func()
+    start_time = time.perf_counter()
+    func()
+    calls = max(1, int(0.02 / max(time.perf_counter() - start_time, 1e-7)))
+
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, (time.perf_counter() - start_time) / calls)
+    return best
+
+def main():
+
+    backends = sys.argv[1:] if len(sys.argv) > 1 else list(GENETIC_BACKENDS)
+    print("Times in us per call - single: one parameter set, population: %d candidates" % POPULATION_SIZE)
+    print("%6s %6s " % ("INPUTS", "GATES") + " ".join("%21s" % backend.upper() for backend in backends))
+
+    with tempfile.TemporaryDirectory() as netlist_dir:
+        for num_inputs, num_gates in CIRCUIT_SIZES:
+
+            netlist_path = os.path.join(netlist_dir, "netlist_%d_%d.json" % (num_inputs, num_gates))
+            columns = []
+            for backend in backends:
+                parser = make_circuit(num_inputs, num_gates, backend, netlist_path)
+                base_params = parser.get_gate_parameters()
+                gate_params = base_params * np.random.default_rng(0).uniform(0.5, 2.0, (POPULATION_SIZE,) + base_params.shape)
+
+                single_time = time_call(parser.run_circuit_genetic_vectorized)
+                population_time = time_call(lambda: parser.score_population(gate_params))
+                columns.append("%9.1f / %9.1f" % (single_time * 1e6, population_time * 1e6))
+
+            print("%6d %6d " % (num_inputs, num_gates) + " ".join("%21s" % column for column in columns))
+
+if __name__ == '__main__':
+    main()
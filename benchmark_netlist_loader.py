@@ -0,0 +1,87 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: benchmark_netlist_loader.py
+# Description:  Measures the time needed to load a Cello _outputNetlist.json
+#               for netlists of increasing size, comparing the repaired JSON
+#               path of _fix_input_json against the old YAML-only parse.  The
+#               netlists are synthetic, but formatted the way Cello writes them
+#               (tab-indented, with a final trailing comma).
+# Status:   Standalone script, run with: python benchmark_netlist_loader.py
+# ------------------------------------------------------------------------------
+
+# Imports
+import json
+import os
+import tempfile
+import time
+import yaml
+from circuit_netlist_parser import _fix_input_json
+
+'''
+Function:       make_netlist_text
+Args:           num_gates: Number of NOR gates in the synthetic netlist
+Return:         Text of the netlist, in the format produced by Cello
+Description:    Builds a chain of NOR gates, each fed by the previous gate and
+                one of two primary inputs, ending in a single output.
+'''
+def make_netlist_text(num_gates):
+
+    nodes = [{"name": "a", "nodeType": "PRIMARY_INPUT", "deviceName": "LacI_sensor", "partitionID": -1},
+             {"name": "b", "nodeType": "PRIMARY_INPUT", "deviceName": "TetR_sensor", "partitionID": -1}]
+    edges = []
+    previous = "a"
+
+    for i in range(num_gates):
+        tag = "$%d" % i
+        nodes.append({"name": tag, "nodeType": "NOR", "deviceName": "S%d_SrpR" % i, "partitionID": -1})
+        edges.append({"name": "$e%da" % i, "src": previous, "dst": tag})
+        edges.append({"name": "$e%db" % i, "src": "b", "dst": tag})
+        previous = tag
+
+    nodes.append({"name": "y", "nodeType": "PRIMARY_OUTPUT", "deviceName": "YFP_reporter", "partitionID": -1})
+    edges.append({"name": "$ey", "src": previous, "dst": "y"})
+
+    return json.dumps({"name": "benchmark", "inputFilename": "", "nodes": nodes, "edges": edges}, indent = "\t") + ",\n"
+
+'''
+Function:       time_call
+Args:           func: Function to time
+                repeats: Number of calls
+Return:         Best time of a single call, in seconds
+'''
+def time_call(func, repeats):
+
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+def main():
+
+    print("%8s %10s %12s %12s %9s" % ("GATES", "SIZE (KB)", "JSON (ms)", "YAML (ms)", "SPEEDUP"))
+
+    for num_gates in [10, 100, 1000, 5000]:
+
+        text = make_netlist_text(num_gates)
+        with tempfile.NamedTemporaryFile("w", suffix = ".json", delete = False) as netlist_file:
+            netlist_file.write(text)
+            netlist_path = netlist_file.name
+
+        # The old loader - same clean up, then YAML
+        yaml_text = text.replace("\t", "")
+        yaml_text = yaml_text[:yaml_text.rfind(",")]
+
+        repeats = 5 if num_gates < 1000 else 1
+        json_time = time_call(lambda: _fix_input_json(netlist_path, final_trailing_comma = True), repeats)
+        yaml_time = time_call(lambda: yaml.load(yaml_text, Loader = yaml.FullLoader), repeats)
+        os.remove(netlist_path)
+
+        print("%8d %10.1f %12.3f %12.3f %8.0fx" % (num_gates, len(text) / 1024, json_time * 1e3, yaml_time * 1e3, yaml_time / json_time))
+
+if __name__ == '__main__':
+    main()
@@ -24,10 +24,6 @@
 import tkinter as tk
 import tkinter.filedialog
 from tkinter import ttk
-import copy
-import time
-import numpy as np
-from circuit_netlist_parser import Netlist_Parser
 from itertools import combinations
 from util import parse_verilog
 from shutil import copyfile
@@ -35,8 +31,9 @@ import os
 
 # This is our custom module for parsing JSONs related to Cello
 from input_processor import Input_Processor
-from record import Repressor_Record
-from celloapi2 import CelloQuery, CelloResult
+from celloapi2 import CelloQuery
+from cello_sweep import sweep_signal_sets, make_default_settings, DEFAULT_PIPELINE_DEPTH
+from cello_result_cache import Cello_Result_Cache, Annealing_Result_Cache
 
 class CelloGUI(tk.Frame):
 
@@ -64,6 +61,9 @@ class CelloGUI(tk.Frame):
 
             self.IN_DIR = self.work_dir + "cello_in\\"
             self.OUT_DIR = self.work_dir + "cello_out\\"
+            self.CACHE_DIR = self.work_dir + "netlist_cache\\"
+            self.CELLO_CACHE_DIR = self.work_dir + "cello_cache\\"
+            self.ANNEALING_CACHE_DIR = self.work_dir + "annealing_cache\\"
 
             self.folder_entry.delete(0, tk.END)
             self.folder_entry.insert(0, self.input_folder_path)
@@ -122,6 +122,9 @@ class CelloGUI(tk.Frame):
         self.workdir_entry.insert(0, self.work_dir)
         self.IN_DIR = self.work_dir + "\\cello_in\\"
         self.OUT_DIR = self.work_dir + "\\cello_out\\"
+        self.CACHE_DIR = self.work_dir + "\\netlist_cache\\"
+        self.CELLO_CACHE_DIR = self.work_dir + "\\cello_cache\\"
+        self.ANNEALING_CACHE_DIR = self.work_dir + "\\annealing_cache\\"
 
     def parse_files(self):
         self.file_processor = Input_Processor(input_folder_path = self.input_path, chassis_name = self.chassis, 
@@ -256,181 +259,30 @@ class CelloGUI(tk.Frame):
         print("SIGNALS: " + str(signals))
         print("SIGNAL PAIRING: " + str(signal_pairing))
 
-        self.best_cello_score = 0
-        self.best_cello_design = None
-        self.best_cello_inputs = None
-
-        self.best_annealing_score = 0
-        self.best_annealing_design = None
-        self.best_annealing_inputs = None
-
         num_signal_combinations = len(signal_pairing)
         local_progress = 0
 
-        for signal_set in signal_pairing:
-            signal_set = list(signal_set)
-
-            q.set_input_signals(signal_set)
-
-            q.get_results()
-
-            try:
-                # Get results of the Cello query (most important: Scoring and Netlist)
-                res = CelloResult(results_dir = self.OUT_DIR)
-
-                cello_circuit = res.part_names
-                cello_score = res.circuit_score
-
-                local_progress += int(100 / num_signal_combinations)
-                self.cello_progress_num.set(local_progress)
-                self.update_idletasks()
-
-                # Select the output netlist
-                circuit_netlist_json = self.OUT_DIR + verilog_name.replace(".v", "") + "_outputNetlist.json"
-               
-                # Create the parser module
-                netlist_parser = Netlist_Parser(circuit_netlist_json)
-
-                # Cleanup the netlist JSON (Not needed if the _outputNetlist.json file is correctly formatted)
-                netlist_parser.parse_netlist(cleanup = True)
-
-                # Populate the reconstructed circuit with the parameters from the input JSONs (input, UCF, output)
-                netlist_parser.populate_input_values(self.file_processor.input_records)
-                netlist_parser.populate_response_functions(self.file_processor.gate_records)
-                netlist_parser.populate_output_converters(self.file_processor.output_records)
-        
-                # Now run the logic generator and the genetic generator - first assume it is digital circuit,
-                # compute what the outputs should be.  Next run it like actual genetic circuit using response 
-                # functions for each gate.
-                netlist_parser.run_circuit_logical()
-                netlist_parser.run_circuit_genetic()
-        
-                # Calculate the score
-                netlist_parser.calculate_score()
-                netlist_parser.print_genetric_truth_table()
-                netlist_score = netlist_parser.circuit_score
-                #print("NETLIST SCORE = %lf" % netlist_score)
-
-                # Step 5: begin the simulated annealing on the gates in the circuit
-
-                # Set the starting temperature to 20% of the starting score
-                if opt_flag:
-                    temperature = 0.20 * netlist_score
-                    count = 0
-                    num_iterations = 1000
-                    
-                    best_gates = {}
-
-                    # Copy the records to a working space
-                    scratch_records = {}
-                    original_records = {}
-
-                    for node in netlist_parser.gates:
-                        new_record = Repressor_Record()
-                        new_record.name = node.name
-                        new_record.populate_params(ymax = node.resfunc.ymax, ymin = node.resfunc.ymin, K = node.resfunc.K, n = node.resfunc.n)
-                        scratch_records[new_record.name] = new_record
-
-                    original_records = copy.deepcopy(scratch_records)
-
-                    # Begin the simulated annealing
-                    for it in range(0, num_iterations):
-
-                        # Every 10% of iterations, reduce the temperature in half, 
-                        # reducing the probability of selecting new input parameters
-                        if it > 0 and count % (num_iterations / 10) == 0:
-                            temperature /= 2
-
-                        # For each gate in the circuit
-
-                        pre_modified_records = copy.deepcopy(scratch_records)
-                        valid_state_generated_list = []
-
-                        # Randomly generate a new "input vector" by modifying each of the gates in the circuit
-                        for gate in netlist_parser.gates:
-                            
-                            current_name = gate.name
-                            current_record = scratch_records[current_name]
-                            
-                            # Attempt to generate the input vector - will retry up to the specified number of times before moving on
-                            current_state_valid_flag = current_record.modify_repressor(num_retries = 10)
-                            valid_state_generated_list.append(current_state_valid_flag)
-
-                        num_valid = 0
-                        for entry in valid_state_generated_list:
-                            if entry:
-                                num_valid += 1
-
-                        # If all input vectors are valid
-                        if num_valid == len(scratch_records):
-
-                            # Repopulate the circuit with the new function parameters
-                            netlist_parser.populate_response_functions(scratch_records)
-
-                            # Rerun the circuit at the genetic level
-                            netlist_parser.run_circuit_genetic()
-
-                            # Calculate the updated score
-                            netlist_parser.calculate_score()
-                            updated_netlist_score = netlist_parser.circuit_score
-
-                            # Make sure that the values are physically meaningful...
-                            # not sure what exactly this means, but OFF_MAX ~ 1e-10 and ON_MIN ~ 1e5 does NOT seem realistic...
-                            # So just check to see if OFF_MAX and ON_MIN are in reasonable values before accepting the change.  Otherwise
-                            # We will reject automatically.
-
-                            ON_MIN_UPPER_BOUND = 5
-                            OFF_MAX_LOWER_BOUND = 1e-3
-
-                            # If within the range, then we can evaluate the change using simulated annealing algorithm
-                            if netlist_parser.ON_MIN < ON_MIN_UPPER_BOUND and netlist_parser.OFF_MAX > OFF_MAX_LOWER_BOUND:
-
-                                # If the updated score was an improvement, accepted the parameter change
-                                if updated_netlist_score > netlist_score:
-                                    netlist_score = updated_netlist_score
-                                    best_gates = copy.deepcopy(scratch_records)
-
-                                # Else we will accept with certain probability
-                                else:
-                                    cost_diff = netlist_score - updated_netlist_score
-                                    accept_prob = np.random.uniform(low = 0.0, high = 1.0)
-                            
-                                    if np.exp(-1 * cost_diff / temperature) > accept_prob:
-                                        netlist_score = updated_netlist_score
-                                    # Else we need to undo the changes to the scratch records
-                                    else:
-                                        best_gates = copy.deepcopy(scratch_records)
-                                        scratch_records = copy.deepcopy(pre_modified_records)
-                                        netlist_parser.populate_response_functions(scratch_records)
-                                        netlist_parser.run_circuit_genetic()
-                                        netlist_parser.calculate_score()
-                                count += 1
-                            # Else undo the changes to the scratch records because the changes were not physically meaningful
-                            else:
-                                scratch_records = copy.deepcopy(pre_modified_records)
-                                netlist_parser.populate_response_functions(scratch_records)
-                                netlist_parser.run_circuit_genetic()
-                                netlist_parser.calculate_score()
-                        # Else undo the changes to the scratch records because the changes were not physically meaningful
-                        else:
-                            scratch_records = copy.deepcopy(pre_modified_records)
-                            netlist_parser.populate_response_functions(scratch_records)
-                            netlist_parser.run_circuit_genetic()
-                            netlist_parser.calculate_score()
-
-                if cello_score > self.best_cello_score:
-                    self.best_cello_score = cello_score
-                    self.best_cello_inputs = signal_set
-                    self.best_cello_design = cello_circuit
-
-                if netlist_score > self.best_annealing_score:
-                    self.best_annealing_score = netlist_score
-                    self.best_annealing_inputs = signal_set
-                    self.best_annealing_design = best_gates
-
-            except:
-                pass
-            q.reset_input_signals()
+        # Advance the progress bar as each signal set finishes
+        def update_progress(index, result):
+            nonlocal local_progress
+            local_progress += int(100 / num_signal_combinations)
+            self.cello_progress_num.set(local_progress)
+            self.update_idletasks()
+
+        # Run Cello, the netlist scoring and (if selected) the simulated 
+        # annealing for every signal set, with the same settings as main.py
+        settings = make_default_settings(num_iterations = 1000 if opt_flag else 0)
+        summary, _ = sweep_signal_sets(self.file_processor, verilog_name, signal_pairing, self.IN_DIR, self.OUT_DIR, self.CACHE_DIR, 
+                                        settings = settings, on_result = update_progress, annealing_cache = Annealing_Result_Cache(self.ANNEALING_CACHE_DIR), 
+                                        result_cache = Cello_Result_Cache(self.CELLO_CACHE_DIR), pipeline_depth = DEFAULT_PIPELINE_DEPTH)
+
+        self.best_cello_score = summary.best_cello_score
+        self.best_cello_design = summary.best_cello_design
+        self.best_cello_inputs = summary.best_cello_inputs
+
+        self.best_annealing_score = summary.best_annealing_score
+        self.best_annealing_design = summary.best_annealing_design
+        self.best_annealing_inputs = summary.best_annealing_inputs
                         
     def print_opt_results(self):
         
@@ -0,0 +1,299 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: cello_result_cache.py
+# Description:  On-disk store of Cello query results, so that re-running the
+#               optimizer (or resuming an interrupted sweep) does not run the
+#               same Cello query twice.  An entry is keyed by the SHA-256 hash
+#               of everything the query depends on - the contents of the
+#               Verilog file, the UCF, input and output JSONs and the options
+#               file, plus the chosen signal set - and holds the Cello score,
+#               the part names and the output netlist JSON.  Entries are
+#               single JSON files, evicted least recently used first once the
+#               store grows past its size limit.  Annealing_Result_Cache does
+#               the same for the annealing of the netlists Cello produces.
+# Status:   Operational.  Safe to share between the worker processes of a
+#           parallel sweep: entries are written under a temporary name and
+#           renamed into place.
+# ------------------------------------------------------------------------------
+
+# Imports
+import hashlib
+import json
+import os
+from record import Repressor_Record
+
+# Versions of the entry formats - part of the keys, so entries written by an
+# older layout are simply never looked up again
+CELLO_CACHE_VERSION = 1
+ANNEALING_CACHE_VERSION = 1
+
+'''
+Class:          Cached_Cello_Result
+Description:    Cello result loaded from the store.  Has the same score and
+                part name attributes as celloapi2.CelloResult.
+'''
+class Cached_Cello_Result():
+
+    def __init__(self, circuit_score, part_names):
+        self.circuit_score = circuit_score  # Score of the Cello design
+        self.part_names = part_names        # Parts used in the Cello design
+
+'''
+Class:          Cello_Result_Cache
+Description:    Size-bounded, least recently used store of Cello results.
+'''
+class Cello_Result_Cache():
+
+    def __init__(self, cache_dir, max_bytes = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir          # Folder holding the entries
+        self.max_bytes = max_bytes          # Total size of the entries kept
+                                            # before the oldest are evicted
+        self.hits = 0                       # Number of queries served from
+        self.misses = 0                     # the store, and not
+
+    '''
+    Function:       get_key
+    Args:           in_dir: Folder with the Cello input files
+                    input_filenames: Names of the Verilog file, options file,
+                                     and UCF, input and output JSONs
+                    signal_set: List of input signals for Cello
+    Return:         Key of the query (hex string)
+    '''
+    def get_key(self, in_dir, input_filenames, signal_set):
+
+        digest = hashlib.sha256(b"cello-cache-v%d\n" % CELLO_CACHE_VERSION)
+
+        # Hash each file with its length first, so the boundary between two
+        # files cannot shift without changing the key
+        for filename in input_filenames:
+            with open(in_dir + filename, "rb") as input_file:
+                contents = input_file.read()
+            digest.update(b"%d\n" % len(contents))
+            digest.update(contents)
+
+        digest.update(json.dumps(list(signal_set)).encode())
+
+        return digest.hexdigest()
+
+    '''
+    Function:       get_entry_path
+    Args:           key: Key of the query
+    Return:         Path of the entry file
+    '''
+    def get_entry_path(self, key):
+
+        return os.path.join(self.cache_dir, key + ".json")
+
+    '''
+    Function:       load
+    Args:           key: Key of the query
+                    netlist_path: Where to write the output netlist JSON
+    Return:         Cached_Cello_Result, or None if the query is not stored
+    Description:    On a hit, writes the stored netlist to netlist_path (where
+                    Cello would have written it, creating its folder if need
+                    be) and marks the entry as most recently used.  Only a
+                    missing or unreadable entry counts as a miss - failing to
+                    write the netlist raises OSError.
+    '''
+    def load(self, key, netlist_path):
+
+        entry_path = self.get_entry_path(key)
+
+        try:
+            with open(entry_path) as entry_file:
+                entry = json.load(entry_file)
+            netlist = entry["netlist"]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        netlist_dir = os.path.dirname(netlist_path)
+        if netlist_dir:
+            os.makedirs(netlist_dir, exist_ok = True)
+        with open(netlist_path, "w") as netlist_file:
+            netlist_file.write(netlist)
+        os.utime(entry_path)
+
+        self.hits += 1
+        return Cached_Cello_Result(entry["circuit_score"], entry["part_names"])
+
+    '''
+    Function:       store
+    Args:           key: Key of the query
+                    cello_result: CelloResult of the query
+                    netlist_path: Output netlist JSON written by Cello
+    Return:         None
+    Description:    Adds the result to the store, then evicts the least
+                    recently used entries until the store fits in max_bytes.
+    '''
+    def store(self, key, cello_result, netlist_path):
+
+        with open(netlist_path) as netlist_file:
+            netlist = netlist_file.read()
+
+        entry = {"circuit_score": cello_result.circuit_score,
+                 "part_names": list(cello_result.part_names),
+                 "netlist": netlist}
+
+        os.makedirs(self.cache_dir, exist_ok = True)
+        entry_path = self.get_entry_path(key)
+        temp_path = entry_path + ".%d.tmp" % os.getpid()
+        with open(temp_path, "w") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temp_path, entry_path)
+
+        self.evict()
+
+    '''
+    Function:       evict
+    Args:           None
+    Return:         None
+    Description:    Removes entries, least recently used (oldest modification
+                    time) first, while the total size exceeds max_bytes.
+    '''
+    def evict(self):
+
+        entries = []
+        total_bytes = 0
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+            total_bytes += stat.st_size
+
+        entries.sort()
+        for _, size, filename in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except OSError:
+                pass
+            total_bytes -= size
+
+'''
+Class:          Annealing_Result_Cache
+Description:    Size-bounded, least recently used store of annealing results,
+                so that a design Cello produces again - for another signal 
+                set, in another worker of a parallel sweep, or in a later 
+                run - is not annealed twice.  An entry is keyed by the 
+                parameter form of the netlist (see 
+                Netlist_Parser.get_parameter_form), which hashes the circuit
+                structure and the parameters bound to it but not the device
+                names, plus the annealing settings.  It holds the best score
+                and the best parameters of each gate, by gate hash, so they
+                can be given back to the gates of a netlist whose devices
+                have other names.
+'''
+class Annealing_Result_Cache(Cello_Result_Cache):
+
+    def __init__(self, cache_dir, max_bytes = 64 * 1024 * 1024):
+        super().__init__(cache_dir, max_bytes)
+
+    '''
+    Function:       get_key
+    Args:           netlist_parser: Netlist_Parser of the design, populated 
+                                    with the chassis records
+                    settings: Annealing_Settings of the run
+    Return:         Key of the design (hex string), and the hash of each gate
+                    (see Netlist_Parser.get_parameter_form)
+    Description:    The number of replica workers only decides where the 
+                    replicas run, so it is not part of the key.
+    '''
+    def get_key(self, netlist_parser, settings):
+
+        parameter_form, gate_hashes = netlist_parser.get_parameter_form()
+
+        digest = hashlib.sha256(b"annealing-cache-v%d\n" % ANNEALING_CACHE_VERSION)
+        digest.update(parameter_form.encode())
+
+        settings_fields = {name: value for name, value in vars(settings).items() if name != "replica_workers"}
+        digest.update(json.dumps(settings_fields, sort_keys = True, default = str).encode())
+
+        return digest.hexdigest(), gate_hashes
+
+    '''
+    Function:       load
+    Args:           key: Key of the design
+                    netlist_parser: Netlist_Parser of the design
+                    gate_hashes: Hash of each gate of netlist_parser
+                    gate_records: Repressor records from the chassis
+    Return:         Best score and best gate records (a dictionary by gate
+                    name), or None if the design is not stored
+    Description:    Gates outside the stored entry (i.e. not driving the 
+                    output) keep the parameters of their chassis record.
+    '''
+    def load(self, key, netlist_parser, gate_hashes, gate_records):
+
+        entry_path = self.get_entry_path(key)
+
+        try:
+            with open(entry_path) as entry_file:
+                entry = json.load(entry_file)
+            netlist_score = entry["netlist_score"]
+            stored_gates = entry["gates"]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        best_gates = {}
+        for node, gate_hash in zip(netlist_parser.gates, gate_hashes):
+            if gate_hash in stored_gates:
+                ymax, ymin, K, n = stored_gates[gate_hash]
+            elif node.name in gate_records:
+                current_record = gate_records[node.name]
+                ymax, ymin, K, n = current_record.ymax, current_record.ymin, current_record.K, current_record.n
+            else:
+                continue
+            best_gates[node.name] = Repressor_Record()
+            best_gates[node.name].name = node.name
+            best_gates[node.name].populate_params(ymax = ymax, ymin = ymin, K = K, n = n)
+        os.utime(entry_path)
+
+        self.hits += 1
+        return netlist_score, best_gates
+
+    '''
+    Function:       store
+    Args:           key: Key of the design
+                    netlist_parser: Netlist_Parser of the design
+                    gate_hashes: Hash of each gate of netlist_parser, taken
+                                 before annealing
+                    netlist_score: Best score of the annealing
+                    best_gates: Gate records of the best score
+    Return:         None
+    Description:    Adds the result to the store, then evicts the least
+                    recently used entries until the store fits in max_bytes.
+                    A design where two gates hash the same (the same 
+                    repressor parameters on the same inputs) is not stored,
+                    since its best parameters could be given back to the
+                    wrong one of the two.
+    '''
+    def store(self, key, netlist_parser, gate_hashes, netlist_score, best_gates):
+
+        if len(set(gate_hashes)) < len(gate_hashes):
+            return
+
+        stored_gates = {}
+        for node, gate_hash in zip(netlist_parser.gates, gate_hashes):
+            if node.name in best_gates:
+                best_record = best_gates[node.name]
+                stored_gates[gate_hash] = [best_record.ymax, best_record.ymin, best_record.K, best_record.n]
+
+        entry = {"netlist_score": netlist_score, "gates": stored_gates}
+
+        os.makedirs(self.cache_dir, exist_ok = True)
+        entry_path = self.get_entry_path(key)
+        temp_path = entry_path + ".%d.tmp" % os.getpid()
+        with open(temp_path, "w") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temp_path, entry_path)
+
+        self.evict()
@@ -0,0 +1,818 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: cello_sweep.py
+# Description:  Sweep of the optimization over every set of input signals,
+#               shared by main.py and the GUI.  For each signal set:
+#               1) Execute a Cello query.
+#               2) Parse and score the netlist produced by Cello.
+#               3) Perform the simulated annealing routine on the gates.
+#               Signal sets are independent of each other, so the sweep can
+#               also run them in parallel worker processes.  Each worker gets
+#               its own copy of the cello_in folder and its own cello_out
+#               folder, so concurrent Cello runs never overwrite each other's
+#               files, and both are deleted once the signal set is done.  The
+#               results are merged in signal set order, so the
+#               best designs do not depend on which worker finished first.
+# Status:   Operational.  Annealing results are reused for a design repeated
+#           across signal sets only within one process, so a parallel sweep
+#           anneals every signal set.
+# ------------------------------------------------------------------------------
+
+# Imports
+from record import Repressor_Table, Repressor_Proposal_Generator
+from simulated_annealing import Annealing_Engine, Lockstep_Engine, Stopping_Criteria, make_schedule, REJECTED
+from parallel_tempering import Parallel_Tempering
+from circuit_netlist_parser import Netlist_Parser, GENETIC_BACKENDS
+from celloapi2 import CelloQuery, CelloResult
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from shutil import copyfile, rmtree
+import copy
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+# Finished Cello queries allowed to wait for annealing in the sweeps of main.py
+# and the GUI (see _sweep_pipelined)
+DEFAULT_PIPELINE_DEPTH = 2
+
+'''
+Class:          Signal_Set_Result
+Description:    Outcome of the optimization for one set of input signals.
+'''
+class Signal_Set_Result():
+
+    def __init__(self, signal_set):
+        self.signal_set = signal_set        # Input signals given to Cello
+        self.cello_score = 0                # Score of the Cello design
+        self.cello_circuit = None           # Parts used in the Cello design
+        self.netlist_score = 0              # Best score after annealing
+        self.best_gates = {}                # Gate records of the best score
+        self.design_key = None              # Key of the design in the
+                                            # Annealing_Result_Cache
+        self.annealing = None               # Annealing_Result of the run
+
+'''
+Class:          Sweep_Summary
+Description:    Best Cello and annealing designs over a sweep.  Results are
+                added in signal set order, and a design only replaces the
+                current best if it is strictly better.
+'''
+class Sweep_Summary():
+
+    def __init__(self):
+        self.best_cello_score = 0
+        self.best_cello_design = None
+        self.best_cello_inputs = None
+
+        self.best_annealing_score = 0
+        self.best_annealing_design = None
+        self.best_annealing_inputs = None
+
+    '''
+    Function:       add_result
+    Args:           result: Signal_Set_Result, or None if the signal set failed
+    Return:         None
+    '''
+    def add_result(self, result):
+
+        if result is None:
+            return
+
+        if result.cello_score > self.best_cello_score:
+            self.best_cello_score = result.cello_score
+            self.best_cello_inputs = result.signal_set
+            self.best_cello_design = result.cello_circuit
+
+        if result.netlist_score > self.best_annealing_score:
+            self.best_annealing_score = result.netlist_score
+            self.best_annealing_inputs = result.signal_set
+            self.best_annealing_design = result.best_gates
+
+'''
+Class:          Annealing_Settings
+Description:    How to anneal each design of a sweep.  Set num_iterations to
+                0 to only score the Cello designs.  The stopping criteria 
+                (see simulated_annealing.Stopping_Criteria) are off when None.
+                With more than one chain, each design is annealed by that
+                many chains in lockstep.  Otherwise, with more than one
+                replica, each design is optimized by parallel tempering, and
+                the schedule is not used.  The backend picks how the genetic
+                model of the circuits is evaluated (see GENETIC_BACKENDS in
+                circuit_netlist_parser).
+'''
+class Annealing_Settings():
+
+    def __init__(self, num_iterations = 1000, schedule = "step", patience = None, min_relative_improvement = None, 
+                 improvement_window = 100, time_budget = None, max_evaluations = None, num_replicas = 1, 
+                 exchange_interval = 50, replica_workers = None, num_chains = 1, proposal_mode = "retry", early_reject = False, 
+                 gates_per_move = None, backend = "numpy"):
+        if backend not in GENETIC_BACKENDS:
+            raise ValueError("Unknown genetic backend %s, expected one of: %s" % (backend, ", ".join(GENETIC_BACKENDS)))
+
+        self.num_iterations = num_iterations    # Iterations per design
+        self.schedule = schedule                # Name of the cooling schedule
+                                                # (see COOLING_SCHEDULES in
+                                                # simulated_annealing)
+        self.patience = patience                # Iterations without a new best
+        self.min_relative_improvement = min_relative_improvement
+        self.improvement_window = improvement_window
+                                                # Smallest relative gain of the
+                                                # best score per window
+        self.time_budget = time_budget          # Seconds per design
+        self.max_evaluations = max_evaluations  # Evaluations per design
+        self.num_replicas = num_replicas        # Parallel tempering replicas
+        self.exchange_interval = exchange_interval
+                                                # Steps between exchanges
+        self.replica_workers = replica_workers  # Worker processes of the
+                                                # replicas, None for one per
+                                                # replica (up to the CPUs) - 
+                                                # always 1 in a parallel sweep
+        self.num_chains = num_chains            # Chains annealed in lockstep
+        self.proposal_mode = proposal_mode      # How moves are drawn (see
+                                                # PROPOSAL_MODES in record)
+        self.early_reject = early_reject        # Stop scoring moves that
+                                                # cannot be accepted (single
+                                                # chain only, and no effect 
+                                                # below 7 inputs - see 
+                                                # BOUNDED_MIN_ROWS in
+                                                # circuit_netlist_parser)
+        self.gates_per_move = gates_per_move    # Gates modified per move, None
+                                                # for all of them (not used by
+                                                # lockstep chains; only the
+                                                # "numpy" backend re-simulates
+                                                # just their fan-out cone)
+        self.backend = backend                  # Genetic simulation backend
+
+    '''
+    Function:       make_stopping_criteria
+    Args:           None
+    Return:         New Stopping_Criteria for one annealing run
+    '''
+    def make_stopping_criteria(self):
+
+        return Stopping_Criteria(patience = self.patience, min_relative_improvement = self.min_relative_improvement, 
+                                 improvement_window = self.improvement_window, time_budget = self.time_budget, 
+                                 max_evaluations = self.max_evaluations)
+
+'''
+Function:       make_default_settings
+Args:           num_iterations: Iterations per design, 0 to only score the
+                                Cello designs
+                patience: Stop annealing a design once its best score has
+                          not improved for this many iterations, or None to
+                          always run num_iterations
+                proposal_mode: How moves are drawn (see 
+                               record.PROPOSAL_MODES)
+                early_reject: Stop scoring moves that cannot be accepted -
+                              faster on circuits of 7 inputs or more.  The
+                              acceptance test is the same, but a random 
+                              number is drawn for every move, so a given 
+                              seed gives a different run
+                gates_per_move: Modify only this many gates per move, and
+                                re-simulate only their fan-out cone ("numpy"
+                                backend only - the others run the whole 
+                                circuit), or None to modify every gate
+                (others as in Annealing_Settings)
+Return:         Annealing_Settings of the sweeps of main.py and the GUI
+Description:    Every design is annealed for num_iterations unless patience
+                is given - stopping early moves the time to the designs that
+                are still improving, but changes the results.  Moves are 
+                redrawn (a few times) until they fall inside the bounds, as
+                they always were; "truncated" draws them only from inside 
+                the bounds instead, so no iteration is lost to a gate that 
+                could not be modified, but the random sequence (and so the
+                result of a given seed) differs.
+'''
+def make_default_settings(num_iterations = 1000, schedule = "step", num_replicas = 1, num_chains = 1, backend = "numpy", patience = None, proposal_mode = "retry", 
+                          early_reject = False, gates_per_move = None):
+
+    return Annealing_Settings(num_iterations = num_iterations, schedule = schedule, patience = patience, num_replicas = num_replicas, 
+                              num_chains = num_chains, proposal_mode = proposal_mode, early_reject = early_reject, 
+                              gates_per_move = gates_per_move, backend = backend)
+
+'''
+Class:          Circuit_Annealing_Problem
+Description:    Annealing problem (see simulated_annealing.Annealing_Engine) 
+                over the response function parameters of the gates of a
+                circuit.  A move modifies every gate, and is only acceptable
+                if the circuit output is physically meaningful.  The moves 
+                are drawn by a Repressor_Proposal_Generator (with retries, or
+                truncated to the bounds), seeded from the NumPy global random
+                state unless a seed is given.  With gates_per_move, a move 
+                modifies only that many gates, picked at random, and only 
+                their fan-out cone is re-simulated (see 
+                Netlist_Parser.resimulate_gates).
+'''
+class Circuit_Annealing_Problem():
+
+    # Make sure that the values are physically meaningful...
+    # not sure what exactly this means, but OFF_MAX ~ 1e-10 and ON_MIN ~ 1e5 does NOT seem realistic...
+    # So just check to see if OFF_MAX and ON_MIN are in reasonable values before accepting the change.  Otherwise
+    # We will reject automatically.
+    ON_MIN_UPPER_BOUND = 5
+    OFF_MAX_LOWER_BOUND = 1e-3
+
+    def __init__(self, netlist_parser, gate_records, num_retries = 10, proposal_mode = "retry", gates_per_move = None, seed = None):
+        self.netlist_parser = netlist_parser
+        self.num_retries = num_retries      # Attempts per gate to generate
+                                            # valid parameters
+        self.gates_per_move = gates_per_move
+                                            # Gates modified per move, None
+                                            # for all of them
+        self.changed_gates = None           # Names of the gates modified by
+                                            # the last move, if not all
+        if seed is None:
+            seed = np.random.randint(0, 2**31 - 1)
+        self.proposals = Repressor_Proposal_Generator(num_retries, seed = seed, mode = proposal_mode)
+
+        # Copy the gate parameters to a working table - the circuit reads
+        # its response function parameters directly from the table, so
+        # modifying the table is enough to change the circuit
+        self.gate_table = Repressor_Table([node.name for node in netlist_parser.gates])
+        self.gate_table.load_records(gate_records)
+        netlist_parser.bind_parameter_table(self.gate_table)
+
+        # Preallocated memento of the circuit before modification - restoring
+        # it undoes a rejected change without re-simulating the circuit
+        self.pre_modified_state = netlist_parser.snapshot()
+
+        self.num_bounded_runs = 0           # Evaluations given a threshold,
+        self.num_early_rejects = 0          # how many stopped early, and the
+        self.num_rows_simulated = 0         # truth table rows they simulated
+
+    def score(self):
+
+        return self.netlist_parser.circuit_score
+
+    def save(self):
+
+        self.netlist_parser.snapshot(self.pre_modified_state)
+
+    def restore(self):
+
+        self.netlist_parser.restore(self.pre_modified_state)
+
+    def propose(self):
+
+        # Randomly generate a new "input vector" by modifying all of the gates
+        # in the circuit at once - modified in place, so the circuit sees it
+        if self.gates_per_move is None:
+            new_params, valid_state_generated = self.proposals.propose(self.gate_table.params)
+            np.copyto(self.gate_table.params, new_params)
+
+        # Or only a few gates, picked at random
+        else:
+            num_gates = len(self.gate_table.names)
+            rows = self.proposals.rng.choice(num_gates, size = min(self.gates_per_move, num_gates), replace = False)
+            new_params, valid_state_generated = self.proposals.propose(self.gate_table.params[rows])
+            self.gate_table.params[rows] = new_params
+            self.changed_gates = [self.gate_table.names[row] for row in rows]
+
+        return np.all(valid_state_generated)
+
+    def evaluate(self, threshold = None):
+
+        # Rerun the circuit at the genetic level with the new parameters - 
+        # given a threshold, stop once the score cannot beat it (only if the
+        # circuit is known to pass the checks below)
+        if threshold is None and self.changed_gates is not None:
+            self.netlist_parser.resimulate_gates(None, self.changed_gates)
+        elif threshold is None:
+            self.netlist_parser.run_circuit_genetic_vectorized()
+        else:
+            completed = self.netlist_parser.run_circuit_genetic_bounded(threshold, self.ON_MIN_UPPER_BOUND, self.OFF_MAX_LOWER_BOUND)
+            self.num_bounded_runs += 1
+            self.num_rows_simulated += self.netlist_parser.rows_simulated
+            if not completed:
+                self.num_early_rejects += 1
+                return REJECTED
+
+        if self.netlist_parser.ON_MIN < self.ON_MIN_UPPER_BOUND and self.netlist_parser.OFF_MAX > self.OFF_MAX_LOWER_BOUND:
+            return self.netlist_parser.circuit_score
+        return None
+
+    def get_state(self):
+
+        return self.gate_table.snapshot()
+
+    def set_state(self, state):
+
+        self.gate_table.restore(state)
+        self.netlist_parser.run_circuit_genetic_vectorized()
+
+    def seed(self, seed):
+
+        self.proposals.seed(seed)
+
+    '''
+    Function:       print_early_rejects
+    Args:           None
+    Return:         None
+    Description:    Prints how much of the evaluations given a threshold was
+                    skipped.
+    '''
+    def print_early_rejects(self):
+
+        if self.num_bounded_runs == 0:
+            return
+        num_rows = self.num_bounded_runs * len(self.netlist_parser.input_combinations)
+        print("EARLY REJECT: %d OF %d EVALUATIONS STOPPED EARLY, %.1lf%% OF THE ROWS SIMULATED" % (self.num_early_rejects, self.num_bounded_runs, 100 * self.num_rows_simulated / num_rows))
+
+'''
+Class:          Circuit_Population_Problem
+Description:    Population version of Circuit_Annealing_Problem, for 
+                simulated_annealing.Lockstep_Engine.  A state is the array of
+                the gate table parameters; a population of states is scored
+                in one pass with Netlist_Parser.score_population.  The circuit
+                itself is never modified.
+'''
+class Circuit_Population_Problem():
+
+    def __init__(self, netlist_parser, gate_records, num_retries = 10, proposal_mode = "retry", seed = None):
+        self.netlist_parser = netlist_parser
+        self.num_retries = num_retries      # Attempts per gate to generate
+                                            # valid parameters
+        if seed is None:
+            seed = np.random.randint(0, 2**31 - 1)
+        self.proposals = Repressor_Proposal_Generator(num_retries, seed = seed, mode = proposal_mode)
+
+        # Table of the starting parameters, and the row of each gate in it
+        self.gate_table = Repressor_Table([node.name for node in netlist_parser.gates])
+        self.gate_table.load_records(gate_records)
+        self.gate_rows = np.array([self.gate_table.index[node.name] for node in netlist_parser.gates], dtype = int)
+
+    def score(self):
+
+        return self.netlist_parser.circuit_score
+
+    def get_state(self):
+
+        return self.gate_table.snapshot()
+
+    def propose_population(self, states):
+
+        # Modify every gate of every state - a move is only valid if all
+        # of its gates are
+        new_states, valid_state_generated = self.proposals.propose(states)
+        return new_states, np.all(valid_state_generated, axis = 1)
+
+    def evaluate_population(self, states):
+
+        scores = self.netlist_parser.score_population(states[:, self.gate_rows])
+        acceptable = (self.netlist_parser.population_ON_MIN < Circuit_Annealing_Problem.ON_MIN_UPPER_BOUND) & \
+                     (self.netlist_parser.population_OFF_MAX > Circuit_Annealing_Problem.OFF_MAX_LOWER_BOUND)
+        return scores, acceptable
+
+'''
+Function:       anneal_circuit
+Args:           netlist_parser: Scored Netlist_Parser of the circuit
+                gate_records: Dictionary of the gate records of the chassis
+                settings: Annealing_Settings, or None for the defaults
+Return:         Best score found, the gate records of the best parameters,
+                and the Annealing_Result of the run
+Description:    Simulated annealing on the response function parameters of the
+                gates in the circuit, starting at 20% of the starting score.
+                With settings.num_chains > 1, anneals that many chains in
+                lockstep instead, and with settings.num_replicas > 1, runs 
+                parallel tempering, with the hottest replica at the starting
+                temperature.
+'''
+def anneal_circuit(netlist_parser, gate_records, settings = None):
+
+    if settings is None:
+        settings = Annealing_Settings()
+
+    # Set the starting temperature to 20% of the starting score
+    initial_temperature = 0.20 * netlist_parser.circuit_score
+
+    if settings.num_chains > 1:
+        problem = Circuit_Population_Problem(netlist_parser, gate_records, proposal_mode = settings.proposal_mode)
+        engine = Lockstep_Engine(make_schedule(settings.schedule), settings.num_iterations, settings.num_chains, settings.make_stopping_criteria())
+        annealing = engine.run(problem, initial_temperature)
+    elif settings.num_replicas > 1:
+        problem = Circuit_Annealing_Problem(netlist_parser, gate_records, proposal_mode = settings.proposal_mode, gates_per_move = settings.gates_per_move)
+        tempering = Parallel_Tempering(num_replicas = settings.num_replicas, num_iterations = settings.num_iterations, exchange_interval = settings.exchange_interval, 
+                                       num_workers = settings.replica_workers, stopping = settings.make_stopping_criteria())
+        annealing = tempering.run(problem, initial_temperature, problem_args = (netlist_parser, gate_records, problem.num_retries, settings.proposal_mode, settings.gates_per_move))
+    else:
+        problem = Circuit_Annealing_Problem(netlist_parser, gate_records, proposal_mode = settings.proposal_mode, gates_per_move = settings.gates_per_move)
+        engine = Annealing_Engine(make_schedule(settings.schedule), settings.num_iterations, settings.make_stopping_criteria(), settings.early_reject)
+        annealing = engine.run(problem, initial_temperature)
+        problem.print_early_rejects()
+    annealing.print()
+
+    # Counts of the moves proposed in this process (the moves of parallel
+    # tempering workers are not counted)
+    problem.proposals.print()
+
+    # Convert the best parameters found back into records
+    best_gates = problem.gate_table.to_records(annealing.best_state)
+
+    return annealing.best_score, best_gates, annealing
+
+'''
+Function:       query_cello
+Args:           file_parser: Input_Processor holding the chassis records
+                verilog_name: Name of the Verilog file in in_dir
+                signal_set: List of input signals for Cello
+                in_dir: Folder with the chassis files and the Verilog file
+                out_dir: Folder where Cello writes its results
+                result_cache: Cello_Result_Cache, or None to always run Cello
+                log: Function called with each progress or error message
+Return:         CelloResult (or Cached_Cello_Result), or None if Cello did not
+                produce a design
+Description:    First half of run_signal_set - runs Cello for the signal set,
+                unless the same query is found in result_cache.  Either way,
+                the output netlist JSON is in out_dir afterwards.  A cache
+                that cannot be read or written is only reported - the query
+                then runs (or its result is kept) as without a cache.
+'''
+def query_cello(file_parser, verilog_name, signal_set, in_dir, out_dir, result_cache = None, log = print):
+
+    log("SIGNAL SET: " + str(signal_set))
+
+    # Output netlist written by Cello (or restored from the result cache)
+    circuit_netlist_json = out_dir + verilog_name.replace(".v", "") + "_outputNetlist.json"
+
+    q = CelloQuery(
+            input_directory = in_dir,
+            output_directory = out_dir,
+            verilog_file = verilog_name,
+            compiler_options = file_parser.options_filename,
+            input_ucf = file_parser.circuit_constraint_filename,
+            input_sensors = file_parser.circuit_input_filename,
+            output_device = file_parser.circuit_output_filename)
+
+    q.set_input_signals(signal_set)
+
+    # Skip Cello entirely if the same query was run before
+    res = None
+    cache_key = None
+    if result_cache is not None:
+        try:
+            cache_key = result_cache.get_key(in_dir, [verilog_name, file_parser.options_filename, file_parser.circuit_constraint_filename, file_parser.circuit_input_filename, file_parser.circuit_output_filename], signal_set)
+            res = result_cache.load(cache_key, circuit_netlist_json)
+        except Exception:
+            log("[ERROR]: COULD NOT LOOK UP THE CELLO RESULT CACHE FOR SIGNAL SET " + str(signal_set))
+        if res is not None:
+            log("CELLO RESULT LOADED FROM CACHE")
+    cache_hit = res is not None
+
+    try:
+        # Generate a design using Cello!
+        if res is None:
+            start_time = time.time()
+            q.get_results()
+            stop_time = time.time()
+            log("GET RESULTS TOTAL TIME = %lf" % (stop_time - start_time))
+
+            # Get results of the Cello query (most important: Scoring and Netlist)
+            res = CelloResult(results_dir = out_dir)
+
+    except Exception:
+        log("[ERROR]: NO CELLO RESULT FOR SIGNAL SET " + str(signal_set))
+        res = None
+
+    # Save a new result for next time - failing to do so loses nothing
+    if res is not None and not cache_hit and cache_key is not None:
+        try:
+            result_cache.store(cache_key, res, circuit_netlist_json)
+        except Exception:
+            log("[ERROR]: COULD NOT STORE THE CELLO RESULT FOR SIGNAL SET " + str(signal_set))
+
+    q.reset_input_signals()
+
+    return res
+
+'''
+Function:       optimize_design
+Args:           file_parser: Input_Processor holding the chassis records
+                verilog_name: Name of the Verilog file
+                signal_set: List of input signals given to Cello
+                res: Result returned by query_cello
+                out_dir: Folder holding the output netlist JSON of Cello
+                cache_dir: Compiled netlist cache folder (see parse_netlist)
+                settings: Annealing_Settings, or None for the defaults
+                annealing_cache: Annealing_Result_Cache, or None to always
+                                 anneal
+Return:         Signal_Set_Result, or None if the design could not be scored
+Description:    Second half of run_signal_set - scores the netlist produced
+                by Cello and anneals the gates.  If the design is already in
+                annealing_cache, its stored result is reused instead of
+                annealing.
+'''
+def optimize_design(file_parser, verilog_name, signal_set, res, out_dir, cache_dir, settings = None, annealing_cache = None):
+
+    if settings is None:
+        settings = Annealing_Settings()
+
+    result = Signal_Set_Result(signal_set)
+
+    try:
+        result.cello_circuit = res.part_names
+        result.cello_score = res.circuit_score
+
+        # Run the netlist scoring which should be the same results as the
+        # Cello scoring.
+
+        # Get the output circuit netlist
+        circuit_netlist_json = out_dir + verilog_name.replace(".v", "") + "_outputNetlist.json"
+
+        # Create the parser module, with the genetic backend of the settings
+        netlist_parser = Netlist_Parser(circuit_netlist_json, backend = settings.backend)
+
+        # Cleanup the netlist JSON (Not needed if the _outputNetlist.json
+        # file is correctly formatted).  A netlist seen before is loaded
+        # from the cache, truth table included.
+        netlist_parser.parse_netlist(cleanup = True, cache_dir = cache_dir)
+
+        # Populate the reconstructed circuit with the parameters
+        # from the input JSONs (input, UCF, output)
+        netlist_parser.populate_input_values(file_parser.input_records)
+        netlist_parser.populate_response_functions(file_parser.gate_records)
+        netlist_parser.populate_output_converters(file_parser.output_records)
+
+        # Now run the logic generator and the genetic generator - first
+        # assume it is digital circuit, compute what the outputs should be.
+        # Next run as genetic circuit w/ response functions for each gate.
+        # The vectorized genetic run also calculates the score.
+        if netlist_parser.logic_outputs is None:
+            netlist_parser.run_circuit_logical_bitsliced()
+        netlist_parser.run_circuit_genetic_vectorized()
+        netlist_parser.print_genetric_truth_table()
+
+        # Begin the simulated annealing on the gates in the circuit, unless
+        # the same design (same structure and parameters, whatever the device
+        # names) was already optimized with the same settings.  The key is
+        # taken before annealing, which moves the parameters
+        cached = None
+        if annealing_cache is not None:
+            result.design_key, gate_hashes = annealing_cache.get_key(netlist_parser, settings)
+            cached = annealing_cache.load(result.design_key, netlist_parser, gate_hashes, file_parser.gate_records)
+
+        if cached is not None:
+            result.netlist_score, result.best_gates = cached
+            print("SAME DESIGN AS ONE ANNEALED BEFORE, REUSING ITS ANNEALING RESULT")
+
+        else:
+            result.netlist_score, result.best_gates, result.annealing = anneal_circuit(netlist_parser, file_parser.gate_records, settings)
+            if annealing_cache is not None:
+                annealing_cache.store(result.design_key, netlist_parser, gate_hashes, result.netlist_score, result.best_gates)
+
+        print("CELLO SCORE: %lf" % result.cello_score)
+        print("ANNEALING SCORE: %lf" % result.netlist_score)
+
+        print("BEST GATES: ")
+        for gate_name, record_obj in result.best_gates.items():
+            print("GATE NAME = " + gate_name)
+            record_obj.print()
+
+    except Exception:
+        print("[ERROR]: NO VALID DESIGN FOR SIGNAL SET " + str(signal_set))
+        result = None
+
+    return result
+
+'''
+Function:       run_signal_set
+Args:           file_parser: Input_Processor holding the chassis records
+                verilog_name: Name of the Verilog file in in_dir
+                signal_set: List of input signals for Cello
+                in_dir: Folder with the chassis files and the Verilog file
+                out_dir: Folder where Cello writes its results
+                cache_dir: Compiled netlist cache folder (see parse_netlist)
+                settings: Annealing_Settings, or None for the defaults
+                annealing_cache: Annealing_Result_Cache, or None to always
+                                 anneal
+                result_cache: Cello_Result_Cache, or None to always run Cello
+Return:         Signal_Set_Result, or None if the signal set failed
+Description:    Runs Cello for the signal set (query_cello), then scores and
+                anneals the design it produced (optimize_design).
+'''
+def run_signal_set(file_parser, verilog_name, signal_set, in_dir, out_dir, cache_dir, settings = None, annealing_cache = None, result_cache = None):
+
+    signal_set = list(signal_set)
+
+    res = query_cello(file_parser, verilog_name, signal_set, in_dir, out_dir, result_cache)
+    if res is None:
+        return None
+
+    return optimize_design(file_parser, verilog_name, signal_set, res, out_dir, cache_dir, settings, annealing_cache)
+
+'''
+Function:       _scratch_directory
+Args:           directory: Folder path, ending in a path separator
+                index: Index of the signal set
+Return:         Sibling folder path for the signal set, i.e. cello_out_3\\
+'''
+def _scratch_directory(directory, index):
+
+    base = directory.rstrip("\\/")
+    return base + "_%d" % index + directory[len(base):]
+
+'''
+Function:       _remove_scratch_directory
+Args:           directory: Folder from _scratch_directory
+Return:         None
+Description:    Deletes a scratch folder once the result of its signal set has
+                been parsed.  A folder that cannot be removed (i.e. still open
+                on Windows) is left behind rather than failing the sweep.
+'''
+def _remove_scratch_directory(directory):
+
+    rmtree(directory, ignore_errors = True)
+
+'''
+Function:       _run_signal_set_isolated
+Args:           index: Index of the signal set in the sweep
+                seed: Seed of the worker's random number generator
+                (others as in run_signal_set)
+Return:         Signal_Set_Result, or None if the signal set failed
+Description:    Worker process entry point.  Copies the input files of Cello
+                to a scratch folder of its own, and lets Cello write to 
+                another one, so the worker never touches the files of another
+                signal set.  Seeded explicitly, since forked workers would 
+                otherwise all start from the same random state.  Both scratch
+                folders are deleted before returning.
+'''
+def _run_signal_set_isolated(index, seed, file_parser, verilog_name, signal_set, in_dir, out_dir, cache_dir, settings, annealing_cache, result_cache):
+
+    np.random.seed(seed)
+
+    scratch_in_dir = _scratch_directory(in_dir, index)
+    scratch_out_dir = _scratch_directory(out_dir, index)
+
+    try:
+        os.makedirs(scratch_in_dir, exist_ok = True)
+        os.makedirs(scratch_out_dir, exist_ok = True)
+
+        # Copy the files Cello reads to the scratch input folder
+        for filename in [verilog_name, file_parser.options_filename, file_parser.circuit_constraint_filename, file_parser.circuit_input_filename, file_parser.circuit_output_filename]:
+            copyfile(in_dir + filename, scratch_in_dir + filename)
+
+        return run_signal_set(file_parser, verilog_name, signal_set, scratch_in_dir, scratch_out_dir, cache_dir, settings, annealing_cache, result_cache)
+
+    finally:
+        _remove_scratch_directory(scratch_in_dir)
+        _remove_scratch_directory(scratch_out_dir)
+
+'''
+Function:       _sweep_pipelined
+Args:           pipeline_depth: Number of finished Cello queries allowed to
+                                wait for annealing
+                results: List to fill with the result of each signal set
+                (others as in sweep_signal_sets)
+Return:         None
+Description:    Producer/consumer version of the in-order sweep.  A producer
+                thread runs the Cello queries of the upcoming signal sets, 
+                each into its own cello_out_<k> folder, and hands them over 
+                through a bounded queue, while this thread scores and anneals
+                the designs that are ready.  Cello runs as a separate program,
+                so the two overlap, and the wall time approaches the larger of
+                the total Cello time and the total annealing time instead of
+                their sum.  The annealing happens in signal set order in this
+                thread, so the results match the plain in-order sweep.  Each
+                cello_out_<k> folder is deleted once its design is scored.
+                The messages of each Cello query are printed by this thread
+                when it takes the query.  If the annealing raises, the 
+                producer is stopped and joined and the folders of the 
+                queries it left behind are deleted before the error 
+                propagates.
+'''
+def _sweep_pipelined(file_parser, verilog_name, signal_pairing, in_dir, out_dir, cache_dir, settings, on_result, annealing_cache, result_cache, pipeline_depth, results):
+
+    finished_queries = queue.Queue(maxsize = pipeline_depth)
+    stop_producer = threading.Event()
+
+    def produce():
+        for i, signal_set in enumerate(signal_pairing):
+            if stop_producer.is_set():
+                return
+
+            # The messages of the query are printed by the consumer when it
+            # takes the query, so they do not interleave with its own output
+            signal_set = list(signal_set)
+            job_out_dir = _scratch_directory(out_dir, i)
+            messages = []
+            try:
+                os.makedirs(job_out_dir, exist_ok = True)
+                res = query_cello(file_parser, verilog_name, signal_set, in_dir, job_out_dir, result_cache, log = messages.append)
+            except Exception:
+                messages.append("[ERROR]: NO CELLO RESULT FOR SIGNAL SET " + str(signal_set))
+                res = None
+
+            # Blocks while pipeline_depth queries are already waiting, unless
+            # the consumer gave up
+            while True:
+                try:
+                    finished_queries.put((i, signal_set, job_out_dir, res, messages), timeout = 0.1)
+                    break
+                except queue.Full:
+                    if stop_producer.is_set():
+                        _remove_scratch_directory(job_out_dir)
+                        return
+
+    producer = threading.Thread(target = produce, daemon = True)
+    producer.start()
+
+    try:
+        for _ in range(len(signal_pairing)):
+            i, signal_set, job_out_dir, res, messages = finished_queries.get()
+            try:
+                for message in messages:
+                    print(message)
+                if res is not None:
+                    results[i] = optimize_design(file_parser, verilog_name, signal_set, res, job_out_dir, cache_dir, settings, annealing_cache)
+            finally:
+                _remove_scratch_directory(job_out_dir)
+            if on_result is not None:
+                on_result(i, results[i])
+
+    # If the annealing (or on_result) failed, stop the producer after its 
+    # current query, and delete the folders of the queries left waiting
+    finally:
+        stop_producer.set()
+        producer.join()
+        while not finished_queries.empty():
+            _remove_scratch_directory(finished_queries.get_nowait()[2])
+
+'''
+Function:       sweep_signal_sets
+Args:           file_parser: Input_Processor holding the chassis records
+                verilog_name: Name of the Verilog file in in_dir
+                signal_pairing: List of signal sets to try
+                in_dir: Folder with the chassis files and the Verilog file
+                out_dir: Folder where Cello writes its results
+                cache_dir: Compiled netlist cache folder
+                settings: Annealing_Settings of every signal set, or None 
+                          for the defaults
+                num_workers: Number of worker processes, 1 to run in order in
+                             this process
+                on_result: Optional function called with the index and the
+                           result of each signal set as it finishes (i.e. to
+                           report progress)
+                annealing_cache: Annealing_Result_Cache, or None to always
+                                 anneal.  Shared by the worker processes, so
+                                 a design annealed by one of them is reused
+                                 by the signal sets that start after it.
+                result_cache: Cello_Result_Cache, or None to always run Cello
+                pipeline_depth: If > 0 (and num_workers is 1), run the Cello
+                                queries ahead of the annealing in a producer
+                                thread, with up to this many queries waiting
+                                (see _sweep_pipelined)
+Return:         Sweep_Summary of the best designs, and the list of results
+                (one per signal set, None for a failed set)
+Description:    With several workers, parallel tempering replicas run in the
+                worker process of their signal set, rather than each worker
+                starting a pool of its own.
+'''
+def sweep_signal_sets(file_parser, verilog_name, signal_pairing, in_dir, out_dir, cache_dir, settings = None, num_workers = 1, on_result = None, annealing_cache = None, result_cache = None, pipeline_depth = 0):
+
+    results = [None] * len(signal_pairing)
+
+    if num_workers <= 1 and pipeline_depth > 0:
+
+        _sweep_pipelined(file_parser, verilog_name, signal_pairing, in_dir, out_dir, cache_dir, settings, on_result, annealing_cache, result_cache, pipeline_depth, results)
+
+    elif num_workers <= 1:
+
+        for i, signal_set in enumerate(signal_pairing):
+            results[i] = run_signal_set(file_parser, verilog_name, signal_set, in_dir, out_dir, cache_dir, settings, annealing_cache, result_cache)
+            if on_result is not None:
+                on_result(i, results[i])
+
+    else:
+
+        # Draw the seed of every signal set up front, so a seeded sweep is
+        # reproducible regardless of the scheduling of the workers
+        seeds = np.random.randint(0, 2**31 - 1, size = len(signal_pairing))
+
+        # The signal sets already use the CPUs - no replica pools within them
+        if settings is not None and settings.num_replicas > 1:
+            settings = copy.copy(settings)
+            settings.replica_workers = 1
+
+        with ProcessPoolExecutor(max_workers = num_workers) as executor:
+
+            futures = {}
+            for i, signal_set in enumerate(signal_pairing):
+                future = executor.submit(_run_signal_set_isolated, i, int(seeds[i]), file_parser, verilog_name, signal_set, in_dir, out_dir, cache_dir, settings, annealing_cache, result_cache)
+                futures[future] = i
+
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if on_result is not None:
+                    on_result(i, results[i])
+
+    # Merge in signal set order
+    summary = Sweep_Summary()
+    for result in results:
+        summary.add_result(result)
+
+    return summary, results
@@ -19,6 +19,9 @@
 
 # Imports
 import json
+import re
+import os
+import hashlib
 import itertools
 import record as rec
 from response_function import ResponseFunction
@@ -26,6 +29,24 @@ import numpy as np
 from typing import (Any, Dict, List, Union,)
 import yaml
 
+# Numba is optional - without it, the "numba" backend runs the same lowered
+# circuit with NumPy
+try:
+    import numba
+    from numba import prange
+except ImportError:
+    numba = None
+    prange = range
+
+# The parallel kernel must not leave an OpenMP or TBB thread pool behind in a
+# process that later forks the workers of a parallel sweep or of parallel 
+# tempering (the children hang).  Unless NUMBA_THREADING_LAYER says otherwise,
+# use Numba's own workqueue layer, which survives a fork - it cannot run 
+# kernels from two threads at once, but the kernels are only ever called from
+# the thread doing the annealing.
+if numba is not None and numba.config.THREADING_LAYER == "default":
+    numba.config.THREADING_LAYER = "workqueue"
+
 # ------------------------------ HELPER FUNCTIONS ------------------------------
 
 ''' 
@@ -63,6 +84,183 @@ def f_nor(x, y):
     elif x == -1 or y == -1:
         return -1
 
+''' 
+Function:       f_response
+Args:           x: Input signal(s) to the simulated genetic gate
+                ymax, ymin, K, n: Parameters of the response function
+Return:         Output of the sigmoidal response function
+Description:    Same sigmoid as ResponseFunction.f, but with the parameters
+                passed in explicitly so they can be NumPy arrays - used to
+                evaluate many parameter sets (candidates) at once.
+'''
+def f_response(x, ymax, ymin, K, n):
+    return ymin + ((ymax - ymin) / (1.0 + (x/K)**n))
+
+# Supported evaluation backends of the vectorized genetic simulation.  "numba"
+# (see benchmark_genetic_backends.py) is the fastest for one parameter set per 
+# call - a simulated annealing move - on circuits of up to about 6 inputs, 
+# where the per-node Python overhead of "numpy" dominates.  On larger truth 
+# tables, and for populations beyond a few inputs on a single core, "numpy" is
+# faster: its vectorized power function beats the scalar one the Numba kernel
+# calls for each row.
+GENETIC_BACKENDS = ("numpy", "numba")
+
+# Smallest truth table Netlist_Parser.run_circuit_genetic_bounded tries to stop
+# early on, i.e. circuits of 7 inputs or more.  Simulating two rows costs about
+# as much Python overhead as simulating the whole table, so below this, even a
+# move stopped after the two rows is no faster than a full run (numpy: 73 vs 
+# 54 us at 16 rows, 116 vs 95 us at 64 rows; 143 vs 168 us at 256 rows), and a
+# move that is not stopped pays for both
+BOUNDED_MIN_ROWS = 128
+
+# Node type codes of a lowered netlist (see Netlist_Parser.lower_netlist)
+CODE_INPUT = 0
+CODE_NOT = 1
+CODE_NOR = 2
+CODE_OUTPUT = 3
+
+# Version of the compiled netlist cache format - part of the cache key, so
+# files written by an older layout are simply never looked up again
+NETLIST_CACHE_VERSION = 1
+
+# Digital truth tables (logic_outputs arrays) of every circuit simulated in 
+# this process, keyed by structural fingerprint - see get_fingerprint
+_TRUTH_TABLE_CACHE = {}
+
+'''
+Function:       _build_csr
+Args:           neighbor_lists: For each node, the list of its neighbor nodes
+Return:         ptr, idx: Integer arrays in compressed sparse row form - the
+                neighbors of node i are idx[ptr[i]:ptr[i + 1]], given by their
+                position (Node.index) in the node list
+'''
+def _build_csr(neighbor_lists):
+
+    ptr = np.zeros(len(neighbor_lists) + 1, dtype = np.int64)
+    np.cumsum([len(neighbors) for neighbors in neighbor_lists], out = ptr[1:])
+    idx = np.fromiter((node.index for neighbors in neighbor_lists for node in neighbors), dtype = np.int64, count = ptr[-1])
+    return ptr, idx
+
+'''
+Function:       _lowered_kernel_loops
+Args:           node_codes: Type code of each node of the lowered netlist
+                node_fanin: (nodes, 2) indices of the input nodes of each node
+                node_gates: Gate column (in gate_params) of each gate node
+                output_node: Index of the output node
+                gate_params: (candidates, gates, 4) gate parameters
+                input_levels: (inputs, rows) genetic values of the inputs
+                on_rows, off_rows: Masks of the logical 1/0 rows
+                unit_conversion: Scaling factor of the output node
+                outputs, on_min, off_max: Result arrays, (candidates, rows),
+                (candidates,) and (candidates,), filled by the function
+Return:         None
+Description:    Simulates the lowered netlist with explicit loops - for each 
+                candidate, for each node in topological order, for each row -
+                then reduces ON_MIN/OFF_MAX over the output rows.  Written for
+                Numba: compiled with numba.njit it has no Python overhead, and
+                with parallel = True the candidates (numba.prange) are split
+                over the cores.  Without Numba, prange is a plain range, but 
+                the function is far too slow to run that way.
+'''
+def _lowered_kernel_loops(node_codes, node_fanin, node_gates, output_node, gate_params, input_levels, on_rows, off_rows, unit_conversion, outputs, on_min, off_max):
+
+    num_candidates = gate_params.shape[0]
+    num_rows = input_levels.shape[1]
+    num_nodes = node_codes.shape[0]
+
+    for c in prange(num_candidates):
+
+        # Outputs of every node for every row, for this candidate only
+        values = np.empty((num_nodes, num_rows))
+
+        for i in range(num_nodes):
+            code = node_codes[i]
+            a = node_fanin[i, 0]
+            b = node_fanin[i, 1]
+
+            if code == CODE_INPUT:
+                for r in range(num_rows):
+                    values[i, r] = input_levels[i, r]
+            elif code == CODE_OUTPUT:
+                for r in range(num_rows):
+                    values[i, r] = values[a, r]
+            else:
+                g = node_gates[i]
+                ymin = gate_params[c, g, 1]
+                span = gate_params[c, g, 0] - ymin
+                K = gate_params[c, g, 2]
+                n = gate_params[c, g, 3]
+                if code == CODE_NOR:
+                    for r in range(num_rows):
+                        values[i, r] = ymin + span / (1.0 + ((values[a, r] + values[b, r]) / K) ** n)
+                else:
+                    for r in range(num_rows):
+                        values[i, r] = ymin + span / (1.0 + (values[a, r] / K) ** n)
+
+        ON_MIN = 1e9
+        OFF_MAX = -1.0
+        for r in range(num_rows):
+            circuit_output = values[output_node, r] * unit_conversion
+            outputs[c, r] = circuit_output
+            if off_rows[r] and circuit_output > OFF_MAX:
+                OFF_MAX = circuit_output
+            elif on_rows[r] and circuit_output < ON_MIN:
+                ON_MIN = circuit_output
+
+        on_min[c] = ON_MIN
+        off_max[c] = OFF_MAX
+
+# Compiled twice - a single candidate (a simulated annealing move) is faster
+# without the cost of starting the parallel loop
+if numba is not None:
+    _lowered_kernel_jit = numba.njit(cache = True)(_lowered_kernel_loops)
+    _lowered_kernel_parallel = numba.njit(parallel = True, cache = True)(_lowered_kernel_loops)
+
+'''
+Function:       _lowered_kernel_numpy
+Args:           Same as _lowered_kernel_loops, without the result arrays
+Return:         outputs, on_min, off_max (see _lowered_kernel_loops)
+Description:    Pure NumPy evaluation of the lowered netlist, used by the 
+                "numba" backend when Numba is not installed.  The loop over 
+                nodes stays in Python, but each node is computed for all
+                candidates and rows at once.
+'''
+def _lowered_kernel_numpy(node_codes, node_fanin, node_gates, output_node, gate_params, input_levels, on_rows, off_rows, unit_conversion):
+
+    num_nodes = node_codes.shape[0]
+    values = [None] * num_nodes
+
+    for i in range(num_nodes):
+        code = node_codes[i]
+        if code == CODE_INPUT:
+            values[i] = input_levels[i]
+        elif code == CODE_OUTPUT:
+            values[i] = values[node_fanin[i, 0]]
+        else:
+            x = values[node_fanin[i, 0]]
+            if code == CODE_NOR:
+                x = x + values[node_fanin[i, 1]]
+            params = gate_params[:, node_gates[i], :, np.newaxis]
+            values[i] = f_response(x, params[:, 0], params[:, 1], params[:, 2], params[:, 3])
+
+    outputs = np.broadcast_to(values[output_node] * unit_conversion, (gate_params.shape[0], input_levels.shape[1]))
+    on_min = np.min(outputs, axis = 1, initial = 1e9, where = on_rows)
+    off_max = np.max(outputs, axis = 1, initial = -1, where = off_rows)
+
+    return outputs, on_min, off_max
+
+# Matches either a complete JSON string (kept as is) or a comma followed only by
+# whitespace and a closing bracket (a trailing comma, which is dropped)
+_TRAILING_COMMA = re.compile(r'("(?:[^"\\]|\\.)*")|,(\s*[\]}])')
+
+'''
+Function:       _remove_trailing_commas
+Args:           dirty_data: JSON text
+Return:         The text without trailing commas inside objects and arrays
+Description:    Tokenizer-aware clean up - commas inside strings are left alone.
+'''
+def _remove_trailing_commas(dirty_data):
+    return _TRAILING_COMMA.sub(lambda match: match.group(1) or match.group(2), dirty_data)
 
 '''
 Function:       _fix_input_json
@@ -70,7 +268,11 @@ Args:           input_fp: File pointer to the target JSON
                 final_trailing_comma: Flag to indicate cleanup
 Description:    Clean up of netlist JSONs produced during Cello queries.
                 This is from cello api, just pulled the code here to make it 
-                easier to use, but all credit goes to WR Jackson.
+                easier to use, but all credit goes to WR Jackson.  The original
+                version parsed the cleaned up text with YAML (a superset of 
+                JSON), which is very slow in pure Python.  The text is now 
+                repaired and parsed with the json module, in increasingly 
+                expensive steps, and YAML is only used as a last resort.
 '''
 def _fix_input_json(input_fp: str, final_trailing_comma: bool = False,) -> Union[List[Dict], Dict]:
     """
@@ -94,15 +296,38 @@ def _fix_input_json(input_fp: str, final_trailing_comma: bool = False,) -> Union
         dirty_data = dirty_data.replace("\t", "")
         # There is (only sometimes!) a final trailing comma on the outside of
         # the entire JSON structure that can't be handled by the YAML superset!
-        # Depends on the file for some reason!
+        # Depends on the file for some reason!  Only drop it if it is really
+        # there, so a file without one is not truncated.
         if final_trailing_comma:
-            idx = dirty_data.rfind(",")
-            dirty_data = dirty_data[:idx]
+            dirty_data = dirty_data.rstrip()
+            if dirty_data.endswith(","):
+                dirty_data = dirty_data[:-1]
+        # Fast path - the remaining text is usually valid JSON already
+        try:
+            return json.loads(dirty_data)
+        except ValueError:
+            pass
+        # Next, drop any trailing commas inside objects and arrays
+        try:
+            return json.loads(_remove_trailing_commas(dirty_data))
+        except ValueError:
+            pass
+        # Last resort, the YAML superset handles the other oddities
         data = yaml.load(dirty_data, Loader=yaml.FullLoader)
         # Generally, these kind of things are structured dictionaries but the
         # input JSONs are mangled so it's a coin flip.
         return data
 
+''' 
+Class:          Malformed_Netlist_Error
+Description:    Raised when the netlist JSON does not describe a valid circuit,
+                i.e. an edge references a node that does not exist, a node has
+                the wrong number of inputs for its type, or the gates form a
+                feedback loop that cannot be simulated.
+'''
+class Malformed_Netlist_Error(ValueError):
+    pass
+
 # ------------------------------- NODE DEFINITION ------------------------------
 
 ''' 
@@ -118,10 +343,15 @@ class Node():
         self.name = name                # Name of node (i.e. S4_SrpR)         
         self.tag = tag                  # Numerical ID of node, used for 
                                         # keeping track of next/prev nodes)
+        self.index = -1                 # Position of the node in the node
+                                        # list of the netlist
 
         self.func = None                # Boolean function implemented in node
         self.resfunc = None             # Sigmoidal response function 
                                         # implemented in node
+        self.params = None              # Row [ymax, ymin, K, n] of a bound
+                                        # Repressor_Table - when set, used in
+                                        # place of the resfunc parameters
         self.func_out = -1              # Node output calculated using either
                                         # the digital or genetic behavior
         
@@ -196,12 +426,19 @@ class Node():
 
         elif circuit_type == "GENETIC":
 
-            if self.type == "NOT":
-                self.func_out = self.resfunc.f(self.prev_nodes[0].func_out)
-            elif self.type == "NOR":
-                self.func_out = self.resfunc.f(self.prev_nodes[0].func_out + self.prev_nodes[1].func_out)
-            elif self.type == "PRIMARY_OUTPUT":
+            if self.type == "PRIMARY_OUTPUT":
                 self.func_out = self.prev_nodes[0].func_out
+                return
+            elif self.type == "NOT":
+                x = self.prev_nodes[0].func_out
+            elif self.type == "NOR":
+                x = self.prev_nodes[0].func_out + self.prev_nodes[1].func_out
+
+            # Read the parameters straight from the bound table if there is one
+            if self.params is not None:
+                self.func_out = f_response(x, self.params[0], self.params[1], self.params[2], self.params[3])
+            else:
+                self.func_out = self.resfunc.f(x)
  
     '''
     Function:       get_node_output
@@ -225,6 +462,24 @@ class Node():
 
 # ------------------------- NETLIST_PARSER DEFINITION --------------------------
 
+'''
+Class:          Netlist_State
+Description:    Memento of the simulation state of a Netlist_Parser - the gate
+                parameters, the cached node outputs, genetic truth table and
+                score - taken by Netlist_Parser.snapshot.
+'''
+class Netlist_State():
+
+    def __init__(self):
+        self.params = None                  # Copy of the gate parameters
+        self.node_outputs = None            # func_out of each scheduled node
+        self.genetic_outputs = None         # Genetic output of every row
+        self.genetic_truth_table = None     # Genetic truth table
+        self.circuit_score = 0              # Score, log score, and the
+        self.log_circuit_score = 0          # ON_MIN/OFF_MAX it came from
+        self.ON_MIN = 0
+        self.OFF_MAX = 0
+
 ''' 
 Class:          Netlist_Parser
 Description:    Builds a linked-list data structure to represent digital/genetic
@@ -240,18 +495,72 @@ Description:    Builds a linked-list data structure to represent digital/genetic
 ''' 
 class Netlist_Parser():
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, backend = "numpy"):
         self.filepath = filepath            # Path to the input netlist JSON
 
+        if backend not in GENETIC_BACKENDS:
+            raise ValueError("Unknown genetic backend %s, expected one of: %s" % (backend, ", ".join(GENETIC_BACKENDS)))
+
+        self.backend = backend              # How the vectorized genetic model
+                                            # is evaluated - node by node in
+                                            # NumPy ("numpy"), or by a kernel
+                                            # compiled with Numba ("numba")
+        self.clear_netlist()
+
+    '''
+    Function:       clear_netlist
+    Args:           None
+    Return:         None
+    Description:    Resets the parser to an empty circuit - no nodes, schedule,
+                    truth tables or score.  Called by the constructor, and by 
+                    parse_netlist to start over after a failed cache load.
+    '''
+    def clear_netlist(self):
+
+        self.lowered_netlist = None         # Integer array form of the circuit
+
         self.node_list = []                 # List of Nodes in the circuit
+        self.node_index = {}                # Nodes indexed by tag (i.e. $1)
         self.inputs = []                    # List of Input Nodes
         self.output = []                    # List of Output Node(s)
         self.gates = []                     # List of Gates in the Circuit
+        self.eval_order = []                # Gates and Output(s) sorted so
+                                            # every node comes after all of
+                                            # its inputs (topological order)
+        self.num_inputs = 0                 # Number of Input Nodes
+        self.input_combinations = []        # All 2^num_inputs logical inputs
+        self.input_matrix = None            # Same combinations as a 2^n x n
+                                            # NumPy array (row = combination)
+        self.input_levels = None            # Genetic value of each input for
+                                            # every combination (cached)
+        self.fanin_ptr = None               # CSR-style adjacency of the nodes,
+        self.fanin_idx = None               # by position in self.node_list:
+        self.fanout_ptr = None              # the inputs of node i are
+        self.fanout_idx = None              # fanin_idx[fanin_ptr[i]:fanin_ptr[i + 1]]
+                                            # and likewise for its fan-out
+        self.gate_columns = {}              # Position of each gate (by tag) in
+                                            # self.gates, i.e. in the gate axis
+                                            # of a parameter array
+        self.fanout_cones = {}              # Cache of the nodes to re-simulate
+                                            # when a given set of gates changes
+        self.gate_table = None              # Repressor_Table the gates read
+                                            # their parameters from, if bound
+        self.gate_rows = None               # Row of the bound table for each
+                                            # gate, in the order of self.gates
+        self.fingerprint = None             # Hash of the circuit structure
 
         self.truth_table = {}               # I/O relationship assuming the 
                                             # circuit is a digital circuit
         self.genetic_truth_table = {}       # I/O relationship using the fact 
                                             # the circuit is genetic circuit
+        self.logic_outputs = None           # Digital output of every row of
+                                            # the truth table (NumPy array)
+        self.on_rows = None                 # Masks of the rows with logical 1
+        self.off_rows = None                # and logical 0 outputs
+        self.genetic_outputs = None         # Genetic output of every row of
+                                            # the truth table (NumPy array)
+        self.rows_simulated = 0             # Rows simulated by the last
+                                            # bounded run
 
         self.circuit_score = 0              # Score of the circuit.  Defined as
                                             # ON_MIN/OFF_MAX - ratio of
@@ -261,6 +570,8 @@ class Netlist_Parser():
                                             # of genetic circuit corresponding 
                                             # to logical 0 output
         self.log_circuit_score = 0          # log10 of the score
+        self.ON_MIN = 0                     # Smallest logical 1 output and
+        self.OFF_MAX = 0                    # largest logical 0 output
 
     '''
     Function:       check_initialized
@@ -303,24 +614,47 @@ class Netlist_Parser():
     '''
     Function:       get_node
     Args:           tag: ID of requested node
-    Return:         Node with matching ID
+    Return:         Node with matching ID, or None if there is no such node
     Description:    Return the node in circuit with the requested ID (i.e. $1).
+                    Constant time lookup in the tag index.
     '''
     def get_node(self, tag):
 
-        for node in self.node_list:
-            if node.tag == tag:
-                return node
+        return self.node_index.get(tag)
 
     '''
     Function:       parse_netlist
     Args:           cleanup:    Flag indicating input JSON needs to be fixed 
                                 before processing
+                    cache_dir:  Directory of the compiled netlist cache, or
+                                None to always parse the JSON
     Return:         None
     Description:    Processes the input netlist JSON, extracting the node info
                     from the JSON and building the linked list data structure.
+                    If a cache directory is given, the compiled circuit is 
+                    looked up by the SHA-256 hash of the netlist file contents
+                    and loaded from there when present; otherwise the JSON is
+                    parsed as usual and the compiled circuit (including its
+                    digital truth table) is saved for next time.
     '''
-    def parse_netlist(self, cleanup = False):
+    def parse_netlist(self, cleanup = False, cache_dir = None):
+
+        if cache_dir is not None:
+
+            cache_path = self.get_cache_path(cache_dir, cleanup)
+            if os.path.exists(cache_path):
+                try:
+                    self.load_compiled(cache_path)
+                    return
+                except Exception:
+                    # Unreadable or truncated cache file - start over from
+                    # the JSON, and overwrite it below
+                    self.clear_netlist()
+
+            self.parse_netlist(cleanup = cleanup)
+            self.run_circuit_logical_bitsliced()
+            self.save_compiled(cache_path)
+            return
 
         # If no clean-up of the input JSON is necessary, just get the data
         if cleanup == False:
@@ -337,8 +671,14 @@ class Netlist_Parser():
         for entry in data['nodes']:
             # Create a new node and extract the required parameters
             new_node = Node(nodeType = entry['nodeType'], name = entry['deviceName'], tag = entry['name'])
-            # Append the node to the list of all circuit nodes
+
+            if new_node.tag in self.node_index:
+                raise Malformed_Netlist_Error("Node %s appears more than once in the netlist" % new_node.tag)
+
+            # Append the node to the list of all circuit nodes, and index it
+            new_node.index = len(self.node_list)
             self.node_list.append(new_node)
+            self.node_index[new_node.tag] = new_node
 
         # Look for the JSON field labeled edges - for each entry in this field:
         for entry in data['edges']:
@@ -351,6 +691,9 @@ class Netlist_Parser():
             dest_tag = entry['dst']
             dest_node = self.get_node(dest_tag)
 
+            if source_node is None or dest_node is None:
+                raise Malformed_Netlist_Error("Edge %s -> %s references a node that is not in the netlist" % (source_tag, dest_tag))
+
             # Perform linking - dest_node is in next_nodes list of source_node,
             # and source_node is in prev_nodes list of dest_node.  This linking
             # is crucial towards "populating" the circuit with function values.
@@ -359,6 +702,20 @@ class Netlist_Parser():
 
         # For completeness, categorize each node by type - this will be helpful
         # in populating the circuit later.
+        self.categorize_nodes()
+
+        # Finally, build the evaluation schedule used by both simulators
+        self.compile_netlist()
+
+    '''
+    Function:       categorize_nodes
+    Args:           None
+    Return:         None
+    Description:    Sorts the nodes of the circuit into the inputs, output(s),
+                    and gates lists, in netlist order.
+    '''
+    def categorize_nodes(self):
+
         for node in self.node_list:
 
             if node.type == "PRIMARY_INPUT":
@@ -368,6 +725,182 @@ class Netlist_Parser():
             elif node.type == "NOT" or node.type == "NOR":
                 self.gates.append(node)
 
+    '''
+    Function:       get_cache_path
+    Args:           cache_dir:  Directory of the compiled netlist cache
+                    cleanup:    Flag passed to parse_netlist
+    Return:         Path of the cache file for the current netlist contents
+    Description:    The key is the SHA-256 hash of the netlist file, along with
+                    the cleanup flag and the cache format version, so editing
+                    the netlist (or regenerating it with Cello) never hits a 
+                    stale entry.
+    '''
+    def get_cache_path(self, cache_dir, cleanup):
+
+        digest = hashlib.sha256()
+        digest.update(b"netlist-cache-v%d-cleanup-%d\n" % (NETLIST_CACHE_VERSION, bool(cleanup)))
+        with open(self.filepath, "rb") as netlist_file:
+            digest.update(netlist_file.read())
+
+        return os.path.join(cache_dir, digest.hexdigest() + ".npz")
+
+    '''
+    Function:       save_compiled
+    Args:           cache_path: Path of the cache file to write
+    Return:         None
+    Description:    Saves the compiled circuit as a single uncompressed .npz 
+                    file: the type, device name and tag of every node, the CSR
+                    fan-in/fan-out arrays (which keep the order of every 
+                    prev_nodes and next_nodes list), the evaluation schedule,
+                    and the digital truth table if it has been computed.  The
+                    file is written under a temporary name and then renamed,
+                    so a concurrent reader never sees a partial file.
+    '''
+    def save_compiled(self, cache_path):
+
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok = True)
+
+        if self.logic_outputs is not None:
+            logic_outputs = np.asarray(self.logic_outputs, dtype = np.int8)
+        else:
+            logic_outputs = np.zeros(0, dtype = np.int8)
+
+        temp_path = cache_path + ".%d.tmp" % os.getpid()
+        with open(temp_path, "wb") as cache_file:
+            np.savez(cache_file,
+                     node_types = np.array([node.type for node in self.node_list]),
+                     node_names = np.array([node.name for node in self.node_list]),
+                     node_tags = np.array([node.tag for node in self.node_list]),
+                     fanin_ptr = self.fanin_ptr,
+                     fanin_idx = self.fanin_idx,
+                     fanout_ptr = self.fanout_ptr,
+                     fanout_idx = self.fanout_idx,
+                     eval_order = np.array([node.index for node in self.eval_order], dtype = np.int64),
+                     logic_outputs = logic_outputs)
+        os.replace(temp_path, cache_path)
+
+    '''
+    Function:       load_compiled
+    Args:           cache_path: Path of a cache file written by save_compiled
+    Return:         None
+    Description:    Rebuilds the circuit from a cache file instead of the JSON.
+                    The nodes are recreated and linked from the CSR arrays, the
+                    stored evaluation schedule is reused as is (it was checked
+                    when the file was written), and the truth table is restored
+                    so the logical simulation does not need to be rerun.
+    '''
+    def load_compiled(self, cache_path):
+
+        with np.load(cache_path, allow_pickle = False) as data:
+            node_types = data["node_types"].tolist()
+            node_names = data["node_names"].tolist()
+            node_tags = data["node_tags"].tolist()
+            fanin_ptr = data["fanin_ptr"].tolist()
+            fanin_idx = data["fanin_idx"].tolist()
+            fanout_ptr = data["fanout_ptr"].tolist()
+            fanout_idx = data["fanout_idx"].tolist()
+            eval_order = data["eval_order"].tolist()
+            logic_outputs = data["logic_outputs"]
+
+        for node_type, name, tag in zip(node_types, node_names, node_tags):
+            new_node = Node(nodeType = node_type, name = name, tag = tag)
+            new_node.index = len(self.node_list)
+            self.node_list.append(new_node)
+            self.node_index[tag] = new_node
+
+        for i, node in enumerate(self.node_list):
+            node.prev_nodes = [self.node_list[j] for j in fanin_idx[fanin_ptr[i]:fanin_ptr[i + 1]]]
+            node.next_nodes = [self.node_list[j] for j in fanout_idx[fanout_ptr[i]:fanout_ptr[i + 1]]]
+
+        self.categorize_nodes()
+        self.compile_netlist(eval_order = [self.node_list[i] for i in eval_order])
+
+        if len(logic_outputs) == len(self.input_combinations):
+            self.set_logic_outputs(logic_outputs.astype(int))
+
+    '''
+    Function:       compile_netlist
+    Args:           eval_order: Evaluation schedule of a circuit that has 
+                                already been checked (from the compiled 
+                                netlist cache), or None to build it
+    Return:         None
+    Description:    Builds everything the simulators need from the linked 
+                    nodes: the evaluation schedule (see sort_netlist), the CSR
+                    adjacency arrays, the gate columns, and all 2^n logical
+                    input combinations.  Called once at the end of 
+                    parse_netlist, and by load_compiled.
+    '''
+    def compile_netlist(self, eval_order = None):
+
+        if eval_order is not None:
+            self.eval_order = eval_order
+        else:
+            self.sort_netlist()
+
+        # Export the edges as compact CSR-style integer arrays as well
+        self.fanin_ptr, self.fanin_idx = _build_csr([node.prev_nodes for node in self.node_list])
+        self.fanout_ptr, self.fanout_idx = _build_csr([node.next_nodes for node in self.node_list])
+        self.gate_columns = {node.tag: i for i, node in enumerate(self.gates)}
+
+        # Generate all possible combinations of logical inputs: 2^num_inputs
+        self.num_inputs = len(self.inputs)
+        self.input_combinations = list(itertools.product([0, 1], repeat = self.num_inputs))
+        self.input_matrix = np.array(self.input_combinations, dtype = np.int8).reshape(len(self.input_combinations), self.num_inputs)
+
+    '''
+    Function:       sort_netlist
+    Args:           None
+    Return:         None
+    Description:    Builds the evaluation schedule of the circuit.  Every node
+                    is checked for the correct number of inputs for its type,
+                    then the nodes are sorted in topological order (Kahn's 
+                    algorithm) so that each gate appears after all of the nodes
+                    that drive it.  The simulators can then update every node
+                    in a single pass over self.eval_order instead of repeatedly
+                    sweeping the gate list until all outputs are valid.  A 
+                    netlist containing a feedback loop cannot be ordered, and
+                    is rejected with a Malformed_Netlist_Error.  Called by
+                    compile_netlist.
+    '''
+    def sort_netlist(self):
+
+        # Number of inputs expected for each type of node
+        expected_inputs = {"PRIMARY_INPUT": 0, "NOT": 1, "NOR": 2, "PRIMARY_OUTPUT": 1}
+
+        for node in self.node_list:
+            if node.type not in expected_inputs:
+                raise Malformed_Netlist_Error("Node %s has unsupported type %s" % (node.tag, node.type))
+            if len(node.prev_nodes) != expected_inputs[node.type]:
+                raise Malformed_Netlist_Error("Node %s of type %s has %d input(s), expected %d" % (node.tag, node.type, len(node.prev_nodes), expected_inputs[node.type]))
+
+        if not self.output:
+            raise Malformed_Netlist_Error("Netlist has no PRIMARY_OUTPUT node")
+
+        # Count the unresolved inputs of each node, starting from the nodes
+        # with no inputs at all (the primary inputs)
+        num_pending = {node.tag: len(node.prev_nodes) for node in self.node_list}
+        ordered_nodes = [node for node in self.node_list if num_pending[node.tag] == 0]
+
+        # A node is ready as soon as all of its inputs have been ordered.  Note
+        # that a NOR gate driven twice by the same node appears twice in the 
+        # next_nodes list of that node, so the counts still work out.
+        i = 0
+        while i < len(ordered_nodes):
+            for next_node in ordered_nodes[i].next_nodes:
+                num_pending[next_node.tag] -= 1
+                if num_pending[next_node.tag] == 0:
+                    ordered_nodes.append(next_node)
+            i += 1
+
+        # Any node that never became ready is part of (or fed by) a cycle
+        if len(ordered_nodes) != len(self.node_list):
+            stuck_tags = [node.tag for node in self.node_list if num_pending[node.tag] > 0]
+            raise Malformed_Netlist_Error("Netlist contains a feedback loop through node(s): " + ", ".join(stuck_tags))
+
+        self.eval_order = [node for node in ordered_nodes if node.type != "PRIMARY_INPUT"]
+
     '''
     Function:       populate_input_values
     Args:           input_records:  Input signal records from Input_Processor
@@ -377,6 +910,9 @@ class Netlist_Parser():
     '''
     def populate_input_values(self, input_records):
 
+        # The genetic input values change, so the cached ones are outdated
+        self.input_levels = None
+
         # For each input node in circuit, look to see if it appears in the input
         # records - if it does, get the required parameters
         for node in self.inputs:
@@ -399,8 +935,39 @@ class Netlist_Parser():
         for node in self.gates:
             if node.name in gate_records:
                 current_record = gate_records[node.name]
-                # Populate the node's response function with the parameters
-                node.resfunc = ResponseFunction(ymax = current_record.ymax, ymin = current_record.ymin, K = current_record.K, n = current_record.n)
+                # Populate the node's response function with the parameters,
+                # updating the existing one in place if there is one
+                if node.resfunc is None:
+                    node.resfunc = ResponseFunction(ymax = current_record.ymax, ymin = current_record.ymin, K = current_record.K, n = current_record.n)
+                else:
+                    node.resfunc.update(ymax = current_record.ymax, ymin = current_record.ymin, K = current_record.K, n = current_record.n)
+
+    '''
+    Function:       bind_parameter_table
+    Args:           gate_table: Repressor_Table holding the gate parameters
+    Return:         None
+    Description:    Points each gate at its row of the table, so that the 
+                    simulators read the response function parameters directly
+                    from the table.  Changes to the table (i.e. a proposed move
+                    or Repressor_Table.restore) are then seen by the next 
+                    simulation without repopulating the circuit.
+    '''
+    def bind_parameter_table(self, gate_table):
+
+        # Node outputs computed from the response functions may differ in the
+        # last bit from the table's, so resimulate_gates cannot reuse them
+        self.genetic_outputs = None
+
+        self.gate_table = gate_table
+        for node in self.gates:
+            if node.name in gate_table.index:
+                node.params = gate_table.params[gate_table.index[node.name]]
+
+        # Row of the table for each gate, if the table covers every gate (the
+        # rows of a previously bound table must not be kept)
+        self.gate_rows = None
+        if all(node.name in gate_table.index for node in self.gates):
+            self.gate_rows = np.array([gate_table.index[node.name] for node in self.gates], dtype = int)
 
     '''
     Function:       populate_output_converters
@@ -422,82 +989,198 @@ class Netlist_Parser():
     Function:       run_circuit_logical
     Args:           None
     Return:         None
-    Description:    Simulates the digital model of the circuit.  The underlying
-                    algorithm is definitely not efficient, but due to the small
-                    # of gates in the circuit, meets performance expecations.
-                    Essentially, the algorithm is a three-step algorithm:
+    Description:    Simulates the digital model of the circuit.  For each of the
+                    2^n logical inputs:
                     1) Assign a signal value to each input signal.
-                    2) Update each single-input gate (i.e. NOT gate) that is 
-                    directly tied to a circuit input signal - essentially 
-                    "propagate" the circuit values upward.
-                    3) Iterate over all remaining gates, attempting to generate
-                    an output signal if the input signal(s) to the current gate
-                    are valid.  In principle, this is the most expensive part of
-                    the algorithm: O(n^2) if there are n gates remaining after
-                    the first two steps.  In practice, given that n is small
-                    and sometimes the ordering of the gates in the gate list
-                    is conducive towards fast computation (i.e. gates that can
-                    be updated appear earlier in the list!), the cost is very
-                    small - it would be worth exploring more efficient
-                    algorithms here, especially for more advanced circuits.
+                    2) Walk the evaluation schedule built by compile_netlist,
+                    updating each gate (and finally the output) from the 
+                    outputs of its predecessors.  Since the schedule is in
+                    topological order, the inputs of every node are valid by
+                    the time it is reached, so a single pass is enough - O(n)
+                    per row for a circuit with n gates.
     '''
     def run_circuit_logical(self):
 
-        num_inputs = 0
-        circuit_output = 0
-
-        # Determine the number of input signals
-        for node in self.node_list:
-            if node.type == "PRIMARY_INPUT":
-                num_inputs += 1
-   
-        # Generate all possible combinations of logical inputs: 2^num_inputs
-        inputs = list(itertools.product([0, 1], repeat = num_inputs))
+        # Node outputs are overwritten, so cached per-row genetic outputs from
+        # a vectorized run can no longer be reused by resimulate_gates
+        self.genetic_outputs = None
 
         # For each potential logical input
-        for current_input in inputs:
-
-            # Make sure to reset the output of each node after each iteration!
-            for node in self.node_list:
-                node.func_out = -1
+        for current_input in self.input_combinations:
 
             # First assign values to each of the input signals
-            for i in range(0, num_inputs):
+            for i in range(0, self.num_inputs):
                 self.inputs[i].func_out = current_input[i]
 
-            # Second, populate all gates that are directly tied to the inputs
-            for input_node in self.inputs:
-
-                # For each of the next gates
-                for next_node in input_node.next_nodes:
-                    # If the next gate is a NOT gate, directly populate output
-                    if next_node.type == "NOT":
-                        next_node.update_node_output("DIGITAL")
-
-                    # Else if the next gate is a NOR gate can only populate the
-                    # output if both of its predecessors are primary inputs
-                    elif next_node.type == "NOR" and next_node.prev_nodes[0].type == "PRIMARY_INPUT" and next_node.prev_nodes[1].type == "PRIMARY_INPUT":
-                        next_node.update_node_output("DIGITAL")
-            
-            #for node in self.node_list:
-            #    print("NODE TAG = " + node.tag + " OUTPUT = " + str(node.func_out))
-
-            # Third, "flow upwards" until all gates are populated - 
-            # While there are still unitialized nodes:
-            while self.check_initalized() != 0:
-                # For each node in the gate list
-                for node in self.gates:
-                    # If NOT gate was identified & has a valid input, update
-                    if node.func_out == -1 and node.type == "NOT" and node.prev_nodes[0].func_out != -1:
-                        node.update_node_output("DIGITAL")
-                    # Else if NOR gate was identified & has valid inputs, update
-                    elif node.func_out == -1 and node.type == "NOR" and node.prev_nodes[0].func_out != -1 and node.prev_nodes[1].func_out != -1:
-                        node.update_node_output("DIGITAL")
+            # Second, update every gate and the output in topological order
+            for node in self.eval_order:
+                node.update_node_output("DIGITAL")
 
             # Caluclate the circuit output and populate the Boolean truth table
-            circuit_output = self.output[0].get_node_output()
+            circuit_output = self.output[0].func_out
             self.truth_table[current_input] = circuit_output
 
+        # Keep the logical outputs as an array as well, for vectorized scoring
+        self.set_logic_outputs(np.array([self.truth_table[current_input] for current_input in self.input_combinations]))
+        _TRUTH_TABLE_CACHE[self.get_fingerprint()] = self.logic_outputs
+
+    '''
+    Function:       run_circuit_logical_bitsliced
+    Args:           None
+    Return:         None
+    Description:    Bit-parallel version of run_circuit_logical.  Each node's
+                    outputs for all 2^n rows of the truth table are packed 
+                    into an array of bits (8 rows per byte, via np.packbits),
+                    so NOT and NOR become bitwise operations over whole packed
+                    arrays and the circuit is simulated for every row in a 
+                    single pass over the evaluation schedule.  Produces the 
+                    same truth table as run_circuit_logical, which keeps 
+                    exhaustive checking of circuits with many inputs cheap.
+                    Node outputs (func_out) are not modified.  The truth table
+                    only depends on the structure of the circuit, so it is 
+                    memoized by structural fingerprint for the whole process:
+                    a circuit identical to one already simulated (e.g. the 
+                    same design returned by Cello for another signal set) 
+                    skips the simulation entirely.
+    '''
+    def run_circuit_logical_bitsliced(self):
+
+        fingerprint = self.get_fingerprint()
+        if fingerprint in _TRUTH_TABLE_CACHE:
+            self.set_logic_outputs(_TRUTH_TABLE_CACHE[fingerprint])
+            return
+
+        num_rows = len(self.input_combinations)
+
+        # Pack the column of each input signal into bits
+        packed_outputs = {}
+        for i, input_node in enumerate(self.inputs):
+            packed_outputs[input_node.tag] = np.packbits(self.input_matrix[:, i].astype(bool))
+
+        # Update every gate and the output in topological order
+        for node in self.eval_order:
+            if node.type == "NOT":
+                packed_outputs[node.tag] = ~packed_outputs[node.prev_nodes[0].tag]
+            elif node.type == "NOR":
+                packed_outputs[node.tag] = ~(packed_outputs[node.prev_nodes[0].tag] | packed_outputs[node.prev_nodes[1].tag])
+            elif node.type == "PRIMARY_OUTPUT":
+                packed_outputs[node.tag] = packed_outputs[node.prev_nodes[0].tag]
+
+        # Unpack the circuit output (dropping the padding bits of the last 
+        # byte) and populate the Boolean truth table
+        self.set_logic_outputs(np.unpackbits(packed_outputs[self.output[0].tag], count = num_rows).astype(int))
+        _TRUTH_TABLE_CACHE[fingerprint] = self.logic_outputs
+
+    '''
+    Function:       set_logic_outputs
+    Args:           logic_outputs:  Digital output of every row of the truth
+                                    table, in the order of input_combinations
+    Return:         None
+    Description:    Populates the Boolean truth table and the ON/OFF row masks
+                    from an array of logical outputs.  The array is stored 
+                    read-only, since it may be shared with other circuits 
+                    through the truth table cache.
+    '''
+    def set_logic_outputs(self, logic_outputs):
+
+        logic_outputs.flags.writeable = False
+        self.logic_outputs = logic_outputs
+        self.truth_table = dict(zip(self.input_combinations, logic_outputs.tolist()))
+        self.on_rows = logic_outputs == 1
+        self.off_rows = logic_outputs == 0
+
+    '''
+    Function:       get_fingerprint
+    Args:           None
+    Return:         Structural fingerprint of the circuit (hex string)
+    Description:    Hashes the circuit bottom-up in evaluation order: an input
+                    hashes to its position in self.inputs (which fixes the 
+                    column order of the truth table), and every other node to
+                    its type and the hashes of its inputs, with the two inputs
+                    of a NOR sorted since NOR is symmetric.  Tags, device 
+                    names and the order of the netlist entries do not matter,
+                    so two circuits with the same fingerprint compute the same
+                    digital truth table.  Computed once, then cached; see 
+                    hash_nodes.
+    '''
+    def get_fingerprint(self):
+
+        if self.fingerprint is None:
+            self.fingerprint = self.hash_circuit(self.hash_nodes())
+        return self.fingerprint
+
+    '''
+    Function:       get_parameter_form
+    Args:           None
+    Return:         Hash of the circuit structure and parameters (hex string),
+                    and the hash of each gate, in the order of self.gates
+    Description:    Like get_fingerprint, but every node is also hashed with 
+                    the parameters it is currently populated with - an input
+                    with its high and low levels (instead of its position, as
+                    the score does not depend on the row order of the truth 
+                    table), a gate with its [ymax, ymin, K, n] and the output
+                    with its unit conversion.  Device names are not hashed, so
+                    two netlists built from different sensors and repressors
+                    with the same parameters have the same form, and the hash
+                    of a gate finds the matching gate of the other netlist.
+                    Not cached, as the parameters change during annealing.
+    '''
+    def get_parameter_form(self):
+
+        node_hashes = self.hash_nodes(with_params = True)
+        return self.hash_circuit(node_hashes), [node_hashes[node.tag].hex() for node in self.gates]
+
+    '''
+    Function:       hash_nodes
+    Args:           with_params: Flag to include the node parameters in the
+                                 hash (see get_parameter_form)
+    Return:         Dictionary of the SHA-256 of each node (bytes), by tag
+    Description:    Hashes every node bottom-up in evaluation order, from its
+                    type (and parameters) and the hashes of its inputs, with 
+                    the two inputs of a NOR sorted since NOR is symmetric.
+    '''
+    def hash_nodes(self, with_params = False):
+
+        node_hashes = {}
+        for i, input_node in enumerate(self.inputs):
+            if with_params:
+                node_label = b"PRIMARY_INPUT " + np.array([input_node.high, input_node.low], dtype = np.float64).tobytes()
+            else:
+                node_label = b"PRIMARY_INPUT %d" % i
+            node_hashes[input_node.tag] = hashlib.sha256(node_label).digest()
+
+        if with_params:
+            gate_params = dict(zip([node.tag for node in self.gates], self.get_gate_parameters()))
+
+        for node in self.eval_order:
+            child_hashes = [node_hashes[prev_node.tag] for prev_node in node.prev_nodes]
+            if node.type == "NOR":
+                child_hashes.sort()
+            node_label = node.type.encode()
+            if with_params and node.type == "PRIMARY_OUTPUT":
+                node_label += np.float64(node.unit_conversion).tobytes()
+            elif with_params:
+                node_label += np.asarray(gate_params[node.tag], dtype = np.float64).tobytes()
+            node_hashes[node.tag] = hashlib.sha256(node_label + b"".join(child_hashes)).digest()
+
+        return node_hashes
+
+    '''
+    Function:       hash_circuit
+    Args:           node_hashes: Hashes returned by hash_nodes
+    Return:         SHA-256 of the circuit (hex string)
+    Description:    Only the outputs (and so the nodes driving them) are part
+                    of the hash, as the other nodes cannot change the score.
+                    Shared by get_fingerprint and get_parameter_form.
+    '''
+    def hash_circuit(self, node_hashes):
+
+        digest = hashlib.sha256(b"%d inputs " % self.num_inputs)
+        for output_node in self.output:
+            digest.update(node_hashes[output_node.tag])
+
+        return digest.hexdigest()
+
     '''
     Function:       run_circuit_genetic
     Args:           None
@@ -509,27 +1192,17 @@ class Netlist_Parser():
     '''
     def run_circuit_genetic(self):
 
-        num_inputs = 0
-        circuit_output = 0.0
+        # Node outputs are overwritten, so cached per-row genetic outputs from
+        # a vectorized run can no longer be reused by resimulate_gates
+        self.genetic_outputs = None
+        self.genetic_truth_table = {}
 
-        # Determine the number of input signals
-        for node in self.node_list:
-            if node.type == "PRIMARY_INPUT":
-                num_inputs += 1
-
-        # Generate all possible combinations of logical inputs: 2^num_inputs
-        inputs = list(itertools.product([0, 1], repeat = num_inputs))
-        
         # For each potential genetic input
-        for current_input in inputs:
-
-            # Make sure to reset the output of each node after each iteration!
-            for node in self.node_list:
-                node.func_out = -1
+        for current_input in self.input_combinations:
 
             # First assign values to each of the input signals
             # Need to map the Boolen values to genetic high/low values
-            for i in range(0, num_inputs):
+            for i in range(0, self.num_inputs):
                 if current_input[i] == 0:
                     self.inputs[i].func_out = self.inputs[i].low
                 elif current_input[i] == 1:
@@ -537,37 +1210,475 @@ class Netlist_Parser():
 
             inputs_genetic = tuple([node.func_out for node in self.inputs])
 
-            # Second, populate all gates that are directly tied to the inputs
-            for input_node in self.inputs:
-
-                # For each of the next gates
-                for next_node in input_node.next_nodes:
-                    # If the next gate is a NOT gate, directly populate output
-                    if next_node.type == "NOT":
-                        next_node.update_node_output("GENETIC")
-                        
-                    # Else if the next gate is a NOR gate can only populate the
-                    # output if both of its predecessors are primary inputs
-                    elif next_node.type == "NOR" and next_node.prev_nodes[0].type == "PRIMARY_INPUT" and next_node.prev_nodes[1].type == "PRIMARY_INPUT":
-                        next_node.update_node_output("GENETIC")
-                        
-            # Third, "flow upwards" until all gates are populated - 
-            # While there are still unitialized nodes:
-            while self.check_initalized() != 0:
-                
-                # For each node in the gate list
-                for node in self.gates:
-                    # If NOT gate was identified & has a valid input, update
-                    if node.func_out == -1 and node.type == "NOT" and node.prev_nodes[0].func_out != -1:
-                        node.update_node_output("GENETIC")
-                    # Else if NOR gate was identified & has valid inputs, update
-                    elif node.func_out == -1 and node.type == "NOR" and node.prev_nodes[0].func_out != -1 and node.prev_nodes[1].func_out != -1:
-                        node.update_node_output("GENETIC")
-                    
+            # Second, update every gate and the output in topological order
+            for node in self.eval_order:
+                node.update_node_output("GENETIC")
+
             # Calculate the overall output of the circuit and populate the genetic Truth table
-            circuit_output = self.output[0].get_node_output() * self.output[0].unit_conversion
+            circuit_output = self.output[0].func_out * self.output[0].unit_conversion
             self.genetic_truth_table[current_input] = [inputs_genetic, circuit_output, self.truth_table[current_input]]
- 
+
+    '''
+    Function:       run_circuit_genetic_vectorized
+    Args:           None
+    Return:         None
+    Description:    Vectorized version of run_circuit_genetic.  Instead of 
+                    simulating the circuit once per row of the truth table, 
+                    each input node is assigned a NumPy array holding its 
+                    high/low value for all 2^n rows, and the evaluation schedule
+                    is walked once - the response functions are applied to 
+                    whole arrays, so every node's func_out holds its output for
+                    every row.  Computes the score (ON_MIN, OFF_MAX) in the 
+                    same call, so there is no need to call calculate_score 
+                    afterwards; the genetic truth table is only built when
+                    get_genetic_truth_table asks for it.  Requires 
+                    run_circuit_logical to have been called first.
+    '''
+    def run_circuit_genetic_vectorized(self):
+
+        # First assign the high/low values of every row to each input signal
+        input_levels = self.get_input_levels()
+        for input_node, levels in zip(self.inputs, input_levels):
+            input_node.func_out = levels
+
+        # Second, update every gate and the output in topological order
+        if self.backend == "numpy":
+            for node in self.eval_order:
+                node.update_node_output("GENETIC")
+
+        # Or let the lowered kernel compute the output directly (the gate nodes
+        # are skipped, so their func_out is not updated)
+        elif self.backend == "numba":
+            outputs, _, _ = self.evaluate_lowered_kernel(self.get_gate_parameters()[np.newaxis], input_levels)
+            self.output[0].func_out = outputs[0] / self.output[0].unit_conversion
+
+        # Collect the outputs and score
+        self.update_genetic_truth_table()
+
+    '''
+    Function:       run_circuit_genetic_bounded
+    Args:           threshold: Score the circuit has to beat
+                    on_min_below: Bound ON_MIN has to be under
+                    off_max_above: Bound OFF_MAX has to be over
+    Return:         True if the circuit was fully simulated and scored, False
+                    if its score is known to be at most threshold
+    Description:    Version of run_circuit_genetic_vectorized that gives up on
+                    a circuit that cannot beat threshold - i.e. a Metropolis
+                    acceptance threshold, known before the circuit is 
+                    simulated.  First only the rows that set ON_MIN and OFF_MAX
+                    of the current outputs are simulated.  The smallest logical
+                    1 output of the full table can only be lower, and the 
+                    largest logical 0 output only higher, so their ratio bounds
+                    the score from above.  The run stops if the bound is at 
+                    most threshold and the two rows already pass the ON_MIN and
+                    OFF_MAX checks (which then hold for the full table as 
+                    well), leaving the circuit as it was.  Otherwise the circuit
+                    is simulated by run_circuit_genetic_vectorized.  Truth 
+                    tables of fewer than BOUNDED_MIN_ROWS rows (circuits of up
+                    to 6 inputs) always are - with them, the function is 
+                    only run_circuit_genetic_vectorized and never returns 
+                    False, as the two-row probe would not save any time.
+    '''
+    def run_circuit_genetic_bounded(self, threshold, on_min_below = np.inf, off_max_above = -np.inf):
+
+        input_levels = self.get_input_levels()
+        num_rows = input_levels.shape[1]
+
+        if num_rows >= BOUNDED_MIN_ROWS and self.genetic_outputs is not None:
+
+            # Rows that set ON_MIN and OFF_MAX of the current outputs
+            rows = []
+            if np.any(self.on_rows):
+                rows.append(np.argmin(np.where(self.on_rows, self.genetic_outputs, np.inf)))
+            if np.any(self.off_rows):
+                rows.append(np.argmax(np.where(self.off_rows, self.genetic_outputs, -np.inf)))
+            rows = np.array(rows)
+
+            # Simulate just those rows
+            if self.backend == "numpy":
+                outputs = {}
+                for input_node, levels in zip(self.inputs, input_levels):
+                    outputs[input_node.tag] = levels[rows]
+                for node in self.eval_order:
+                    if node.type == "PRIMARY_OUTPUT":
+                        outputs[node.tag] = outputs[node.prev_nodes[0].tag]
+                        continue
+                    elif node.type == "NOT":
+                        x = outputs[node.prev_nodes[0].tag]
+                    elif node.type == "NOR":
+                        x = outputs[node.prev_nodes[0].tag] + outputs[node.prev_nodes[1].tag]
+                    if node.params is not None:
+                        outputs[node.tag] = f_response(x, node.params[0], node.params[1], node.params[2], node.params[3])
+                    else:
+                        outputs[node.tag] = node.resfunc.f(x)
+                row_outputs = outputs[self.output[0].tag] * self.output[0].unit_conversion
+            elif self.backend == "numba":
+                kernel_outputs, _, _ = self.evaluate_lowered_kernel(self.get_gate_parameters()[np.newaxis], input_levels[:, rows], self.on_rows[rows], self.off_rows[rows])
+                row_outputs = kernel_outputs[0]
+
+            ON_MIN = np.min(row_outputs, initial = 1e9, where = self.on_rows[rows])
+            OFF_MAX = np.max(row_outputs, initial = -1, where = self.off_rows[rows])
+            self.rows_simulated = len(rows)
+
+            # Stop if the score cannot beat the threshold
+            if ON_MIN < on_min_below and OFF_MAX > off_max_above and OFF_MAX > 0 and ON_MIN / OFF_MAX <= threshold:
+                return False
+        else:
+            self.rows_simulated = 0
+
+        self.run_circuit_genetic_vectorized()
+        self.rows_simulated += num_rows
+
+        return True
+
+    '''
+    Function:       update_genetic_truth_table
+    Args:           None
+    Return:         None
+    Description:    Reads the per-row output array of the output node (left
+                    behind by a vectorized run) and scores the circuit from the
+                    arrays.  The genetic truth table is not filled here - with
+                    8 inputs building it row by row took most of the run time,
+                    and the optimizer only needs the score - it is dropped, and
+                    get_genetic_truth_table rebuilds it if something asks.
+    '''
+    def update_genetic_truth_table(self):
+
+        self.genetic_outputs = self.output[0].func_out * self.output[0].unit_conversion
+        self.genetic_truth_table = None
+
+        # Score the circuit directly from the arrays
+        self.score_outputs(self.genetic_outputs)
+
+    '''
+    Function:       get_genetic_truth_table
+    Args:           None
+    Return:         Genetic truth table - for every input combination, the
+                    genetic inputs, the genetic output and the logical output
+    Description:    Returns the genetic truth table, first building it from the
+                    per-row arrays if the last run was a vectorized one.  The 
+                    table is cached until the next run.
+    '''
+    def get_genetic_truth_table(self):
+
+        if self.genetic_truth_table is None:
+            genetic_truth_table = {}
+            for row, current_input in enumerate(self.input_combinations):
+                inputs_genetic = tuple([node.func_out[row] for node in self.inputs])
+                genetic_truth_table[current_input] = [inputs_genetic, self.genetic_outputs[row], self.truth_table[current_input]]
+            self.genetic_truth_table = genetic_truth_table
+
+        return self.genetic_truth_table
+
+    '''
+    Function:       get_fanout_cone
+    Args:           gate_names: Names of the gates that changed
+    Return:         List of nodes driven (directly or indirectly) by the named
+                    gates, including the gates themselves, in topological order
+    Description:    Follows the next_nodes links from each of the named gates to
+                    find every node whose output depends on them.  Only these
+                    nodes need to be re-simulated when the gates change.  The
+                    result is cached per set of gate names.
+    '''
+    def get_fanout_cone(self, gate_names):
+
+        cone_key = frozenset(gate_names)
+
+        if cone_key not in self.fanout_cones:
+
+            # Depth-first walk over the fan-out of the changed gates
+            cone_tags = set()
+            pending = [node for node in self.gates if node.name in cone_key]
+            while pending:
+                node = pending.pop()
+                if node.tag not in cone_tags:
+                    cone_tags.add(node.tag)
+                    pending.extend(node.next_nodes)
+
+            # Keep the topological order of the evaluation schedule
+            self.fanout_cones[cone_key] = [node for node in self.eval_order if node.tag in cone_tags]
+
+        return self.fanout_cones[cone_key]
+
+    '''
+    Function:       resimulate_gates
+    Args:           gate_records: Repressor records (by name) holding the new
+                    parameters, or None if the gates read their parameters 
+                    from a bound Repressor_Table that was already updated
+                    gate_names: Names of the gates whose records changed
+    Return:         None
+    Description:    Incremental version of run_circuit_genetic_vectorized.  The
+                    per-row outputs of every node from the previous vectorized
+                    run are kept in node.func_out, so after repopulating the 
+                    response functions of the changed gates, only the nodes in
+                    their fan-out cone are re-simulated - everything upstream
+                    or on other branches keeps its cached outputs.  The score
+                    is then updated.  Falls back to a full vectorized run if 
+                    there are no cached outputs yet - and so on every call 
+                    with the "numba" backend, whose kernel does not keep the
+                    outputs of the gates.
+    '''
+    def resimulate_gates(self, gate_records, gate_names):
+
+        # Repopulate the response functions of the changed gates only
+        for node in self.gates:
+            if gate_records is not None and node.name in gate_names and node.name in gate_records:
+                current_record = gate_records[node.name]
+                if node.resfunc is None:
+                    node.resfunc = ResponseFunction(ymax = current_record.ymax, ymin = current_record.ymin, K = current_record.K, n = current_record.n)
+                else:
+                    node.resfunc.update(ymax = current_record.ymax, ymin = current_record.ymin, K = current_record.K, n = current_record.n)
+
+        # Without cached per-row outputs there is nothing to reuse (the node
+        # outputs are only kept by the "numpy" backend)
+        if self.genetic_outputs is None or self.backend != "numpy":
+            self.run_circuit_genetic_vectorized()
+            return
+
+        # Update the fan-out cone of the changed gates in topological order
+        for node in self.get_fanout_cone(gate_names):
+            node.update_node_output("GENETIC")
+
+        self.update_genetic_truth_table()
+
+    '''
+    Function:       snapshot
+    Args:           state: Netlist_State to overwrite (avoids allocating a new
+                           one every time), or None
+    Return:         Netlist_State holding the current simulation state
+    Description:    Saves everything a vectorized run computes, so a rejected 
+                    change can be undone with restore instead of re-simulating
+                    the circuit.  Only the gate parameters are copied - every
+                    run stores new output arrays (and drops the genetic truth
+                    table) rather than modifying the old ones, so the state 
+                    just keeps references to them.
+    '''
+    def snapshot(self, state = None):
+
+        if state is None:
+            state = Netlist_State()
+
+        # Gate parameters - the whole bound table, or gathered per gate
+        if self.gate_table is not None:
+            if state.params is None or state.params.shape != self.gate_table.params.shape:
+                state.params = self.gate_table.params.copy()
+            else:
+                np.copyto(state.params, self.gate_table.params)
+        else:
+            state.params = self.get_gate_parameters()
+
+        state.node_outputs = [node.func_out for node in self.eval_order]
+        state.genetic_outputs = self.genetic_outputs
+        state.genetic_truth_table = self.genetic_truth_table
+        state.circuit_score = self.circuit_score
+        state.log_circuit_score = self.log_circuit_score
+        state.ON_MIN = self.ON_MIN
+        state.OFF_MAX = self.OFF_MAX
+
+        return state
+
+    '''
+    Function:       restore
+    Args:           state: Netlist_State from snapshot
+    Return:         None
+    Description:    Puts back the gate parameters, cached outputs, genetic 
+                    truth table and score saved in the state.
+    '''
+    def restore(self, state):
+
+        if self.gate_table is not None:
+            np.copyto(self.gate_table.params, state.params)
+        else:
+            for node, gate_params in zip(self.gates, state.params):
+                if node.params is not None:
+                    node.params[:] = gate_params
+                else:
+                    node.resfunc.update(ymax = gate_params[0], ymin = gate_params[1], K = gate_params[2], n = gate_params[3])
+
+        for node, func_out in zip(self.eval_order, state.node_outputs):
+            node.func_out = func_out
+        self.genetic_outputs = state.genetic_outputs
+        self.genetic_truth_table = state.genetic_truth_table
+        self.circuit_score = state.circuit_score
+        self.log_circuit_score = state.log_circuit_score
+        self.ON_MIN = state.ON_MIN
+        self.OFF_MAX = state.OFF_MAX
+
+    '''
+    Function:       get_input_levels
+    Args:           None
+    Return:         Array of shape (inputs, rows) - for each input node, the 
+                    genetic value (low/high) of that input for every truth
+                    table row
+    Description:    Maps the logical input combinations to genetic values.  The
+                    mapping is computed once and cached; populate_input_values
+                    clears the cache.
+    '''
+    def get_input_levels(self):
+
+        if self.input_levels is None:
+            self.input_levels = np.empty((self.num_inputs, len(self.input_combinations)))
+            for i, node in enumerate(self.inputs):
+                self.input_levels[i] = np.where(self.input_matrix[:, i] == 1, node.high, node.low)
+
+        return self.input_levels
+
+    '''
+    Function:       get_gate_parameters
+    Args:           None
+    Return:         Array of shape (number of gates, 4)
+    Description:    Returns the current response function parameters of every
+                    gate, in the order of self.gates, as rows of 
+                    [ymax, ymin, K, n].  This is the layout expected by
+                    score_population for each candidate.
+    '''
+    def get_gate_parameters(self):
+
+        # All gates bound to the same table - a single gather does it
+        if self.gate_rows is not None:
+            return self.gate_table.params[self.gate_rows]
+
+        gate_params = np.empty((len(self.gates), 4))
+        for i, node in enumerate(self.gates):
+            if node.params is not None:
+                gate_params[i] = node.params
+            else:
+                gate_params[i] = [node.resfunc.ymax, node.resfunc.ymin, node.resfunc.K, node.resfunc.n]
+        return gate_params
+
+    '''
+    Function:       score_population
+    Args:           gate_params: Array of shape (candidates, gates, 4) - for 
+                    each candidate parameter set, one [ymax, ymin, K, n] row
+                    per gate in the order of self.gates
+    Return:         Array of circuit scores (ON_MIN/OFF_MAX), one per candidate
+    Description:    Scores many candidate parameter sets in one pass.  Every 
+                    node output is a (candidates x rows) array, so the circuit
+                    is simulated for all candidates and all truth table rows at
+                    once, and the scores are reduced along the row axis.  The
+                    node outputs, truth tables and score of the circuit itself
+                    are NOT modified.  The ON_MIN/OFF_MAX of every candidate
+                    are kept in self.population_ON_MIN/OFF_MAX for the 
+                    physical realizability checks.  Requires 
+                    run_circuit_logical to have been called first.
+    '''
+    def score_population(self, gate_params):
+
+        gate_params = np.asarray(gate_params, dtype = np.float64)
+        num_candidates = gate_params.shape[0]
+
+        if self.backend == "numpy":
+
+            # Outputs of every node, by tag.  Inputs are the same for all 
+            # candidates (1-D, broadcast along the candidate axis)
+            outputs = {}
+            for input_node, input_levels in zip(self.inputs, self.get_input_levels()):
+                outputs[input_node.tag] = input_levels
+
+            # Update every gate and the output in topological order
+            for node in self.eval_order:
+
+                if node.type == "PRIMARY_OUTPUT":
+                    outputs[node.tag] = outputs[node.prev_nodes[0].tag]
+                    continue
+                elif node.type == "NOT":
+                    x = outputs[node.prev_nodes[0].tag]
+                elif node.type == "NOR":
+                    x = outputs[node.prev_nodes[0].tag] + outputs[node.prev_nodes[1].tag]
+
+                # Parameters of this gate for every candidate, as a column
+                params = gate_params[:, self.gate_columns[node.tag], :, np.newaxis]
+                outputs[node.tag] = f_response(x, params[:, 0], params[:, 1], params[:, 2], params[:, 3])
+
+            circuit_outputs = outputs[self.output[0].tag]
+
+        # The lowered kernel also does the reductions
+        elif self.backend == "numba":
+            _, self.population_ON_MIN, self.population_OFF_MAX = self.evaluate_lowered_kernel(gate_params, self.get_input_levels())
+            return self.population_ON_MIN / self.population_OFF_MAX
+
+        genetic_outputs = circuit_outputs * self.output[0].unit_conversion
+        genetic_outputs = np.broadcast_to(genetic_outputs, (num_candidates, len(self.input_combinations)))
+
+        # Reduce along the rows of the truth table for each candidate
+        self.population_ON_MIN = np.min(genetic_outputs, axis = 1, initial = 1e9, where = self.on_rows)
+        self.population_OFF_MAX = np.max(genetic_outputs, axis = 1, initial = -1, where = self.off_rows)
+
+        return self.population_ON_MIN / self.population_OFF_MAX
+
+    '''
+    Function:       lower_netlist
+    Args:           None
+    Return:         Dictionary of the arrays describing the circuit
+    Description:    Lowers the node graph to plain integer arrays, with the 
+                    nodes numbered in evaluation order (inputs first, then the
+                    evaluation schedule):
+                        node_codes:  type of each node (CODE_INPUT, CODE_NOT,
+                                     CODE_NOR or CODE_OUTPUT)
+                        node_fanin:  (nodes, 2) numbers of the nodes driving
+                                     each node, -1 where unused
+                        node_gates:  column of each gate in the parameter 
+                                     matrix (order of self.gates), -1 if not
+                                     a gate
+                        output_node: number of the output node
+                    This is the form consumed by the lowered kernels (the 
+                    "numba" backend).  Computed once and cached.
+    '''
+    def lower_netlist(self):
+
+        if self.lowered_netlist is not None:
+            return self.lowered_netlist
+
+        ordered_nodes = self.inputs + self.eval_order
+        node_numbers = {node.tag: i for i, node in enumerate(ordered_nodes)}
+        type_codes = {"PRIMARY_INPUT": CODE_INPUT, "NOT": CODE_NOT, "NOR": CODE_NOR, "PRIMARY_OUTPUT": CODE_OUTPUT}
+
+        node_codes = np.array([type_codes[node.type] for node in ordered_nodes], dtype = np.int8)
+        node_fanin = np.full((len(ordered_nodes), 2), -1, dtype = np.int64)
+        node_gates = np.full(len(ordered_nodes), -1, dtype = np.int64)
+
+        for i, node in enumerate(ordered_nodes):
+            for j, prev_node in enumerate(node.prev_nodes):
+                node_fanin[i, j] = node_numbers[prev_node.tag]
+            if node.tag in self.gate_columns:
+                node_gates[i] = self.gate_columns[node.tag]
+
+        self.lowered_netlist = {"node_codes": node_codes, "node_fanin": node_fanin, "node_gates": node_gates, "output_node": node_numbers[self.output[0].tag]}
+        return self.lowered_netlist
+
+    '''
+    Function:       evaluate_lowered_kernel
+    Args:           gate_params: (candidates, gates, 4) gate parameters, in the
+                    order of self.gates
+                    input_levels: Arrays of input values, from get_input_levels
+                    on_rows, off_rows: Masks of the logical 1 and 0 rows of
+                                       input_levels, if not all the rows
+    Return:         outputs: (candidates, rows) genetic outputs of the circuit
+                    on_min, off_max: (candidates,) ON_MIN and OFF_MAX
+    Description:    Runs the lowered netlist through the Numba kernel if Numba
+                    is installed, or the NumPy kernel otherwise.  Requires
+                    run_circuit_logical to have been called first.
+    '''
+    def evaluate_lowered_kernel(self, gate_params, input_levels, on_rows = None, off_rows = None):
+
+        lowered = self.lower_netlist()
+        gate_params = np.ascontiguousarray(gate_params, dtype = np.float64)
+        input_levels = np.asarray(input_levels, dtype = np.float64)
+        unit_conversion = float(self.output[0].unit_conversion)
+        if on_rows is None:
+            on_rows, off_rows = self.on_rows, self.off_rows
+
+        if numba is None:
+            return _lowered_kernel_numpy(lowered["node_codes"], lowered["node_fanin"], lowered["node_gates"], lowered["output_node"], gate_params, input_levels, on_rows, off_rows, unit_conversion)
+
+        num_candidates = gate_params.shape[0]
+        outputs = np.empty((num_candidates, input_levels.shape[1]))
+        on_min = np.empty(num_candidates)
+        off_max = np.empty(num_candidates)
+        lowered_kernel = _lowered_kernel_parallel if num_candidates > 1 else _lowered_kernel_jit
+        lowered_kernel(lowered["node_codes"], lowered["node_fanin"], lowered["node_gates"], lowered["output_node"], gate_params, input_levels, on_rows, off_rows, unit_conversion, outputs, on_min, off_max)
+
+        return outputs, on_min, off_max
 
     '''
     Function:       calculate_score
@@ -581,7 +1692,7 @@ class Netlist_Parser():
         OFF_MAX = -1
 
         # For each entry in the genetic truth table
-        for key, value in self.genetic_truth_table.items():
+        for key, value in self.get_genetic_truth_table().items():
 
             # Get the logical output and the genetic output
             logic_out = value[2]
@@ -601,6 +1712,26 @@ class Netlist_Parser():
         self.circuit_score = self.ON_MIN/self.OFF_MAX
         self.log_circuit_score = np.log10(self.circuit_score)
 
+    '''
+    Function:       score_outputs
+    Args:           genetic_outputs: Array of genetic outputs, one per row of
+                    the truth table
+    Return:         None
+    Description:    Same as calculate_score, but computed directly from an array
+                    of genetic outputs and the array of logical outputs using
+                    masked reductions instead of a loop over the truth table.
+    '''
+    def score_outputs(self, genetic_outputs):
+
+        # ON_MIN over the logical 1 rows, OFF_MAX over the logical 0 rows - the
+        # initial values match the ones used in calculate_score
+        self.ON_MIN = np.min(genetic_outputs, initial = 1e9, where = self.on_rows)
+        self.OFF_MAX = np.max(genetic_outputs, initial = -1, where = self.off_rows)
+
+        # Calculate the score and log score
+        self.circuit_score = self.ON_MIN/self.OFF_MAX
+        self.log_circuit_score = np.log10(self.circuit_score)
+
     '''
     Function:       print_genetic_truth_table
     Args:           None
@@ -609,7 +1740,7 @@ class Netlist_Parser():
     '''
     def print_genetric_truth_table(self):
 
-        for key, value in self.genetic_truth_table.items():
+        for key, value in self.get_genetic_truth_table().items():
             logic_out = value[2]
             genetic_out = value[1]
             print("DI/O = [ (" + ' '.join(('%d' % f) for f in key) + ") --> " + str(logic_out) + " ] || GI/O = [ (" + ' '.join(('%.3e' % f) for f in value[0]) + ") --> %.5e" % value[1] + " ]")
@@ -16,7 +16,22 @@
 #                  of the design produced from Cello.
 #               6) If a new best score has been identified, update the state
 #                  variables with the best score, inputs, and circuit design.
-#               7) Repeat for each potential signal.
+#               7) Repeat for each potential signal.  Steps 3-6 are run by the
+#                  cello_sweep module, optionally over several worker processes
+#                  (5th command line argument, default 1).  The 6th argument
+#                  picks the cooling schedule (step, exponential, adaptive or
+#                  reheating - default step).  A 7th argument above 1 
+#                  optimizes each design by parallel tempering with that many
+#                  replicas instead, one worker process per replica, and an
+#                  8th argument above 1 anneals that many chains in lockstep.
+#                  The 9th argument picks the genetic simulation backend
+#                  (numpy or numba - default numpy), and a 10th argument 
+#                  above 0 stops annealing a design once its best score has
+#                  not improved for that many iterations (default off).  An
+#                  11th argument of 1 stops scoring moves that cannot be 
+#                  accepted (faster from 7 inputs up), and a 12th argument 
+#                  above 0 modifies only that many gates per move, so that 
+#                  only their fan-out cone is re-simulated (numpy backend).
 #               8) When the algorithm is finished, save the best results to the
 #                  working chassis.UCF.json file, and print the location of
 #                  said file to the terminal.
@@ -30,18 +45,15 @@
 # ------------------------------------------------------------------------------
 
 # Imports
-from record import Input_Signal_Record, Repressor_Record
 from input_processor import Input_Processor
-from circuit_netlist_parser import Netlist_Parser
-from celloapi2 import CelloQuery, CelloResult
+from cello_sweep import sweep_signal_sets, make_default_settings, DEFAULT_PIPELINE_DEPTH
+from cello_result_cache import Cello_Result_Cache, Annealing_Result_Cache
+from celloapi2 import CelloQuery
 from itertools import combinations
 from shutil import copyfile
 from util import parse_verilog
-import time
 import os
 import sys
-import numpy as np
-import copy
 
 def main():
 
@@ -53,6 +65,20 @@ def main():
         verilog_name = os.path.split(sys.argv[3])[1]
         working_directory = sys.argv[4]
 
+    # Optional: number of worker processes for the sweep over signal sets,
+    # the cooling schedule of the annealing, the number of parallel 
+    # tempering replicas, the number of chains annealed in lockstep, the
+    # genetic simulation backend, the patience of the early stopping, 
+    # whether to reject moves early and the number of gates per move
+    num_workers = int(sys.argv[5]) if len(sys.argv) >= 6 else 1
+    schedule = sys.argv[6] if len(sys.argv) >= 7 else "step"
+    num_replicas = int(sys.argv[7]) if len(sys.argv) >= 8 else 1
+    num_chains = int(sys.argv[8]) if len(sys.argv) >= 9 else 1
+    backend = sys.argv[9] if len(sys.argv) >= 10 else "numpy"
+    patience = int(sys.argv[10]) if len(sys.argv) >= 11 and int(sys.argv[10]) > 0 else None
+    early_reject = len(sys.argv) >= 12 and sys.argv[11] == "1"
+    gates_per_move = int(sys.argv[12]) if len(sys.argv) >= 13 and int(sys.argv[12]) > 0 else None
+
     if not path_to_chassis or not chassis_name or not path_to_verilog or not verilog_name or not working_directory:
         print("[ERROR]: INVALID ARGUMENTS IN <run.sh> SCRIPT, PLEASE ADJUST")
     
@@ -63,9 +89,18 @@ def main():
     print(working_directory)
 
     # Create two folders within the working directory - cello_in, where the
-    # chassis files will be moved, and cello_out, where Cello will dump results
+    # chassis files will be moved, and cello_out, where Cello will dump results.
+    # Compiled netlists are cached in netlist_cache, keyed by their contents.
     IN_DIR = working_directory + "cello_in\\"
     OUT_DIR = working_directory + "cello_out\\"
+    CACHE_DIR = working_directory + "netlist_cache\\"
+
+    # Results of Cello queries already run, in any earlier run as well
+    result_cache = Cello_Result_Cache(working_directory + "cello_cache\\")
+
+    # Annealing results of the designs already optimized, in any earlier run
+    # as well - Cello often produces the same design for several signal sets
+    annealing_cache = Annealing_Result_Cache(working_directory + "annealing_cache\\")
 
     # Step 1: Parse the input files of the specified chassis
     file_parser = Input_Processor(path_to_chassis, chassis_name, working_directory = IN_DIR)
@@ -87,7 +122,7 @@ def main():
     print(file_parser.circuit_input_filename)
     print(file_parser.circuit_output_filename)
 
-    # Step 3: Run Cello to get a baseline view of valid designs
+    # Step 3: Query Cello for the input signals available in the chassis
     q = CelloQuery(
             input_directory = IN_DIR, 
             output_directory = OUT_DIR, 
@@ -104,199 +139,24 @@ def main():
     print("SIGNALS: " + str(signals))
     print("SIGNAL PAIRING: " + str(signal_pairing))
 
-    best_cello_score = 0
-    best_cello_design = None
-    best_cello_inputs = None
-
-    best_annealing_score = 0
-    best_annealing_design = None
-    best_annealing_inputs = None
-
-    # For each set of input signals
-    for signal_set in signal_pairing:
-
-        signal_set = list(signal_set)
-        print("SIGNAL SET: " + str(signal_set))
-
-        q.set_input_signals(signal_set)
-
-        # Generate a design using Cello!
-        start_time = time.time()
-        q.get_results()
-        stop_time = time.time()
-        print("GET RESULTS TOTAL TIME = %lf" % (stop_time - start_time))
-
-        try:
-            # Get results of the Cello query (most important: Scoring and Netlist)
-            res = CelloResult(results_dir = OUT_DIR)
-           
-            cello_circuit = res.part_names
-            cello_score = res.circuit_score
-
-            # Step 4: Run the netlist scoring which should be the same results 
-            # as the Cello scoring.
-
-            # Get the output circuit netlist
-            circuit_netlist_json = OUT_DIR + verilog_name.replace(".v", "") + "_outputNetlist.json"
-            
-            # Create the parser module
-            netlist_parser = Netlist_Parser(circuit_netlist_json)
-  
-            # Cleanup the netlist JSON (Not needed if the _outputNetlist.json 
-            # file is correctly formatted)
-            netlist_parser.parse_netlist(cleanup = True)
-
-            # Populate the reconstructed circuit with the parameters 
-            # from the input JSONs (input, UCF, output)
-            netlist_parser.populate_input_values(file_parser.input_records)
-            netlist_parser.populate_response_functions(file_parser.gate_records)
-            netlist_parser.populate_output_converters(file_parser.output_records)
-    
-            #netlist_parser.print()
-
-            # Now run the logic generator and the genetic generator - first 
-            # assume it is digital circuit, compute what the outputs should be.  
-            # Next run as genetic circuit w/ response functions for each gate.
-            netlist_parser.run_circuit_logical()
-            netlist_parser.run_circuit_genetic()
-
-            # Calculate the score
-            netlist_parser.calculate_score()
-            netlist_parser.print_genetric_truth_table()
-            netlist_score = netlist_parser.circuit_score
-
-            #print("NETLIST SCORE = %lf" % netlist_score)
-
-            # Step 5: begin the simulated annealing on the gates in the circuit
-
-            # Set the starting temperature to 20% of the starting score
-            temperature = 0.20 * netlist_score
-            count = 0
-            num_iterations = 1000
-            
-            best_gates = {}
-
-            # Copy the records to a working space
-            scratch_records = {}
-            original_records = {}
-
-            for node in netlist_parser.gates:
-                new_record = Repressor_Record()
-                new_record.name = node.name
-                new_record.populate_params(ymax = node.resfunc.ymax, ymin = node.resfunc.ymin, K = node.resfunc.K, n = node.resfunc.n)
-                scratch_records[new_record.name] = new_record
-
-            original_records = copy.deepcopy(scratch_records)
-            #print(scratch_records)
-            #print(original_records)
-
-            # Begin the simulated annealing
-            for it in range(0, num_iterations):
-
-                # Every 10% of iterations, reduce the temperature in half, 
-                # reducing the probability of selecting new input parameters
-                if it > 0 and count % (num_iterations / 10) == 0:
-                    temperature /= 2
-
-                # For each gate in the circuit
-
-                pre_modified_records = copy.deepcopy(scratch_records)
-                valid_state_generated_list = []
-
-                # Randomly generate a new "input vector" by modifying each of the gates in the circuit
-                for gate in netlist_parser.gates:
-                    
-                    current_name = gate.name
-                    current_record = scratch_records[current_name]
-                    
-                    # Attempt to generate the input vector - will retry up to the specified number of times before moving on
-                    current_state_valid_flag = current_record.modify_repressor(num_retries = 10)
-                    valid_state_generated_list.append(current_state_valid_flag)
-
-                num_valid = 0
-                for entry in valid_state_generated_list:
-                    if entry:
-                        num_valid += 1
-
-                # If all input vectors are valid
-                if num_valid == len(scratch_records):
-
-                    # Repopulate the circuit with the new function parameters
-                    netlist_parser.populate_response_functions(scratch_records)
-
-                    # Rerun the circuit at the genetic level
-                    netlist_parser.run_circuit_genetic()
-
-                    # Calculate the updated score
-                    netlist_parser.calculate_score()
-                    updated_netlist_score = netlist_parser.circuit_score
-
-                    # Make sure that the values are physically meaningful...
-                    # not sure what exactly this means, but OFF_MAX ~ 1e-10 and ON_MIN ~ 1e5 does NOT seem realistic...
-                    # So just check to see if OFF_MAX and ON_MIN are in reasonable values before accepting the change.  Otherwise
-                    # We will reject automatically.
-
-                    ON_MIN_UPPER_BOUND = 5
-                    OFF_MAX_LOWER_BOUND = 1e-3
-
-                    # If within the range, then we can evaluate the change using simulated annealing algorithm
-                    if netlist_parser.ON_MIN < ON_MIN_UPPER_BOUND and netlist_parser.OFF_MAX > OFF_MAX_LOWER_BOUND:
-
-                        # If the updated score was an improvement, accepted the parameter change
-                        if updated_netlist_score > netlist_score:
-                            netlist_score = updated_netlist_score
-                            best_gates = copy.deepcopy(scratch_records)
-
-                        # Else we will accept with certain probability
-                        else:
-                            cost_diff = netlist_score - updated_netlist_score
-                            accept_prob = np.random.uniform(low = 0.0, high = 1.0)
-                    
-                            if np.exp(-1 * cost_diff / temperature) > accept_prob:
-                                netlist_score = updated_netlist_score
-                            # Else we need to undo the changes to the scratch records
-                            else:
-                                best_gates = copy.deepcopy(scratch_records)
-                                scratch_records = copy.deepcopy(pre_modified_records)
-                                netlist_parser.populate_response_functions(scratch_records)
-                                netlist_parser.run_circuit_genetic()
-                                netlist_parser.calculate_score()
-                        count += 1
-                    # Else undo the changes to the scratch records because the changes were not physically meaningful
-                    else:
-                        scratch_records = copy.deepcopy(pre_modified_records)
-                        netlist_parser.populate_response_functions(scratch_records)
-                        netlist_parser.run_circuit_genetic()
-                        netlist_parser.calculate_score()
-                # Else undo the changes to the scratch records because the changes were not physically meaningful
-                else:
-                    scratch_records = copy.deepcopy(pre_modified_records)
-                    netlist_parser.populate_response_functions(scratch_records)
-                    netlist_parser.run_circuit_genetic()
-                    netlist_parser.calculate_score()
-            
-            print("CELLO SCORE: %lf" % cello_score)
-            print("ANNEALING SCORE: %lf" % netlist_score)
-
-            print("BEST GATES: ")
-            for gate_name, record_obj in best_gates.items():
-                print("GATE NAME = " + gate_name)
-                record_obj.print()
+    # Steps 3-5 for every set of input signals: Cello query, netlist scoring,
+    # and simulated annealing, in parallel if more than one worker was given.
+    # Otherwise the Cello queries for the next signal sets run while the 
+    # current design is annealed.  The settings are shared with the GUI.
+    settings = make_default_settings(num_iterations = 1000, schedule = schedule, num_replicas = num_replicas, num_chains = num_chains, backend = backend, patience = patience, 
+                                     early_reject = early_reject, gates_per_move = gates_per_move)
+    summary, _ = sweep_signal_sets(file_parser, verilog_name, signal_pairing, IN_DIR, OUT_DIR, CACHE_DIR, settings = settings, 
+                                   num_workers = num_workers, annealing_cache = annealing_cache, result_cache = result_cache, 
+                                   pipeline_depth = DEFAULT_PIPELINE_DEPTH)
 
-            if cello_score > best_cello_score:
-                best_cello_score = cello_score
-                best_cello_inputs = signal_set
-                best_cello_design = cello_circuit
+    best_cello_score = summary.best_cello_score
+    best_cello_design = summary.best_cello_design
+    best_cello_inputs = summary.best_cello_inputs
 
-            if netlist_score > best_annealing_score:
-                best_annealing_score = netlist_score
-                best_annealing_inputs = signal_set
-                best_annealing_design = best_gates
+    best_annealing_score = summary.best_annealing_score
+    best_annealing_design = summary.best_annealing_design
+    best_annealing_inputs = summary.best_annealing_inputs
 
-        except:
-            pass
-        q.reset_input_signals()
-                    
     print("BEST CELLO SCORE = %lf" % best_cello_score)
     print("BEST CELLO INPUTS = " + str(best_cello_inputs))
     print("BEST CELLO DESIGN = " + str(best_cello_design))
@@ -0,0 +1,228 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: parallel_tempering.py
+# Description:  Parallel tempering (replica exchange) over the same problem
+#               objects as simulated_annealing.Annealing_Engine.  Several
+#               replicas of the problem run Metropolis steps at fixed
+#               temperatures, spread geometrically from the starting
+#               temperature of the annealing down to roughly where the step
+#               schedule ends.  Every exchange_interval steps, replicas at
+#               neighbouring temperatures swap states with the usual replica
+#               exchange probability, so good states found by the hot replicas
+#               sink to the cold ones, and the cold replicas get pulled out of
+#               the local optima they are stuck in.
+#               The replicas of one round are independent, so they run in
+#               worker processes.  Each worker builds its own copy of the
+#               problem once; only the states (the parameter arrays) travel
+#               between the processes, so a round costs one small message per
+#               replica.
+# Status:   Operational.  The problem class must also provide set_state() and
+#           seed(), and be importable by the worker processes.
+# ------------------------------------------------------------------------------
+
+# Imports
+from simulated_annealing import Annealing_Engine, Annealing_Result, Exponential_Schedule, Stopping_Criteria
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+import numpy as np
+
+# Problem of the worker process, built once by _init_replica_worker
+_replica_problem = None
+
+'''
+Function:       _init_replica_worker
+Args:           problem_class: Class of the problem
+                problem_args: Arguments of the problem constructor
+Return:         None
+Description:    Worker process initializer - builds the problem of the worker.
+'''
+def _init_replica_worker(problem_class, problem_args):
+
+    global _replica_problem
+    _replica_problem = problem_class(*problem_args)
+
+'''
+Function:       _run_replica
+Args:           state: State of the replica at the start of the round
+                temperature: Temperature of the replica
+                num_steps: Number of Metropolis steps to run
+                seed: Seed of the random number generator for the round
+                problem: Problem to run on, or None for the problem of the
+                         worker process
+Return:         State of the replica at the end of the round, and the
+                Annealing_Result of the round
+Description:    The round draws only from generators seeded with seed, never
+                from the NumPy global random state, so running it in the
+                calling process leaves the caller's draws untouched.
+'''
+def _run_replica(state, temperature, num_steps, seed, problem = None):
+
+    if problem is None:
+        problem = _replica_problem
+
+    # Independent streams for the moves and for the acceptance tests
+    move_seed, acceptance_seed = np.random.SeedSequence(seed).spawn(2)
+    problem.seed(move_seed)
+    problem.set_state(state)
+
+    # A schedule that never changes the temperature
+    engine = Annealing_Engine(Exponential_Schedule(alpha = 1.0), num_steps, rng = np.random.default_rng(acceptance_seed))
+    round_stats = engine.run(problem, temperature)
+
+    return problem.get_state(), round_stats
+
+'''
+Class:          Tempering_Result
+Description:    Annealing_Result of a parallel tempering run.  The counts are
+                summed over the replicas, and the final score and temperature
+                are those of the coldest replica.
+'''
+class Tempering_Result(Annealing_Result):
+
+    def __init__(self):
+        super().__init__()
+        self.temperatures = None            # Temperature of each replica
+        self.num_exchanges = 0              # Swaps attempted between
+        self.num_exchanges_accepted = 0     # neighbouring replicas, and how
+                                            # many were accepted
+
+    '''
+    Function:       print
+    Args:           None
+    Return:         None
+    '''
+    def print(self):
+
+        super().print()
+        print("PARALLEL TEMPERING: %d REPLICAS, %d OF %d EXCHANGES ACCEPTED" % (len(self.temperatures), self.num_exchanges_accepted, self.num_exchanges))
+
+'''
+Class:          Parallel_Tempering
+Description:    Maximizes the score of a problem by replica exchange.  The
+                problem provides the same methods as for Annealing_Engine,
+                plus:
+                - set_state(state): make a state from get_state() current
+                - seed(seed):   seed the random moves of the problem
+                The run ends after num_iterations steps of every replica, or
+                earlier if one of the stopping criteria fires (checked between
+                rounds, in steps per replica).
+'''
+class Parallel_Tempering():
+
+    def __init__(self, num_replicas = 4, num_iterations = 1000, exchange_interval = 50, temperature_ratio = 0.002, num_workers = None, stopping = None):
+        self.num_replicas = num_replicas
+        self.num_iterations = num_iterations        # Steps per replica
+        self.exchange_interval = exchange_interval  # Steps between exchanges
+        self.temperature_ratio = temperature_ratio  # Coldest / hottest
+                                                    # temperature - the default
+                                                    # is about where the step
+                                                    # schedule ends
+        if num_workers is None:
+            num_workers = min(num_replicas, os.cpu_count() or 1)
+        self.num_workers = num_workers              # Worker processes, 1 to
+                                                    # run the replicas in turn
+                                                    # in this process
+        self.stopping = stopping if stopping is not None else Stopping_Criteria()
+
+    '''
+    Function:       get_temperatures
+    Args:           initial_temperature: Temperature of the hottest replica
+    Return:         Array of the replica temperatures, hottest first
+    '''
+    def get_temperatures(self, initial_temperature):
+
+        exponents = np.arange(self.num_replicas) / max(self.num_replicas - 1, 1)
+        return initial_temperature * self.temperature_ratio ** exponents
+
+    '''
+    Function:       run
+    Args:           problem: Problem object, in its starting state
+                    initial_temperature: Temperature of the hottest replica
+                    problem_args: Arguments that rebuild the problem in a
+                                  worker process, with problem's class
+    Return:         Tempering_Result of the run
+    '''
+    def run(self, problem, initial_temperature, problem_args):
+
+        stats = Tempering_Result()
+        start_time = time.perf_counter()
+
+        temperatures = self.get_temperatures(initial_temperature)
+        stats.temperatures = temperatures
+
+        # Every replica starts from the starting state
+        start_state = problem.get_state()
+        states = [start_state.copy() for _ in range(self.num_replicas)]
+        scores = [problem.score()] * self.num_replicas
+        stats.best_score = problem.score()
+        stats.best_state = start_state
+
+        executor = None
+        if self.num_workers > 1:
+            executor = ProcessPoolExecutor(max_workers = self.num_workers, initializer = _init_replica_worker, initargs = (type(problem), problem_args))
+
+        self.stopping.start(stats)
+        stats.stop_reason = "max_iterations"
+
+        try:
+            for iteration in range(0, self.num_iterations, self.exchange_interval):
+
+                stop_reason = self.stopping.check(iteration, stats, time.perf_counter() - start_time)
+                if stop_reason is not None:
+                    stats.stop_reason = stop_reason
+                    break
+
+                # Draw the seeds here, so a seeded run does not depend on which
+                # worker runs which replica
+                num_steps = min(self.exchange_interval, self.num_iterations - iteration)
+                seeds = [int(seed) for seed in np.random.randint(0, 2**31 - 1, size = self.num_replicas)]
+
+                if executor is not None:
+                    replica_runs = list(executor.map(_run_replica, states, temperatures, [num_steps] * self.num_replicas, seeds))
+                else:
+                    replica_runs = [_run_replica(states[r], temperatures[r], num_steps, seeds[r], problem) for r in range(self.num_replicas)]
+
+                for r, (state, round_stats) in enumerate(replica_runs):
+                    states[r] = state
+                    scores[r] = round_stats.final_score
+
+                    stats.num_iterations += round_stats.num_iterations
+                    stats.num_evaluations += round_stats.num_evaluations
+                    stats.num_scored += round_stats.num_scored
+                    stats.num_accepted += round_stats.num_accepted
+                    stats.num_uphill += round_stats.num_uphill
+                    stats.num_uphill_accepted += round_stats.num_uphill_accepted
+
+                    if round_stats.best_score > stats.best_score:
+                        stats.best_score = round_stats.best_score
+                        stats.best_state = round_stats.best_state
+                        stats.last_improvement = iteration + round_stats.last_improvement
+
+                # Swap neighbouring replicas, alternating between the even and
+                # the odd pairs.  Replica i holds score s_i at temperature T_i,
+                # and the swap is accepted with probability
+                # min(1, exp((s_j - s_i) * (1 / T_i - 1 / T_j)))
+                for i in range((iteration // self.exchange_interval) % 2, self.num_replicas - 1, 2):
+                    j = i + 1
+                    stats.num_exchanges += 1
+                    log_accept_prob = (scores[j] - scores[i]) * (1 / temperatures[i] - 1 / temperatures[j])
+                    if log_accept_prob >= 0 or np.exp(log_accept_prob) > np.random.uniform(low = 0.0, high = 1.0):
+                        states[i], states[j] = states[j], states[i]
+                        scores[i], scores[j] = scores[j], scores[i]
+                        stats.num_exchanges_accepted += 1
+
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        stats.final_score = scores[-1]
+        stats.final_temperature = temperatures[-1]
+        stats.elapsed_time = time.perf_counter() - start_time
+        if stats.elapsed_time > 0:
+            stats.evals_per_second = stats.num_evaluations / stats.elapsed_time
+
+        return stats
@@ -23,6 +23,15 @@
 # Imports
 import numpy as np
 
+# These are the acceptable bounds on the repressor parameters, largely found 
+# from looking at the values found in the original UCF.json file.  Not sure
+# how meaningful this is, as it seems very artificial.
+YMAX_UPPER_BOUND = 5
+YMIN_LOWER_BOUND = 1e-3
+K_LOWER_BOUND = 1e-3
+K_UPPER_BOUND = 15
+n_UPPER_BOUND = 10
+
 ''' 
 Class:          Input_Signal_Record
 Description:    Basic record of input sensors.  Contains fields for name, output
@@ -413,15 +422,6 @@ class Repressor_Record():
 
         valid_state_generated = False
 
-        # These are the acceptable bounds on the parameters, largely found from
-        # looking at the values found in the original UCF.json file.  Not sure
-        # how meaningful this is, as it seems very artificial.
-        YMAX_UPPER_BOUND = 5
-        YMIN_LOWER_BOUND = 1e-3
-        K_LOWER_BOUND = 1e-3
-        K_UPPER_BOUND = 15
-        n_UPPER_BOUND = 10
-
         # Save the original parameters - will need to reload several times
         orig_ymax = self.ymax
         orig_ymin = self.ymin
@@ -479,4 +479,357 @@ class Repressor_Record():
 
         # Return whether a valid state was generated - this will help simulated 
         # annealing algorithm determine whether or not to accept parameter state
-        return valid_state_generated
\ No newline at end of file
+        return valid_state_generated
+
+# The operations of Repressor_Record.modify_repressor as data, for applying
+# them to whole arrays of parameters at once.  For each operation: the number
+# of the 54 operation codes that select it, the range of its factor, and the
+# power of the factor that multiplies each of [ymax, ymin, K, n]
+REPRESSOR_OPERATION_CODES = np.array([6, 6, 6, 9, 9, 9, 9])
+REPRESSOR_OPERATION_LOW = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+REPRESSOR_OPERATION_HIGH = np.array([1.5, 1.05, 2.0, 2.0, 2.0, 5.0, 2.0])
+REPRESSOR_OPERATION_POWERS = np.array([[ 1, -1,  0,  0],     # stretch
+                                       [ 0,  0,  0,  1],     # increase_slope
+                                       [ 0,  0,  0, -1],     # decrease_slope
+                                       [ 1,  1,  0,  0],     # stronger_promoter
+                                       [-1, -1,  0,  0],     # weaker_promoter
+                                       [ 0,  0, -1,  0],     # strong_rbs
+                                       [ 0,  0,  1,  0]])    # weaker_rbs
+
+# Operation selected by each operation code
+REPRESSOR_OPERATION_OF_CODE = np.repeat(np.arange(len(REPRESSOR_OPERATION_CODES)), REPRESSOR_OPERATION_CODES)
+
+# Largest factor decrease_slope applies - larger factors leave n unchanged
+DECREASE_SLOPE_MAX_FACTOR = 1.05
+
+# The parameter bounds (top of the module) per column of a [ymax, ymin, K, n]
+# row, in log space
+LOG_PARAM_LOWER_BOUNDS = np.array([-np.inf, np.log(YMIN_LOWER_BOUND), np.log(K_LOWER_BOUND), -np.inf])
+LOG_PARAM_UPPER_BOUNDS = np.array([np.log(YMAX_UPPER_BOUND), np.inf, np.log(K_UPPER_BOUND), np.log(n_UPPER_BOUND)])
+
+# The operations again, for truncated sampling.  decrease_slope draws its
+# factor from [1, 2] but only applies factors up to 1.05, so it is split into
+# a decrease_slope with factors in [1, 1.05], and a no-op with the rest of its
+# weight.  The weights are the probabilities of the operations, with the
+# factor of each one uniform in its range - exactly as in modify_repressor
+TRUNCATED_OPERATION_WEIGHTS = np.array([6, 6, 6 * 0.05, 6 * 0.95, 9, 9, 9, 9]) / 54
+TRUNCATED_OPERATION_LOW = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+TRUNCATED_OPERATION_HIGH = np.array([1.5, 1.05, DECREASE_SLOPE_MAX_FACTOR, 1.0, 2.0, 2.0, 5.0, 2.0])
+TRUNCATED_OPERATION_POWERS = np.insert(REPRESSOR_OPERATION_POWERS, 3, [0, 0, 0, 0], axis = 0)
+TRUNCATED_OPERATION_LOG_LOW = np.log(TRUNCATED_OPERATION_LOW)
+TRUNCATED_OPERATION_LOG_HIGH = np.log(TRUNCATED_OPERATION_HIGH)
+TRUNCATED_OPERATION_WIDTH = TRUNCATED_OPERATION_HIGH - TRUNCATED_OPERATION_LOW
+
+# The constraints on log(factor) of a row are laid out as: entry c for column
+# c multiplied by the factor, entry 4 + c for column c divided by it, entry 8
+# for no constraint.  Every operation touches at most two columns - these are
+# its two entries
+TRUNCATED_OPERATION_ENTRIES = np.array([[column + 4 * (power < 0) for column, power in enumerate(powers) if power != 0] + [8] * (2 - np.count_nonzero(powers))
+                                        for powers in TRUNCATED_OPERATION_POWERS])
+
+# Columns each operation leaves untouched, shape (4, operations)
+TRUNCATED_OPERATION_UNTOUCHED = (TRUNCATED_OPERATION_POWERS == 0).T.astype(np.float64)
+
+# Modes of Repressor_Proposal_Generator
+PROPOSAL_MODES = ("retry", "truncated")
+
+'''
+Function:       check_repressor_bounds
+Args:           params: Array of shape (..., 4) of [ymax, ymin, K, n] rows
+Return:         Boolean array of whether each row is inside the bounds
+'''
+def check_repressor_bounds(params):
+
+    return (params[..., 0] <= YMAX_UPPER_BOUND) & (params[..., 1] >= YMIN_LOWER_BOUND) & \
+           (params[..., 2] >= K_LOWER_BOUND) & (params[..., 2] <= K_UPPER_BOUND) & (params[..., 3] <= n_UPPER_BOUND)
+
+'''
+Function:       apply_repressor_operations
+Args:           params: Array of shape (..., 4) of [ymax, ymin, K, n] rows
+                operations: Array of shape (num_retries,) + params.shape[:-1]
+                            of operations (indices into the
+                            REPRESSOR_OPERATION_* arrays) to try per row
+                uniforms: Uniform [0, 1) numbers, same shape as operations,
+                          scaled to the factor range of each operation
+                count_tried: Also return the number of operations tried - up
+                             to and including the first valid one of each row
+Return:         Array of the modified rows, and boolean array of whether a
+                valid row was generated (same shape as params[..., 0])
+Description:    Repressor_Record.modify_repressor applied to every row at once:
+                the operations of each row are tried from the original
+                parameters, and the first one that stays inside the bounds is
+                kept.  A row without any valid operation keeps its original
+                parameters.
+'''
+def apply_repressor_operations(params, operations, uniforms, count_tried = False):
+
+    params = np.asarray(params, dtype = np.float64)
+
+    low = REPRESSOR_OPERATION_LOW[operations]
+    factors = low + (REPRESSOR_OPERATION_HIGH[operations] - low) * uniforms
+    factors = np.where((operations == 2) & (factors > DECREASE_SLOPE_MAX_FACTOR), 1.0, factors)
+
+    # Every retry, from the original parameters
+    candidates = params * factors[..., np.newaxis] ** REPRESSOR_OPERATION_POWERS[operations]
+
+    valid = check_repressor_bounds(candidates)
+
+    # Keep the first valid retry of each row
+    first_valid = np.argmax(valid, axis = 0)
+    valid_state_generated = np.take_along_axis(valid, first_valid[np.newaxis], axis = 0)[0]
+    new_params = np.take_along_axis(candidates, first_valid[np.newaxis, ..., np.newaxis], axis = 0)[0]
+    new_params = np.where(valid_state_generated[..., np.newaxis], new_params, params)
+
+    if count_tried:
+        num_tried = np.sum(np.where(valid_state_generated, first_valid + 1, len(operations)))
+        return new_params, valid_state_generated, num_tried
+    return new_params, valid_state_generated
+
+'''
+Function:       apply_truncated_operations
+Args:           params: Array of shape (..., 4) of [ymax, ymin, K, n] rows
+                uniforms: Uniform [0, 1) numbers, of shape 
+                          (2,) + params.shape[:-1]
+Return:         Array of the modified rows, and boolean array of whether a
+                valid row was generated (same shape as params[..., 0])
+Description:    Rejection-free version of apply_repressor_operations.  For 
+                every row and operation, the range of factors that keeps the
+                row inside the bounds is worked out in log space (each column
+                multiplied by f ** power must stay between its log bounds), 
+                and intersected with the factor range of the operation.  The
+                operation is then drawn with its weight times the fraction of
+                its range that is admissible, and the factor uniformly from
+                the admissible range.  This is the distribution of the moves
+                modify_repressor keeps, without the retries - a row is only
+                invalid if no operation can keep it inside the bounds.
+'''
+def apply_truncated_operations(params, uniforms):
+
+    params = np.asarray(params, dtype = np.float64)
+    log_params = np.log(params)
+    rows = params.shape[:-1]
+
+    # Multiplying column c by the factor f keeps it inside its bounds for
+    # to_lower[c] <= log(f) <= to_upper[c], dividing it for 
+    # -to_upper[c] <= log(f) <= -to_lower[c]
+    to_lower = LOG_PARAM_LOWER_BOUNDS - log_params
+    to_upper = LOG_PARAM_UPPER_BOUNDS - log_params
+    unconstrained = np.full(rows + (1,), np.inf)
+    lower_entries = np.concatenate([to_lower, -to_upper, -unconstrained], axis = -1)
+    upper_entries = np.concatenate([to_upper, -to_lower, unconstrained], axis = -1)
+
+    # Admissible log(factor) of each operation, within its own range
+    first, second = TRUNCATED_OPERATION_ENTRIES[:, 0], TRUNCATED_OPERATION_ENTRIES[:, 1]
+    log_low = np.maximum(TRUNCATED_OPERATION_LOG_LOW, np.maximum(lower_entries[..., first], lower_entries[..., second]))
+    log_high = np.minimum(TRUNCATED_OPERATION_LOG_HIGH, np.minimum(upper_entries[..., first], upper_entries[..., second]))
+
+    # A column the operation does not touch has to be inside its bounds
+    # already, or no factor is admissible
+    out_of_bounds = ((to_lower > 0) | (to_upper < 0)).astype(np.float64)
+    log_high = np.where(out_of_bounds @ TRUNCATED_OPERATION_UNTOUCHED > 0, -np.inf, log_high)
+
+    # Admissible factors of each operation: [low, high], and the fraction of
+    # its range that is admissible (all or nothing for the no-op)
+    low = np.exp(log_low)
+    high = np.exp(log_high)
+    admissible = np.where(TRUNCATED_OPERATION_WIDTH > 0, np.maximum(high - low, 0) / np.maximum(TRUNCATED_OPERATION_WIDTH, 1e-300), high >= low)
+
+    # Draw the operation by inverse CDF over the weights, then the factor
+    cumulative_weights = np.cumsum(TRUNCATED_OPERATION_WEIGHTS * admissible, axis = -1)
+    total_weight = cumulative_weights[..., -1]
+    operations = np.argmax(cumulative_weights > (uniforms[0] * total_weight)[..., np.newaxis], axis = -1)
+
+    factors = low + (high - low) * uniforms[1][..., np.newaxis]
+    factors = np.take_along_axis(factors, operations[..., np.newaxis], axis = -1)
+
+    new_params = params * factors ** TRUNCATED_OPERATION_POWERS[operations]
+
+    # No admissible operation at all - and rounding in exp/log can put a 
+    # factor right at a bound just past it
+    valid_state_generated = (total_weight > 0) & check_repressor_bounds(new_params)
+    new_params = np.where(valid_state_generated[..., np.newaxis], new_params, params)
+
+    return new_params, valid_state_generated
+
+'''
+Class:          Repressor_Proposal_Generator
+Description:    Source of modify_repressor moves for whole parameter arrays.
+                Drawing the operation and factor of every gate one scalar at a
+                time costs a NumPy call each, so the generator draws uniform
+                numbers in blocks of block_size from a np.random.Generator,
+                and hands out slices of the blocks.  Each proposal then costs
+                a few array operations, whatever the number of gates or 
+                chains.  Two modes:
+                - "retry": up to num_retries operations per gate, as in
+                  modify_repressor (see apply_repressor_operations)
+                - "truncated": one operation per gate, drawn only from the
+                  factors that keep it inside the bounds (see 
+                  apply_truncated_operations)
+                Keeps counts of the gate moves, to report how many were valid.
+'''
+class Repressor_Proposal_Generator():
+
+    def __init__(self, num_retries = 10, block_size = 65536, seed = None, mode = "retry"):
+        if mode not in PROPOSAL_MODES:
+            raise ValueError("Unknown proposal mode %s, expected one of: %s" % (mode, ", ".join(PROPOSAL_MODES)))
+
+        self.num_retries = num_retries      # Operations tried per row
+        self.block_size = block_size        # Draws per block
+        self.mode = mode
+        self.rng = np.random.default_rng(seed)
+        self.uniforms = np.empty(0)         # Pre-drawn uniform [0, 1) numbers,
+        self.position = 0                   # and the first unused one
+        self.num_moves = 0                  # Gate moves proposed, how many
+        self.num_valid_moves = 0            # were valid, and the operations
+        self.num_operations = 0             # tried for them
+
+    '''
+    Function:       seed
+    Args:           seed: Seed of the random number generator
+    Return:         None
+    Description:    Restarts the generator from a seed, dropping the draws left
+                    in the current block.
+    '''
+    def seed(self, seed):
+
+        self.rng = np.random.default_rng(seed)
+        self.position = len(self.uniforms)
+
+    '''
+    Function:       draw
+    Args:           shape: Shape of the draws
+    Return:         Array of uniform [0, 1) numbers
+    Description:    Takes the next draws from the current block, first drawing
+                    a new block if the current one is used up.
+    '''
+    def draw(self, shape):
+
+        count = int(np.prod(shape))
+
+        if self.position + count > len(self.uniforms):
+            self.uniforms = self.rng.random(max(self.block_size, count))
+            self.position = 0
+
+        uniforms = self.uniforms[self.position:self.position + count].reshape(shape)
+        self.position += count
+
+        return uniforms
+
+    '''
+    Function:       propose
+    Args:           params: Array of shape (..., 4) of [ymax, ymin, K, n] rows
+    Return:         Array of the modified rows, and boolean array of whether a
+                    valid row was generated
+    Description:    Applies one move to every row.  params is not modified.
+    '''
+    def propose(self, params):
+
+        rows = np.shape(params)[:-1]
+
+        if self.mode == "truncated":
+            new_params, valid_state_generated = apply_truncated_operations(params, self.draw((2,) + rows))
+            self.num_operations += valid_state_generated.size
+
+        else:
+            uniforms = self.draw((2, self.num_retries) + rows)
+            operations = REPRESSOR_OPERATION_OF_CODE[(uniforms[0] * len(REPRESSOR_OPERATION_OF_CODE)).astype(np.intp)]
+            new_params, valid_state_generated, num_tried = apply_repressor_operations(params, operations, uniforms[1], count_tried = True)
+            self.num_operations += num_tried
+
+        self.num_moves += valid_state_generated.size
+        self.num_valid_moves += np.count_nonzero(valid_state_generated)
+
+        return new_params, valid_state_generated
+
+    '''
+    Function:       print
+    Args:           None
+    Return:         None
+    Description:    Prints the counts of the gate moves proposed so far.
+    '''
+    def print(self):
+
+        if self.num_moves == 0:
+            return
+        print("PROPOSALS (%s): %d OF %d GATE MOVES VALID (%.1lf%%), %.2lf OPERATIONS PER MOVE" % (self.mode.upper(), self.num_valid_moves, self.num_moves, 100 * self.num_valid_moves / self.num_moves, self.num_operations / self.num_moves))
+
+'''
+Class:          Repressor_Table
+Description:    Structure-of-arrays store of repressor parameters.  Instead of
+                one Repressor_Record object per gate, the response function
+                parameters of all gates live in one contiguous float64 array,
+                one row of [ymax, ymin, K, n] per gate, indexed by gate name.
+                The Netlist_Parser reads its parameters directly from the rows
+                of a bound table, and the whole table can be saved and 
+                restored with a single array copy.  The array is only ever 
+                modified in place, so views of its rows remain valid.
+'''
+class Repressor_Table():
+
+    # Column of each parameter within a row of the table
+    YMAX = 0
+    YMIN = 1
+    K = 2
+    N = 3
+
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(names))
+        self.index = {name: row for row, name in enumerate(self.names)}
+        self.params = np.zeros((len(self.names), 4))
+
+    '''
+    Function:       load_records
+    Args:           records: Dictionary of Repressor_Records indexed by name
+    Return:         None
+    Description:    Copies the parameters of the named records into the table
+    '''
+    def load_records(self, records):
+
+        for name, row in self.index.items():
+            if name in records:
+                current_record = records[name]
+                self.params[row] = [current_record.ymax, current_record.ymin, current_record.K, current_record.n]
+
+    '''
+    Function:       to_records
+    Args:           params: Parameter array to convert (defaults to the table's
+                    own parameters, but can be any snapshot of the table)
+    Return:         Dictionary of Repressor_Records indexed by name
+    Description:    Builds regular records from the table, i.e. for printing or
+                    saving the parameters back to the UCF.
+    '''
+    def to_records(self, params = None):
+
+        if params is None:
+            params = self.params
+
+        records = {}
+        for name, row in self.index.items():
+            new_record = Repressor_Record()
+            new_record.name = name
+            new_record.populate_params(ymax = params[row, self.YMAX], ymin = params[row, self.YMIN], K = params[row, self.K], n = params[row, self.N])
+            records[name] = new_record
+        return records
+
+    '''
+    Function:       snapshot
+    Args:           out: Optional array to copy the parameters into, so that a
+                    buffer can be reused between snapshots
+    Return:         Copy of the parameter array
+    Description:    Saves the current state of the table - O(number of gates)
+    '''
+    def snapshot(self, out = None):
+
+        if out is None:
+            return self.params.copy()
+        np.copyto(out, self.params)
+        return out
+
+    '''
+    Function:       restore
+    Args:           saved_params: Array returned by snapshot
+    Return:         None
+    Description:    Restores a saved state of the table, in place
+    '''
+    def restore(self, saved_params):
+        np.copyto(self.params, saved_params)
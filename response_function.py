@@ -24,31 +24,67 @@ Class:          ResponseFunction
 Description:    Sigmoial response function of the form described in the HW1
                 technical document.  Currently just a wrapper around creation &
                 access of the mathematical object used to calculate res_func(x).
+                The object is deliberately lightweight (fixed __slots__, no 
+                arrays built on creation), since the parameters of every gate
+                are updated many times during the simulated annealing - use 
+                update() to change the parameters in place.  The sampled curve
+                (self.x, self.y) is only computed when it is first accessed.
 '''
 class ResponseFunction():
 
+    __slots__ = ("ymax", "ymin", "K", "n", "span", "inv_K", "_y")
+
+    # Input values used to sample the curve (shared by all response functions)
+    x = np.logspace(-3, 3)
+
     def __init__(self, ymax, ymin, K, n):
 
-        self.x = np.logspace(-3, 3)
-        
-        # Sigmoidal parameters
+        # Sigmoidal parameters (and the derived terms used in f)
+        self.update(ymax, ymin, K, n)
+
+    '''
+    Function:       update
+    Args:           ymax, ymin, K, n: New parameters of the response function
+    Return:         None
+    Description:    Sets the parameters in place and precomputes the terms used
+                    by f, so that evaluating f only costs a few operations.  Any
+                    previously sampled curve is discarded.
+    '''
+    def update(self, ymax, ymin, K, n):
+
         self.ymax = np.float64(ymax)
         self.ymin = np.float64(ymin)
         self.K = np.float64(K)
         self.n = np.float64(n)
 
-        # Create the sigmoidal object
-        self.create_sigmoid()
+        self.span = self.ymax - self.ymin
+        self.inv_K = 1.0 / self.K
+
+        self._y = None
+
+    '''
+    Function:       y
+    Args:           None
+    Return:         Output array of the sampled response function
+    Description:    The curve is created on first access and cached until the
+                    parameters are updated.
+    '''
+    @property
+    def y(self):
+
+        if self._y is None:
+            self.create_sigmoid()
+        return self._y
     
     '''
     Function:       create_sigmoid
     Args:           None
     Return:         None
     Description:    Populates the output array self.y with values according to 
-                    the sigmoidal response function.  Currently not used.
+                    the sigmoidal response function.  Only used for plotting.
     '''
     def create_sigmoid(self):
-        self.y = self.ymin + ((self.ymax - self.ymin) / (1.0 + (self.x/self.K)**self.n))
+        self._y = self.ymin + (self.span / (1.0 + (self.x * self.inv_K)**self.n))
 
     '''
     Function:       f
@@ -59,7 +95,7 @@ class ResponseFunction():
                     the desired input x.
     '''
     def f(self, x):
-        return self.ymin + ((self.ymax - self.ymin) / (1.0 + (x/self.K)**self.n))
+        return self.ymin + (self.span / (1.0 + (x * self.inv_K)**self.n))
 
 if __name__ == '__main__':
     print("Response Function!")
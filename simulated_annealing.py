@@ -1,7 +1,501 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: simulated_annealing.py
+# Description:  Simulated annealing engine used to optimize the gates of a
+#               circuit, and the cooling schedules it can run with:
+#               - Step_Schedule: halve the temperature every 10% of the run
+#                 (the original schedule of the tool)
+#               - Exponential_Schedule: multiply by a constant every iteration
+#               - Adaptive_Schedule: steer the acceptance rate of worse moves
+#                 towards a target
+#               - Reheating_Schedule: any of the above, reheated when the best
+#                 score stops improving
+#               The engine knows nothing about circuits - the problem object
+#               passed to Annealing_Engine.run proposes, scores and undoes
+#               moves (see cello_sweep.Circuit_Annealing_Problem).  
+#               Lockstep_Engine runs many chains at once as arrays, on a 
+#               problem that proposes and scores whole populations of states
+#               (see cello_sweep.Circuit_Population_Problem).  At the bottom,
+#               the original toy annealer on np.sinc.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
 
 import numpy as np
 import random as rand
-import matplotlib.pyplot as plt
+import time
+
+# Result of evaluate(threshold) for a move known to be acceptable and to score
+# at most threshold (see Annealing_Engine)
+REJECTED = "REJECTED"
+
+'''
+Class:          Step_Schedule
+Description:    Multiplies the temperature by factor every time the number of
+                scored moves reaches a multiple of fraction * num_iterations.
+                With the defaults, halves it every 10% of the run.
+'''
+class Step_Schedule():
+
+    def __init__(self, fraction = 0.1, factor = 0.5):
+        self.fraction = fraction            # Fraction of the run per step
+        self.factor = factor                # Temperature change per step
+        self.num_iterations = 0
+
+    '''
+    Function:       start
+    Args:           initial_temperature: Temperature at the first iteration
+                    num_iterations: Maximum number of iterations of the run
+    Return:         Temperature of the first iteration
+    '''
+    def start(self, initial_temperature, num_iterations):
+
+        self.num_iterations = num_iterations
+        return initial_temperature
+
+    '''
+    Function:       update
+    Args:           temperature: Current temperature
+                    iteration: Index of the iteration about to start
+                    stats: Annealing_Result of the run so far
+    Return:         Temperature of the iteration
+    '''
+    def update(self, temperature, iteration, stats):
+
+        if iteration > 0 and stats.num_scored % (self.num_iterations * self.fraction) == 0:
+            temperature *= self.factor
+        return temperature
+
+'''
+Class:          Exponential_Schedule
+Description:    Multiplies the temperature by alpha at every iteration.
+'''
+class Exponential_Schedule():
+
+    def __init__(self, alpha = 0.995):
+        self.alpha = alpha                  # Temperature change per iteration
+
+    def start(self, initial_temperature, num_iterations):
+
+        return initial_temperature
+
+    def update(self, temperature, iteration, stats):
+
+        if iteration > 0:
+            temperature *= self.alpha
+        return temperature
+
+'''
+Class:          Adaptive_Schedule
+Description:    Every window iterations, compares the acceptance rate of the
+                worse-scoring moves over the window to target_rate, and cools
+                (multiplies by factor) if too many were accepted, or heats
+                (divides by factor) if too few were.
+'''
+class Adaptive_Schedule():
+
+    def __init__(self, target_rate = 0.3, window = 50, factor = 0.8):
+        self.target_rate = target_rate      # Target acceptance of worse moves
+        self.window = window                # Iterations between adjustments
+        self.factor = factor                # Temperature change per adjustment
+        self.num_uphill = 0                 # Counters at the last adjustment
+        self.num_uphill_accepted = 0
+
+    def start(self, initial_temperature, num_iterations):
+
+        self.num_uphill = 0
+        self.num_uphill_accepted = 0
+        return initial_temperature
+
+    def update(self, temperature, iteration, stats):
+
+        if iteration > 0 and iteration % self.window == 0:
+            num_uphill = stats.num_uphill - self.num_uphill
+            num_uphill_accepted = stats.num_uphill_accepted - self.num_uphill_accepted
+            if num_uphill > 0:
+                if num_uphill_accepted / num_uphill > self.target_rate:
+                    temperature *= self.factor
+                else:
+                    temperature /= self.factor
+            self.num_uphill = stats.num_uphill
+            self.num_uphill_accepted = stats.num_uphill_accepted
+        return temperature
+
+'''
+Class:          Reheating_Schedule
+Description:    Follows a base schedule, but resets the temperature to 
+                reheat_fraction of the initial temperature whenever the best
+                score has not improved for patience iterations.
+'''
+class Reheating_Schedule():
+
+    def __init__(self, base_schedule = None, patience = 200, reheat_fraction = 0.5):
+        self.base_schedule = base_schedule if base_schedule is not None else Exponential_Schedule()
+        self.patience = patience            # Iterations without improvement
+        self.reheat_fraction = reheat_fraction
+        self.initial_temperature = 0
+        self.last_reheat = 0                # Iteration of the last reheat
+
+    def start(self, initial_temperature, num_iterations):
+
+        self.initial_temperature = initial_temperature
+        self.last_reheat = 0
+        return self.base_schedule.start(initial_temperature, num_iterations)
+
+    def update(self, temperature, iteration, stats):
+
+        temperature = self.base_schedule.update(temperature, iteration, stats)
+        if iteration - max(stats.last_improvement, self.last_reheat) >= self.patience:
+            temperature = self.reheat_fraction * self.initial_temperature
+            self.last_reheat = iteration
+        return temperature
+
+# Cooling schedules by name, i.e. for command line arguments
+COOLING_SCHEDULES = {"step": Step_Schedule,
+                     "exponential": Exponential_Schedule,
+                     "adaptive": Adaptive_Schedule,
+                     "reheating": Reheating_Schedule}
+
+'''
+Function:       make_schedule
+Args:           name: Key of COOLING_SCHEDULES
+Return:         New schedule object with the default settings
+'''
+def make_schedule(name):
+
+    if name not in COOLING_SCHEDULES:
+        raise ValueError("Unknown cooling schedule %s, expected one of: %s" % (name, ", ".join(COOLING_SCHEDULES)))
+    return COOLING_SCHEDULES[name]()
+
+'''
+Class:          Stopping_Criteria
+Description:    Conditions that end an annealing run before num_iterations.
+                Each one is off when set to None:
+                - patience: iterations without a new best score
+                - min_relative_improvement: smallest relative gain of the best
+                  score over each improvement_window iterations
+                - time_budget: wall time of the run, in seconds
+                - max_evaluations: number of moves evaluated
+'''
+class Stopping_Criteria():
+
+    def __init__(self, patience = None, min_relative_improvement = None, improvement_window = 100, time_budget = None, max_evaluations = None):
+        self.patience = patience
+        self.min_relative_improvement = min_relative_improvement
+        self.improvement_window = improvement_window
+        self.time_budget = time_budget
+        self.max_evaluations = max_evaluations
+        self.window_best_score = 0          # Best score at the start of the
+                                            # current improvement window
+
+    '''
+    Function:       start
+    Args:           stats: Annealing_Result of the run
+    Return:         None
+    '''
+    def start(self, stats):
+
+        self.window_best_score = stats.best_score
+
+    '''
+    Function:       check
+    Args:           iteration: Index of the iteration about to start
+                    stats: Annealing_Result of the run so far
+                    elapsed_time: Wall time of the run so far, in seconds
+    Return:         Name of the criterion that fired, or None to continue
+    '''
+    def check(self, iteration, stats, elapsed_time):
+
+        if self.max_evaluations is not None and stats.num_evaluations >= self.max_evaluations:
+            return "max_evaluations"
+
+        if self.time_budget is not None and elapsed_time >= self.time_budget:
+            return "time_budget"
+
+        if self.patience is not None and iteration - stats.last_improvement >= self.patience:
+            return "patience"
+
+        if self.min_relative_improvement is not None and iteration > 0 and iteration % self.improvement_window == 0:
+            gain = stats.best_score - self.window_best_score
+            if gain < self.min_relative_improvement * abs(self.window_best_score):
+                return "relative_improvement"
+            self.window_best_score = stats.best_score
+
+        return None
+
+'''
+Class:          Annealing_Result
+Description:    Outcome and statistics of an annealing run.  Also passed to 
+                the schedule while the run is in progress.
+'''
+class Annealing_Result():
+
+    def __init__(self):
+        self.best_score = 0                 # Best score found, and the state
+        self.best_state = None              # it was found in
+        self.final_score = 0                # Score of the final state
+        self.final_temperature = 0
+        self.num_iterations = 0             # Iterations run
+        self.num_evaluations = 0            # Moves evaluated (objective calls)
+        self.num_scored = 0                 # Evaluated moves that were valid
+        self.num_accepted = 0               # Moves accepted
+        self.num_uphill = 0                 # Valid moves that scored worse,
+        self.num_uphill_accepted = 0        # and how many were accepted
+        self.last_improvement = 0           # Iteration of the last new best
+        self.elapsed_time = 0               # Wall time of the run (seconds)
+        self.evals_per_second = 0
+        self.stop_reason = None             # What ended the run - 
+                                            # "max_iterations", or the name of
+                                            # a Stopping_Criteria criterion
+
+    '''
+    Function:       print
+    Args:           None
+    Return:         None
+    Description:    Prints a one line summary of the run.
+    '''
+    def print(self):
+
+        print("ANNEALING: %d ITERATIONS, %d EVALUATIONS, %d ACCEPTED IN %lf s (%.1lf EVALS/S), STOPPED BY %s" % (self.num_iterations, self.num_evaluations, self.num_accepted, self.elapsed_time, self.evals_per_second, self.stop_reason))
+
+'''
+Class:          Annealing_Engine
+Description:    Maximizes the score of a problem by simulated annealing.  The
+                problem object provides:
+                - score():      score of the current state
+                - save():       remember the current state
+                - restore():    go back to the state from save()
+                - propose():    modify the current state, returns False if
+                                no valid move could be generated
+                - evaluate():   score of the modified state, or None if the
+                                state is not acceptable
+                - get_state():  copy of the current state, kept as the best
+                Each iteration proposes a move and evaluates it.  A better 
+                score is always accepted, a worse one with probability 
+                exp(-cost_diff / temperature), and a rejected move is undone.
+                The run ends after num_iterations, or earlier if one of the
+                stopping criteria fires.  The acceptance tests draw from rng
+                (a np.random.Generator), or from the NumPy global random 
+                state if it is None.
+                With early_reject, the random number of the acceptance test is
+                drawn before the evaluation instead.  A move is then accepted
+                if its score beats current_score + temperature * ln(u) - the
+                same test - and the threshold is passed to 
+                evaluate(threshold), which may stop evaluating a move once it
+                knows the state is acceptable and the score cannot beat it,
+                and return REJECTED.  Such a move counts as a scored, worse
+                and rejected move, as it would have without early_reject.
+'''
+class Annealing_Engine():
+
+    def __init__(self, schedule = None, num_iterations = 1000, stopping = None, early_reject = False, rng = None):
+        self.schedule = schedule if schedule is not None else Step_Schedule()
+        self.num_iterations = num_iterations
+        self.stopping = stopping if stopping is not None else Stopping_Criteria()
+        self.early_reject = early_reject
+        self.rng = rng if rng is not None else np.random
+
+    '''
+    Function:       run
+    Args:           problem: Problem object (see class description)
+                    initial_temperature: Temperature of the first iteration
+    Return:         Annealing_Result of the run
+    '''
+    def run(self, problem, initial_temperature):
+
+        stats = Annealing_Result()
+        start_time = time.perf_counter()
+
+        current_score = problem.score()
+        stats.best_score = current_score
+        stats.best_state = problem.get_state()
+
+        temperature = self.schedule.start(initial_temperature, self.num_iterations)
+        self.stopping.start(stats)
+        stats.stop_reason = "max_iterations"
+
+        for iteration in range(0, self.num_iterations):
+
+            stop_reason = self.stopping.check(iteration, stats, time.perf_counter() - start_time)
+            if stop_reason is not None:
+                stats.stop_reason = stop_reason
+                break
+
+            temperature = self.schedule.update(temperature, iteration, stats)
+            stats.num_iterations += 1
+
+            problem.save()
+
+            # No valid move could be generated - undo the partial changes
+            if not problem.propose():
+                problem.restore()
+                continue
+
+            # Threshold a worse score has to beat to be accepted
+            if self.early_reject:
+                accept_prob = self.rng.uniform(low = 0.0, high = 1.0)
+                threshold = current_score + temperature * np.log(accept_prob) if accept_prob > 0 else -np.inf
+                new_score = problem.evaluate(threshold)
+            else:
+                new_score = problem.evaluate()
+            stats.num_evaluations += 1
+
+            # Not an acceptable state - reject automatically
+            if new_score is None:
+                problem.restore()
+                continue
+            stats.num_scored += 1
+
+            # Known to score worse than the threshold - reject
+            if new_score is REJECTED:
+                stats.num_uphill += 1
+                accepted = False
+
+            # If the new score is an improvement, accept the move
+            elif new_score > current_score:
+                accepted = True
+
+            # Else accept with certain probability
+            elif self.early_reject:
+                stats.num_uphill += 1
+                accepted = new_score > threshold
+                if accepted:
+                    stats.num_uphill_accepted += 1
+
+            else:
+                stats.num_uphill += 1
+                cost_diff = current_score - new_score
+                accept_prob = self.rng.uniform(low = 0.0, high = 1.0)
+                accepted = np.exp(-1 * cost_diff / temperature) > accept_prob
+                if accepted:
+                    stats.num_uphill_accepted += 1
+
+            if accepted:
+                current_score = new_score
+                stats.num_accepted += 1
+                if current_score > stats.best_score:
+                    stats.best_score = current_score
+                    stats.best_state = problem.get_state()
+                    stats.last_improvement = iteration
+            else:
+                problem.restore()
+
+        stats.final_score = current_score
+        stats.final_temperature = temperature
+        stats.elapsed_time = time.perf_counter() - start_time
+        if stats.elapsed_time > 0:
+            stats.evals_per_second = stats.num_evaluations / stats.elapsed_time
+
+        return stats
+
+'''
+Class:          Lockstep_Engine
+Description:    Simulated annealing of num_chains independent chains, advanced
+                together as arrays.  The state of every chain is a row of one
+                array, and the problem object provides:
+                - score():      score of the starting state
+                - get_state():  copy of the starting state
+                - propose_population(states): modified copy of every state,
+                                and whether each one is a valid move
+                - evaluate_population(states): score of every state, and
+                                whether each one is acceptable
+                Each iteration runs the same steps as Annealing_Engine, for
+                all chains at once: one proposal, one scoring and one set of
+                Metropolis draws.  All chains share the temperature.  The
+                counts of the result are summed over the chains, but the
+                schedule sees the counts of an average chain, with one scored
+                move per iteration, so a step schedule steps every 10% of
+                the iterations.  As in Annealing_Engine, the Metropolis draws
+                come from rng, or from the NumPy global random state if it is
+                None.
+'''
+class Lockstep_Engine():
+
+    def __init__(self, schedule = None, num_iterations = 1000, num_chains = 256, stopping = None, rng = None):
+        self.schedule = schedule if schedule is not None else Step_Schedule()
+        self.num_iterations = num_iterations
+        self.num_chains = num_chains
+        self.stopping = stopping if stopping is not None else Stopping_Criteria()
+        self.rng = rng if rng is not None else np.random
+
+    '''
+    Function:       run
+    Args:           problem: Problem object (see class description)
+                    initial_temperature: Temperature of the first iteration
+    Return:         Annealing_Result of the run
+    '''
+    def run(self, problem, initial_temperature):
+
+        stats = Annealing_Result()
+        chain_stats = Annealing_Result()
+        start_time = time.perf_counter()
+
+        stats.best_score = problem.score()
+        stats.best_state = problem.get_state()
+        states = np.repeat(stats.best_state[np.newaxis], self.num_chains, axis = 0)
+        current_scores = np.full(self.num_chains, stats.best_score, dtype = np.float64)
+
+        temperature = self.schedule.start(initial_temperature, self.num_iterations)
+        self.stopping.start(stats)
+        stats.stop_reason = "max_iterations"
+
+        for iteration in range(0, self.num_iterations):
+
+            stop_reason = self.stopping.check(iteration, stats, time.perf_counter() - start_time)
+            if stop_reason is not None:
+                stats.stop_reason = stop_reason
+                break
+
+            chain_stats.num_scored = iteration
+            chain_stats.num_uphill = stats.num_uphill / self.num_chains
+            chain_stats.num_uphill_accepted = stats.num_uphill_accepted / self.num_chains
+            chain_stats.last_improvement = stats.last_improvement
+            temperature = self.schedule.update(temperature, iteration, chain_stats)
+            stats.num_iterations += self.num_chains
+
+            # Only the chains with a valid move are scored
+            candidates, valid = problem.propose_population(states)
+            chains = np.flatnonzero(valid)
+            new_scores, acceptable = problem.evaluate_population(candidates[chains])
+            stats.num_evaluations += len(chains)
+
+            # Not acceptable states are rejected automatically
+            chains = chains[acceptable]
+            new_scores = new_scores[acceptable]
+            stats.num_scored += len(chains)
+
+            # Better scores are always accepted, worse ones with probability
+            # exp(-cost_diff / temperature)
+            cost_diff = current_scores[chains] - new_scores
+            uphill = cost_diff >= 0
+            accept_prob = self.rng.uniform(low = 0.0, high = 1.0, size = len(chains))
+            accepted = ~uphill | (np.exp(-1 * np.maximum(cost_diff, 0) / temperature) > accept_prob)
+
+            stats.num_uphill += np.count_nonzero(uphill)
+            stats.num_uphill_accepted += np.count_nonzero(uphill & accepted)
+            stats.num_accepted += np.count_nonzero(accepted)
+
+            chains = chains[accepted]
+            states[chains] = candidates[chains]
+            current_scores[chains] = new_scores[accepted]
+
+            best_chain = np.argmax(current_scores)
+            if current_scores[best_chain] > stats.best_score:
+                stats.best_score = current_scores[best_chain]
+                stats.best_state = states[best_chain].copy()
+                stats.last_improvement = iteration
+
+        stats.final_score = np.max(current_scores)
+        stats.final_temperature = temperature
+        stats.elapsed_time = time.perf_counter() - start_time
+        if stats.elapsed_time > 0:
+            stats.evals_per_second = stats.num_evaluations / stats.elapsed_time
+
+        return stats
+
+# ----------------------------- TOY EXAMPLE ------------------------------------
 
 def f1(x):
     return (-1 * x**2) + 5
@@ -40,6 +534,8 @@ class Simulated_Annealer():
 
 if __name__ == '__main__':
 
+    import matplotlib.pyplot as plt
+
     x0 = np.random.uniform(low = -10, high = 10)
     annealer = Simulated_Annealer(np.sinc, 10000)
     annealer.run_algo(x0)
@@ -0,0 +1,120 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: conftest.py
+# Description:  Shared pytest fixtures.  make_circuit writes a random circuit 
+#               of NOT and NOR gates as a Cello netlist JSON and returns a
+#               Netlist_Parser for it, populated from matching input, gate and
+#               output records - so the tests need neither Cello nor a chassis.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from circuit_netlist_parser import Netlist_Parser
+from record import Input_Signal_Record, Output_Signal_Record, Repressor_Record
+
+'''
+Function:       write_netlist
+Args:           path: Where to write the netlist JSON
+                num_inputs: Number of primary inputs
+                num_gates: Number of NOT/NOR gates
+                seed: Seed of the random circuit
+Return:         List of the device names of the gates
+Description:    Each gate is driven by earlier nodes picked at random, and the
+                last gate drives the output.  The nodes are written shuffled,
+                as Cello does not list them in topological order either.
+'''
+def write_netlist(path, num_inputs, num_gates, seed):
+
+    rng = random.Random(seed)
+    nodes = []
+    edges = []
+
+    available = []
+    for i in range(0, num_inputs):
+        nodes.append({"name": "in%d" % i, "nodeType": "PRIMARY_INPUT", "deviceName": "Sensor%d" % i})
+        available.append("in%d" % i)
+
+    gate_names = []
+    for g in range(0, num_gates):
+        tag = "$%d" % (g + 100)
+        node_type = "NOT" if rng.random() < 0.3 else "NOR"
+        num_fanin = 1 if node_type == "NOT" else 2
+        nodes.append({"name": tag, "nodeType": node_type, "deviceName": "G%d_Repressor" % g})
+        for source in rng.sample(available, num_fanin):
+            edges.append({"name": "e", "src": source, "dst": tag})
+        available.append(tag)
+        gate_names.append("G%d_Repressor" % g)
+
+    nodes.append({"name": "out", "nodeType": "PRIMARY_OUTPUT", "deviceName": "YFP_reporter"})
+    edges.append({"name": "e", "src": available[-1], "dst": "out"})
+    rng.shuffle(nodes)
+
+    with open(path, "w") as netlist_file:
+        json.dump({"name": "test", "nodes": nodes, "edges": edges}, netlist_file)
+
+    return gate_names
+
+'''
+Function:       make_records
+Args:           num_inputs: Number of primary inputs
+                gate_names: Device names of the gates
+                seed: Seed of the random parameters
+Return:         Input, gate and output records, each a dictionary by name
+'''
+def make_records(num_inputs, gate_names, seed):
+
+    rng = random.Random(seed + 1)
+
+    input_records = {}
+    for i in range(0, num_inputs):
+        record = Input_Signal_Record()
+        record.name = "Sensor%d" % i
+        record.ymax = rng.uniform(1, 4)
+        record.ymin = rng.uniform(0.002, 0.05)
+        input_records[record.name] = record
+
+    gate_records = {}
+    for name in gate_names:
+        record = Repressor_Record()
+        record.name = name
+        record.ymax = rng.uniform(1, 4)
+        record.ymin = rng.uniform(0.005, 0.1)
+        record.K = rng.uniform(0.05, 0.5)
+        record.n = rng.uniform(1.5, 4)
+        gate_records[name] = record
+
+    output_record = Output_Signal_Record()
+    output_record.name = "YFP_reporter"
+    output_record.unit_conversion = 1.3
+
+    return input_records, gate_records, {output_record.name: output_record}
+
+@pytest.fixture
+def make_circuit(tmp_path):
+
+    def make(num_inputs = 3, num_gates = 6, seed = 0, backend = "numpy", cache_dir = None):
+
+        netlist_path = str(tmp_path / ("netlist_%d_%d_%d.json" % (num_inputs, num_gates, seed)))
+        gate_names = write_netlist(netlist_path, num_inputs, num_gates, seed)
+        input_records, gate_records, output_records = make_records(num_inputs, gate_names, seed)
+
+        parser = Netlist_Parser(netlist_path, backend = backend)
+        parser.parse_netlist(cache_dir = cache_dir)
+        parser.populate_input_values(input_records)
+        parser.populate_response_functions(gate_records)
+        parser.populate_output_converters(output_records)
+
+        return parser, gate_records
+
+    return make
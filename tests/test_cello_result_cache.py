@@ -0,0 +1,217 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_cello_result_cache.py
+# Description:  Checks that a Cello result stored in Cello_Result_Cache comes
+#               back unchanged, and what its key depends on, and that an
+#               annealing result stored in Annealing_Result_Cache is found
+#               again for the same design built from other devices.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import json
+import os
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from cello_result_cache import Cello_Result_Cache, Cached_Cello_Result, Annealing_Result_Cache
+from circuit_netlist_parser import Netlist_Parser
+from record import Repressor_Table
+from conftest import write_netlist, make_records
+
+INPUT_FILENAMES = ["and.v", "options.csv", "Eco1C1G1T1.UCF.json", "Eco1C1G1T1.input.json", "Eco1C1G1T1.output.json"]
+
+'''
+Function:       write_inputs
+Args:           in_dir: Folder to write the Cello input files to
+Return:         None
+'''
+def write_inputs(in_dir):
+
+    os.makedirs(in_dir, exist_ok = True)
+    for filename in INPUT_FILENAMES:
+        with open(in_dir + filename, "w") as input_file:
+            input_file.write("contents of " + filename)
+
+def test_store_and_load(tmp_path):
+
+    in_dir = str(tmp_path / "cello_in") + os.sep
+    write_inputs(in_dir)
+    result_cache = Cello_Result_Cache(str(tmp_path / "cello_cache"))
+    key = result_cache.get_key(in_dir, INPUT_FILENAMES, ["LacI_sensor", "TetR_sensor"])
+
+    netlist_path = str(tmp_path / "and_outputNetlist.json")
+    assert result_cache.load(key, netlist_path) is None
+
+    with open(netlist_path, "w") as netlist_file:
+        netlist_file.write('{"name": "and", "nodes": [], "edges": []}')
+    result_cache.store(key, Cached_Cello_Result(123.25, ["pTac", "A1_AmtR", "YFP_cassette"]), netlist_path)
+
+    # A hit writes the netlist back where Cello would have
+    loaded_path = str(tmp_path / "loaded_outputNetlist.json")
+    res = result_cache.load(key, loaded_path)
+    assert res.circuit_score == 123.25
+    assert res.part_names == ["pTac", "A1_AmtR", "YFP_cassette"]
+    with open(loaded_path) as loaded_file:
+        assert loaded_file.read() == '{"name": "and", "nodes": [], "edges": []}'
+
+    assert result_cache.hits == 1
+    assert result_cache.misses == 1
+
+def test_load_into_new_folder(tmp_path):
+
+    result_cache = Cello_Result_Cache(str(tmp_path / "cello_cache"))
+    netlist_path = str(tmp_path / "and_outputNetlist.json")
+    with open(netlist_path, "w") as netlist_file:
+        netlist_file.write('{"name": "and", "nodes": [], "edges": []}')
+    result_cache.store("key", Cached_Cello_Result(5.0, ["pTac"]), netlist_path)
+
+    # The scratch folder of the job does not exist yet
+    loaded_path = str(tmp_path / "job_3" / "and_outputNetlist.json")
+    assert result_cache.load("key", loaded_path).circuit_score == 5.0
+    assert os.path.isfile(loaded_path)
+
+    # A netlist that cannot be written is an error, not a miss
+    blocked_path = str(tmp_path / "and_outputNetlist.json" / "and_outputNetlist.json")
+    with pytest.raises(OSError):
+        result_cache.load("key", blocked_path)
+
+    assert result_cache.hits == 1
+    assert result_cache.misses == 0
+
+def test_key_depends_on_inputs(tmp_path):
+
+    in_dir = str(tmp_path / "cello_in") + os.sep
+    write_inputs(in_dir)
+    result_cache = Cello_Result_Cache(str(tmp_path / "cello_cache"))
+    key = result_cache.get_key(in_dir, INPUT_FILENAMES, ["LacI_sensor", "TetR_sensor"])
+
+    assert result_cache.get_key(in_dir, INPUT_FILENAMES, ["LacI_sensor", "TetR_sensor"]) == key
+    assert result_cache.get_key(in_dir, INPUT_FILENAMES, ["LacI_sensor", "AraC_sensor"]) != key
+
+    with open(in_dir + "Eco1C1G1T1.UCF.json", "a") as ucf_file:
+        ucf_file.write(" edited")
+    assert result_cache.get_key(in_dir, INPUT_FILENAMES, ["LacI_sensor", "TetR_sensor"]) != key
+
+def test_evicts_least_recently_used(tmp_path):
+
+    netlist_path = str(tmp_path / "outputNetlist.json")
+    with open(netlist_path, "w") as netlist_file:
+        netlist_file.write("x" * 1000)
+
+    # Room for two entries only
+    result_cache = Cello_Result_Cache(str(tmp_path / "cello_cache"), max_bytes = 2500)
+    for i, key in enumerate(["a", "b", "c"]):
+        result_cache.store(key, Cached_Cello_Result(float(i), []), netlist_path)
+        os.utime(result_cache.get_entry_path(key), (i, i))
+
+    assert sorted(os.listdir(result_cache.cache_dir)) == ["b.json", "c.json"]
+
+'''
+Function:       make_design
+Args:           netlist_path: Where to write the netlist JSON
+                prefix: Prefix of the device names and tags
+                input_scale: Factor applied to the high level of the inputs
+Return:         Netlist_Parser of the circuit of conftest.write_netlist 
+                (3 inputs, 6 gates), populated, and its gate records
+Description:    The same circuit and parameters for every prefix, with the 
+                devices and tags renamed and the nodes shuffled by prefix - as
+                two signal sets for which Cello picks the same design.
+'''
+def make_design(netlist_path, prefix, input_scale = 1.0):
+
+    gate_names = write_netlist(netlist_path, 3, 6, 0)
+    input_records, gate_records, output_records = make_records(3, gate_names, 0)
+
+    with open(netlist_path) as netlist_file:
+        netlist = json.load(netlist_file)
+    for node in netlist["nodes"]:
+        node["name"] = prefix + node["name"]
+        if node["nodeType"] != "PRIMARY_OUTPUT":
+            node["deviceName"] = prefix + node["deviceName"]
+    for edge in netlist["edges"]:
+        edge["src"] = prefix + edge["src"]
+        edge["dst"] = prefix + edge["dst"]
+    random.Random(prefix).shuffle(netlist["nodes"])
+    with open(netlist_path, "w") as netlist_file:
+        json.dump(netlist, netlist_file)
+
+    for records in [input_records, gate_records]:
+        for name in list(records):
+            records[prefix + name] = records.pop(name)
+    for record in input_records.values():
+        record.ymax *= input_scale
+
+    parser = Netlist_Parser(netlist_path)
+    parser.parse_netlist()
+    parser.populate_input_values(input_records)
+    parser.populate_response_functions(gate_records)
+    parser.populate_output_converters(output_records)
+
+    return parser, gate_records
+
+'''
+Function:       score_gates
+Args:           parser: Netlist_Parser of the design
+                best_gates: Gate records to score
+Return:         Score of the circuit with the gate records
+'''
+def score_gates(parser, best_gates):
+
+    parser.populate_response_functions(best_gates)
+    parser.run_circuit_logical()
+    parser.run_circuit_genetic_vectorized()
+    return parser.circuit_score
+
+def test_annealing_result_reused_across_sweeps(tmp_path):
+
+    settings = SimpleNamespace(num_iterations = 100, schedule = "step", replica_workers = 4)
+    cache_dir = str(tmp_path / "annealing_cache")
+
+    # First sweep: the design is annealed (here, the gates are scaled) and
+    # stored
+    first_sweep = Annealing_Result_Cache(cache_dir)
+    parser, gate_records = make_design(str(tmp_path / "first.json"), "A_")
+    key, gate_hashes = first_sweep.get_key(parser, settings)
+    assert first_sweep.load(key, parser, gate_hashes, gate_records) is None
+
+    gate_table = Repressor_Table([node.name for node in parser.gates])
+    gate_table.load_records(gate_records)
+    best_params = gate_table.params * np.random.default_rng(0).uniform(0.5, 2.0, gate_table.params.shape)
+    best_gates = gate_table.to_records(best_params)
+    best_score = score_gates(parser, best_gates)
+    first_sweep.store(key, parser, gate_hashes, best_score, best_gates)
+
+    # Second sweep, in a new store: the same design from other devices, and
+    # with the parameter only used by the worker processes changed
+    second_sweep = Annealing_Result_Cache(cache_dir)
+    other_parser, other_gate_records = make_design(str(tmp_path / "second.json"), "B_")
+    other_key, other_gate_hashes = second_sweep.get_key(other_parser, SimpleNamespace(num_iterations = 100, schedule = "step", replica_workers = 1))
+    assert other_key == key
+
+    loaded = second_sweep.load(other_key, other_parser, other_gate_hashes, other_gate_records)
+    assert second_sweep.hits == 1
+    assert loaded is not None
+    netlist_score, other_best_gates = loaded
+
+    # The best parameters went back to the matching gates
+    assert netlist_score == best_score
+    assert sorted(other_best_gates) == sorted(other_gate_records)
+    assert score_gates(other_parser, other_best_gates) == pytest.approx(best_score, rel = 1e-12)
+
+def test_annealing_key_depends_on_parameters(tmp_path):
+
+    settings = SimpleNamespace(num_iterations = 100, schedule = "step")
+    annealing_cache = Annealing_Result_Cache(str(tmp_path / "annealing_cache"))
+
+    parser, _ = make_design(str(tmp_path / "first.json"), "A_")
+    key, _ = annealing_cache.get_key(parser, settings)
+
+    other_parser, _ = make_design(str(tmp_path / "second.json"), "B_", input_scale = 1.5)
+    assert annealing_cache.get_key(other_parser, settings)[0] != key
+    assert annealing_cache.get_key(parser, SimpleNamespace(num_iterations = 200, schedule = "step"))[0] != key
@@ -0,0 +1,306 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_circuit_netlist_parser.py
+# Description:  Checks the fast simulators of Netlist_Parser against the 
+#               original row-by-row ones (run_circuit_logical, 
+#               run_circuit_genetic and calculate_score).
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+import circuit_netlist_parser
+from circuit_netlist_parser import Netlist_Parser, GENETIC_BACKENDS
+
+'''
+Function:       scalar_reference
+Args:           parser: Netlist_Parser, populated
+Return:         Truth table, genetic outputs (in input_combinations order) and
+                score of the row-by-row simulation
+'''
+def scalar_reference(parser):
+
+    parser.run_circuit_logical()
+    parser.run_circuit_genetic()
+    parser.calculate_score()
+
+    genetic_outputs = np.array([parser.genetic_truth_table[row][1] for row in parser.input_combinations])
+    return dict(parser.truth_table), genetic_outputs, parser.circuit_score
+
+@pytest.mark.parametrize("num_inputs, num_gates, seed", [(2, 4, 0), (3, 6, 1), (4, 10, 2), (5, 14, 3)])
+def test_vectorized_matches_scalar(make_circuit, num_inputs, num_gates, seed):
+
+    parser, _ = make_circuit(num_inputs, num_gates, seed)
+    _, genetic_outputs, circuit_score = scalar_reference(parser)
+
+    parser.run_circuit_genetic_vectorized()
+
+    np.testing.assert_allclose(parser.genetic_outputs, genetic_outputs, rtol = 1e-12)
+    assert parser.circuit_score == pytest.approx(circuit_score, rel = 1e-12)
+
+def test_genetic_truth_table_built_on_demand(make_circuit):
+
+    parser, _ = make_circuit(3, 6, 1)
+    scalar_reference(parser)
+    truth_table = dict(parser.genetic_truth_table)
+
+    # A vectorized run only scores, the table is rebuilt when asked for
+    parser.run_circuit_genetic_vectorized()
+    assert parser.genetic_truth_table is None
+
+    genetic_truth_table = parser.get_genetic_truth_table()
+    assert genetic_truth_table.keys() == truth_table.keys()
+    for row, (inputs_genetic, genetic_out, logic_out) in truth_table.items():
+        np.testing.assert_allclose(genetic_truth_table[row][0], inputs_genetic, rtol = 1e-12)
+        assert genetic_truth_table[row][1] == pytest.approx(genetic_out, rel = 1e-12)
+        assert genetic_truth_table[row][2] == logic_out
+
+@pytest.mark.parametrize("backend", GENETIC_BACKENDS)
+@pytest.mark.parametrize("num_inputs, num_gates, seed", [(2, 4, 0), (4, 10, 2), (6, 18, 5)])
+def test_backends_match_scalar(make_circuit, backend, num_inputs, num_gates, seed):
+
+    parser, _ = make_circuit(num_inputs, num_gates, seed, backend = backend)
+    _, genetic_outputs, circuit_score = scalar_reference(parser)
+
+    parser.run_circuit_genetic_vectorized()
+
+    np.testing.assert_allclose(parser.genetic_outputs, genetic_outputs, rtol = 1e-12)
+    assert parser.circuit_score == pytest.approx(circuit_score, rel = 1e-12)
+
+@pytest.mark.parametrize("backend", GENETIC_BACKENDS)
+def test_population_matches_single_runs(make_circuit, backend):
+
+    parser, gate_records = make_circuit(4, 10, 2, backend = backend)
+    parser.run_circuit_logical()
+    parser.run_circuit_genetic_vectorized()
+    circuit_score = parser.circuit_score
+
+    rng = np.random.default_rng(0)
+    base_params = parser.get_gate_parameters()
+    gate_params = base_params * rng.uniform(0.5, 2.0, (8,) + base_params.shape)
+    scores = parser.score_population(gate_params)
+    population_ON_MIN = parser.population_ON_MIN.copy()
+    population_OFF_MAX = parser.population_OFF_MAX.copy()
+
+    # The circuit itself is left as it was
+    assert parser.circuit_score == circuit_score
+
+    # Every candidate scores as it would on its own
+    for candidate, params in enumerate(gate_params):
+        for node, row in zip(parser.gates, params):
+            record = gate_records[node.name]
+            record.ymax, record.ymin, record.K, record.n = row
+        parser.populate_response_functions(gate_records)
+        parser.run_circuit_genetic_vectorized()
+
+        assert scores[candidate] == pytest.approx(parser.circuit_score, rel = 1e-12)
+        assert population_ON_MIN[candidate] == pytest.approx(parser.ON_MIN, rel = 1e-12)
+        assert population_OFF_MAX[candidate] == pytest.approx(parser.OFF_MAX, rel = 1e-12)
+
+def test_lowered_kernel_matches_numpy_fallback(make_circuit, monkeypatch):
+
+    parser, _ = make_circuit(5, 14, 3, backend = "numba")
+    parser.run_circuit_logical()
+
+    rng = np.random.default_rng(1)
+    base_params = parser.get_gate_parameters()
+    gate_params = base_params * rng.uniform(0.5, 2.0, (6,) + base_params.shape)
+    outputs, on_min, off_max = parser.evaluate_lowered_kernel(gate_params, parser.get_input_levels())
+
+    # Same results from the NumPy kernel run when Numba is not installed
+    monkeypatch.setattr(circuit_netlist_parser, "numba", None)
+    fallback_outputs, fallback_on_min, fallback_off_max = parser.evaluate_lowered_kernel(gate_params, parser.get_input_levels())
+
+    np.testing.assert_allclose(outputs, fallback_outputs, rtol = 1e-12)
+    np.testing.assert_allclose(on_min, fallback_on_min, rtol = 1e-12)
+    np.testing.assert_allclose(off_max, fallback_off_max, rtol = 1e-12)
+
+'''
+Function:       score_in_child
+Args:           parser: Netlist_Parser, inherited by a forked process
+Return:         None - the process exits with 0 once the population is scored
+'''
+def score_in_child(parser):
+
+    parser.score_population(parser.get_gate_parameters()[np.newaxis])
+
+def test_fork_after_lowered_kernel(make_circuit):
+
+    parser, _ = make_circuit(4, 10, 2, backend = "numba")
+    parser.run_circuit_logical()
+    parser.score_population(np.repeat(parser.get_gate_parameters()[np.newaxis], 4, axis = 0))
+
+    # A forked worker (as in a parallel sweep) can still run the kernel
+    process = multiprocessing.get_context("fork").Process(target = score_in_child, args = (parser,))
+    process.start()
+    process.join(60)
+    hung = process.is_alive()
+    if hung:
+        process.terminate()
+
+    assert not hung
+    assert process.exitcode == 0
+
+@pytest.mark.parametrize("backend", GENETIC_BACKENDS)
+def test_bounded_reject_is_sound(make_circuit, monkeypatch, backend):
+
+    # Probe every truth table, however small
+    monkeypatch.setattr(circuit_netlist_parser, "BOUNDED_MIN_ROWS", 1)
+    parser, _ = make_circuit(4, 10, 2, backend = backend)
+    parser.run_circuit_logical()
+    parser.run_circuit_genetic_vectorized()
+
+    rng = np.random.default_rng(4)
+    num_rejects = 0
+    for _ in range(0, 200):
+        state = parser.snapshot()
+        threshold = parser.circuit_score * rng.uniform(0.5, 1.5)
+        on_min_below = rng.choice([np.inf, parser.ON_MIN * rng.uniform(0.8, 1.2)])
+        off_max_above = rng.choice([-np.inf, parser.OFF_MAX * rng.uniform(0.8, 1.2)])
+        for node in parser.gates:
+            ymax, ymin, K, n = node.resfunc.ymax, node.resfunc.ymin, node.resfunc.K, node.resfunc.n
+            node.resfunc.update(ymax = ymax * rng.uniform(0.8, 1.25), ymin = ymin, K = K * rng.uniform(0.8, 1.25), n = n)
+
+        completed = parser.run_circuit_genetic_bounded(threshold, on_min_below, off_max_above)
+        bounded_score = parser.circuit_score
+        parser.run_circuit_genetic_vectorized()
+
+        # A rejected move would have failed the test with the full table, a
+        # completed one has the score of the full table
+        if completed:
+            assert bounded_score == parser.circuit_score
+        else:
+            num_rejects += 1
+            assert parser.circuit_score <= threshold
+            assert parser.ON_MIN < on_min_below and parser.OFF_MAX > off_max_above
+
+        # Keep the accepted moves, so the probed rows keep changing
+        if parser.circuit_score <= threshold:
+            parser.restore(state)
+
+    assert 0 < num_rejects < 200
+
+@pytest.mark.parametrize("num_changed", [1, 2])
+def test_fanout_cone_matches_full_run(make_circuit, num_changed):
+
+    parser, gate_records = make_circuit(4, 10, 2)
+    parser.run_circuit_logical()
+    parser.run_circuit_genetic_vectorized()
+
+    rng = np.random.default_rng(num_changed)
+    for _ in range(0, 10):
+        gate_names = list(rng.choice([node.name for node in parser.gates], size = num_changed, replace = False))
+        for name in gate_names:
+            gate_records[name].K *= rng.uniform(0.5, 2.0)
+            gate_records[name].n *= rng.uniform(0.8, 1.2)
+
+        parser.resimulate_gates(gate_records, gate_names)
+        genetic_outputs = parser.genetic_outputs
+        node_outputs = [node.func_out for node in parser.eval_order]
+        circuit_score = parser.circuit_score
+
+        parser.run_circuit_genetic_vectorized()
+
+        assert np.array_equal(genetic_outputs, parser.genetic_outputs)
+        assert all(np.array_equal(a, node.func_out) for a, node in zip(node_outputs, parser.eval_order))
+        assert circuit_score == parser.circuit_score
+
+@pytest.mark.parametrize("num_inputs, num_gates, seed", [(2, 3, 0), (3, 6, 1), (5, 14, 3), (9, 20, 4)])
+def test_bitsliced_matches_scalar(make_circuit, monkeypatch, num_inputs, num_gates, seed):
+
+    parser, _ = make_circuit(num_inputs, num_gates, seed)
+    parser.run_circuit_logical()
+    truth_table = dict(parser.truth_table)
+
+    # Start from an empty truth table cache, so the bit-sliced simulation runs
+    monkeypatch.setattr(circuit_netlist_parser, "_TRUTH_TABLE_CACHE", {})
+    parser, _ = make_circuit(num_inputs, num_gates, seed)
+    parser.run_circuit_logical_bitsliced()
+
+    assert parser.truth_table == truth_table
+
+def test_compiled_netlist_round_trip(make_circuit, tmp_path, monkeypatch):
+
+    cache_dir = str(tmp_path / "netlist_cache")
+
+    loaded_paths = []
+    load_compiled = Netlist_Parser.load_compiled
+    def spy_load_compiled(self, cache_path):
+        loaded_paths.append(cache_path)
+        load_compiled(self, cache_path)
+    monkeypatch.setattr(Netlist_Parser, "load_compiled", spy_load_compiled)
+
+    # The first parse compiles the JSON and writes the cache file
+    parser, _ = make_circuit(5, 14, 3, cache_dir = cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    assert loaded_paths == []
+    parser.run_circuit_genetic_vectorized()
+
+    # The second one is loaded from it, truth table included
+    cached_parser, _ = make_circuit(5, 14, 3, cache_dir = cache_dir)
+    assert loaded_paths == [os.path.join(cache_dir, os.listdir(cache_dir)[0])]
+    assert cached_parser.truth_table == parser.truth_table
+    assert [node.tag for node in cached_parser.eval_order] == [node.tag for node in parser.eval_order]
+
+    cached_parser.run_circuit_genetic_vectorized()
+
+    assert np.array_equal(cached_parser.genetic_outputs, parser.genetic_outputs)
+    assert cached_parser.circuit_score == parser.circuit_score
+
+def test_unreadable_compiled_netlist(make_circuit, tmp_path):
+
+    cache_dir = str(tmp_path / "netlist_cache")
+    parser, _ = make_circuit(4, 10, 2, cache_dir = cache_dir)
+    cache_path = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+
+    # A truncated file is parsed from the JSON again, and rewritten
+    with open(cache_path, "r+b") as cache_file:
+        cache_file.truncate(100)
+    reparsed_parser, _ = make_circuit(4, 10, 2, cache_dir = cache_dir)
+
+    assert [node.tag for node in reparsed_parser.node_list] == [node.tag for node in parser.node_list]
+    assert reparsed_parser.truth_table == parser.truth_table
+    assert os.path.getsize(cache_path) > 100
+
+def test_truth_table_memoized_by_structure(make_circuit, monkeypatch, tmp_path):
+
+    monkeypatch.setattr(circuit_netlist_parser, "_TRUTH_TABLE_CACHE", {})
+    parser, _ = make_circuit(4, 10, 2)
+    parser.run_circuit_logical_bitsliced()
+
+    # The same circuit with other node tags and device names shares the table
+    with open(parser.filepath) as netlist_file:
+        netlist = json.load(netlist_file)
+    for node in netlist["nodes"]:
+        node["name"] = "renamed_" + node["name"]
+        node["deviceName"] = "renamed_" + node["deviceName"]
+    for edge in netlist["edges"]:
+        edge["src"] = "renamed_" + edge["src"]
+        edge["dst"] = "renamed_" + edge["dst"]
+    renamed_path = str(tmp_path / "renamed.json")
+    with open(renamed_path, "w") as netlist_file:
+        json.dump(netlist, netlist_file)
+
+    renamed_parser = Netlist_Parser(renamed_path)
+    renamed_parser.parse_netlist()
+    assert renamed_parser.get_fingerprint() == parser.get_fingerprint()
+
+    renamed_parser.run_circuit_logical_bitsliced()
+    assert renamed_parser.logic_outputs is parser.logic_outputs
+
+    # A different circuit does not
+    other_parser, _ = make_circuit(4, 10, 3)
+    assert other_parser.get_fingerprint() != parser.get_fingerprint()
+
+    other_parser.run_circuit_logical_bitsliced()
+    truth_table = dict(other_parser.truth_table)
+    other_parser.run_circuit_logical()
+    assert other_parser.truth_table == truth_table
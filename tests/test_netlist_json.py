@@ -0,0 +1,99 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_netlist_json.py
+# Description:  Checks that _fix_input_json reads the invalid JSON Cello writes
+#               (tabs, trailing commas) without the YAML fallback changing what
+#               is read, and that text it cannot repair is still an error.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import pytest
+import yaml
+
+from circuit_netlist_parser import Netlist_Parser, _fix_input_json
+
+# Output netlist of and.v the way Cello writes it: tab indented, with trailing
+# commas in the lists and after the whole structure
+AND_NETLIST = """{
+\t"name": "and",
+\t"nodes": [
+\t\t{"name": "a", "nodeType": "PRIMARY_INPUT", "deviceName": "LacI_sensor",},
+\t\t{"name": "b", "nodeType": "PRIMARY_INPUT", "deviceName": "TetR_sensor"},
+\t\t{"name": "$1", "nodeType": "NOT", "deviceName": "A1_AmtR"},
+\t\t{"name": "$2", "nodeType": "NOT", "deviceName": "P1_PhlF"},
+\t\t{"name": "$3", "nodeType": "NOR", "deviceName": "S1_SrpR"},
+\t\t{"name": "y", "nodeType": "PRIMARY_OUTPUT", "deviceName": "YFP_reporter"},
+\t],
+\t"edges": [
+\t\t{"name": "e1", "src": "a", "dst": "$1"},
+\t\t{"name": "e2", "src": "b", "dst": "$2"},
+\t\t{"name": "e3", "src": "$1", "dst": "$3"},
+\t\t{"name": "e4", "src": "$2", "dst": "$3"},
+\t\t{"name": "e5", "src": "$3", "dst": "y"},
+\t],
+},
+"""
+
+'''
+Function:       read_text
+Args:           tmp_path: Folder to write the file to
+                text: Contents of the file
+                final_trailing_comma: Flag passed to _fix_input_json
+Return:         What _fix_input_json reads from the file
+'''
+def read_text(tmp_path, text, final_trailing_comma = True):
+
+    path = tmp_path / "netlist.json"
+    path.write_text(text)
+    return _fix_input_json(str(path), final_trailing_comma = final_trailing_comma)
+
+def test_reads_cello_netlist(tmp_path):
+
+    data = read_text(tmp_path, AND_NETLIST)
+
+    assert [node["name"] for node in data["nodes"]] == ["a", "b", "$1", "$2", "$3", "y"]
+    assert data["nodes"][0] == {"name": "a", "nodeType": "PRIMARY_INPUT", "deviceName": "LacI_sensor"}
+    assert len(data["edges"]) == 5
+
+def test_parses_cello_netlist(tmp_path):
+
+    path = tmp_path / "and_outputNetlist.json"
+    path.write_text(AND_NETLIST)
+
+    parser = Netlist_Parser(str(path))
+    parser.parse_netlist(cleanup = True)
+    parser.run_circuit_logical()
+
+    assert parser.truth_table == {(0, 0): 0, (0, 1): 0, (1, 0): 0, (1, 1): 1}
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2]}', {"a": [1, 2]}),
+    ('{"a": [1, 2]},', {"a": [1, 2]}),
+    ('{"a": [1, 2,],}', {"a": [1, 2]}),
+    ('{"a": [1, 2 ,\n ] ,\n}\n,\n', {"a": [1, 2]}),
+    ('{"a": "1, ]", "b": "x,}"}', {"a": "1, ]", "b": "x,}"}),
+    ('{"a": "quote \\", ]",}', {"a": 'quote ", ]'}),
+])
+def test_trailing_commas(tmp_path, text, expected):
+
+    assert read_text(tmp_path, text) == expected
+
+def test_keeps_text_without_final_comma(tmp_path):
+
+    # Only a comma really at the end is dropped, not the closing bracket
+    assert read_text(tmp_path, '{"a": [1, 2]}') == {"a": [1, 2]}
+    assert read_text(tmp_path, '{"a": [1, 2]}\n\n') == {"a": [1, 2]}
+
+def test_yaml_last_resort(tmp_path):
+
+    # Not JSON even without the commas, but valid YAML
+    assert read_text(tmp_path, "{name: and, nodes: [], edges: []}") == {"name": "and", "nodes": [], "edges": []}
+
+@pytest.mark.parametrize("text", ['{"nodes": [', '{"a": 1 "b": 2}'])
+def test_unrepairable_text(tmp_path, text):
+
+    with pytest.raises(yaml.YAMLError):
+        read_text(tmp_path, text)
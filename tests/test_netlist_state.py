@@ -0,0 +1,90 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_netlist_state.py
+# Description:  Checks that Netlist_Parser.restore undoes a move completely -
+#               parameters, outputs, truth table and score - whether the gates
+#               read a bound Repressor_Table or their own response functions.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from record import Repressor_Table
+
+'''
+Function:       get_state
+Args:           parser: Netlist_Parser
+Return:         Everything a rejected move has to leave unchanged, copied
+'''
+def get_state(parser):
+
+    return (parser.get_gate_parameters(), parser.genetic_outputs.copy(), dict(parser.get_genetic_truth_table()),
+            parser.circuit_score, parser.log_circuit_score, parser.ON_MIN, parser.OFF_MAX)
+
+'''
+Function:       assert_same_state
+Args:           state, expected: Results of get_state
+Return:         None
+'''
+def assert_same_state(state, expected):
+
+    assert np.array_equal(state[0], expected[0])
+    assert np.array_equal(state[1], expected[1])
+    assert str(state[2]) == str(expected[2])
+    assert state[3:] == expected[3:]
+
+@pytest.mark.parametrize("bind_table", [True, False])
+def test_restore_undoes_moves(make_circuit, bind_table):
+
+    parser, gate_records = make_circuit(4, 10, 2)
+    parser.run_circuit_logical()
+    if bind_table:
+        gate_table = Repressor_Table([node.name for node in parser.gates])
+        gate_table.load_records(gate_records)
+        parser.bind_parameter_table(gate_table)
+    parser.run_circuit_genetic_vectorized()
+
+    rng = np.random.default_rng(0)
+    state = None
+    for _ in range(0, 20):
+        expected = get_state(parser)
+        state = parser.snapshot(state)
+
+        # Move every gate, then reject the move
+        new_params = parser.get_gate_parameters() * rng.uniform(0.5, 2.0, (len(parser.gates), 4))
+        for node, gate_params in zip(parser.gates, new_params):
+            if bind_table:
+                node.params[:] = gate_params
+            else:
+                node.resfunc.update(ymax = gate_params[0], ymin = gate_params[1], K = gate_params[2], n = gate_params[3])
+        parser.run_circuit_genetic_vectorized()
+        assert parser.circuit_score != expected[3]
+
+        parser.restore(state)
+        assert_same_state(get_state(parser), expected)
+
+        # The restored node outputs are those of the restored parameters
+        parser.run_circuit_genetic_vectorized()
+        assert_same_state(get_state(parser), expected)
+
+def test_rebind_partial_table(make_circuit):
+
+    parser, gate_records = make_circuit(4, 10, 2)
+    gate_names = [node.name for node in parser.gates]
+    gate_table = Repressor_Table(gate_names)
+    gate_table.load_records(gate_records)
+    parser.bind_parameter_table(gate_table)
+
+    # A table missing a gate (and in another order) replaces the first one
+    partial_table = Repressor_Table(gate_names[:0:-1])
+    partial_table.load_records(gate_records)
+    partial_table.params *= 2.0
+    parser.bind_parameter_table(partial_table)
+
+    expected = np.array([node.params if node.params is not None else [node.resfunc.ymax, node.resfunc.ymin, node.resfunc.K, node.resfunc.n] for node in parser.gates])
+    assert np.array_equal(parser.get_gate_parameters(), expected)
+    assert np.array_equal(parser.get_gate_parameters()[1:], gate_table.params[1:] * 2.0)
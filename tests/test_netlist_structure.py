@@ -0,0 +1,69 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_netlist_structure.py
+# Description:  Checks the node index and the CSR fan-in/fan-out arrays built
+#               by parse_netlist, and the netlists it refuses.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import json
+
+import pytest
+
+from circuit_netlist_parser import Netlist_Parser, Malformed_Netlist_Error
+
+'''
+Function:       parse_nodes_and_edges
+Args:           tmp_path: Folder to write the netlist to
+                nodes: List of (tag, type) pairs
+                edges: List of (source tag, destination tag) pairs
+Return:         Netlist_Parser of the netlist
+'''
+def parse_nodes_and_edges(tmp_path, nodes, edges):
+
+    netlist = {"name": "test",
+               "nodes": [{"name": tag, "nodeType": node_type, "deviceName": "device_" + tag} for tag, node_type in nodes],
+               "edges": [{"name": "e%d" % i, "src": src, "dst": dst} for i, (src, dst) in enumerate(edges)]}
+    path = tmp_path / "netlist.json"
+    path.write_text(json.dumps(netlist))
+
+    parser = Netlist_Parser(str(path))
+    parser.parse_netlist()
+    return parser
+
+def test_csr_arrays_match_node_lists(make_circuit):
+
+    parser, _ = make_circuit(5, 14, 3)
+
+    for i, node in enumerate(parser.node_list):
+        assert node.index == i
+        assert parser.get_node(node.tag) is node
+        assert list(parser.fanin_idx[parser.fanin_ptr[i]:parser.fanin_ptr[i + 1]]) == [prev_node.index for prev_node in node.prev_nodes]
+        assert list(parser.fanout_idx[parser.fanout_ptr[i]:parser.fanout_ptr[i + 1]]) == [next_node.index for next_node in node.next_nodes]
+
+    assert parser.get_node("not_a_tag") is None
+
+def test_fanout_keeps_edge_order(tmp_path):
+
+    # a drives both gates, in the order of the edges
+    parser = parse_nodes_and_edges(tmp_path,
+                                   [("y", "PRIMARY_OUTPUT"), ("$2", "NOR"), ("$1", "NOT"), ("a", "PRIMARY_INPUT")],
+                                   [("a", "$2"), ("a", "$1"), ("$1", "$2"), ("$2", "y")])
+
+    a = parser.get_node("a")
+    assert [node.tag for node in a.next_nodes] == ["$2", "$1"]
+    assert list(parser.fanout_idx[parser.fanout_ptr[a.index]:parser.fanout_ptr[a.index + 1]]) == [parser.get_node("$2").index, parser.get_node("$1").index]
+    assert [node.tag for node in parser.get_node("$2").prev_nodes] == ["a", "$1"]
+
+def test_duplicate_tag(tmp_path):
+
+    with pytest.raises(Malformed_Netlist_Error, match = "more than once"):
+        parse_nodes_and_edges(tmp_path, [("a", "PRIMARY_INPUT"), ("a", "PRIMARY_INPUT"), ("y", "PRIMARY_OUTPUT")], [("a", "y")])
+
+def test_edge_to_missing_node(tmp_path):
+
+    with pytest.raises(Malformed_Netlist_Error, match = "not in the netlist"):
+        parse_nodes_and_edges(tmp_path, [("a", "PRIMARY_INPUT"), ("y", "PRIMARY_OUTPUT")], [("a", "$9"), ("a", "y")])
@@ -0,0 +1,97 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_parallel_tempering.py
+# Description:  Checks Parallel_Tempering on a toy problem with two optima: a
+#               walk over the integers scored by the higher of two parabolas,
+#               one peaking at x = -10 (score 0) and one at x = 10 (score 50).
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from parallel_tempering import Parallel_Tempering
+
+'''
+Class:          Two_Peak_Problem
+Description:    Toy problem object for Parallel_Tempering - the state is a
+                one element array holding x.  Built from its constructor 
+                arguments in the worker processes, and moves with its own
+                random number generator.
+'''
+class Two_Peak_Problem():
+
+    def __init__(self, x = 0):
+        self.state = np.array([x])
+        self.saved_state = self.state.copy()
+        self.rng = np.random.default_rng()
+
+    def score(self):
+        x = self.state[0]
+        return max(-(x + 10) ** 2, 50 - (x - 10) ** 2)
+
+    def save(self):
+        self.saved_state = self.state.copy()
+
+    def restore(self):
+        self.state = self.saved_state.copy()
+
+    def propose(self):
+        self.state = self.state + self.rng.choice([-1, 1])
+        return True
+
+    def evaluate(self):
+        return self.score()
+
+    def get_state(self):
+        return self.state.copy()
+
+    def set_state(self, state):
+        self.state = state.copy()
+
+    def seed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+def test_temperatures():
+
+    tempering = Parallel_Tempering(num_replicas = 4, temperature_ratio = 0.001)
+    temperatures = tempering.get_temperatures(10.0)
+
+    assert temperatures[0] == 10.0
+    assert temperatures[-1] == pytest.approx(0.01)
+    assert np.allclose(temperatures[1:] / temperatures[:-1], 0.1)
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_tempering_run(num_workers):
+
+    np.random.seed(0)
+    problem = Two_Peak_Problem(x = -10)
+    tempering = Parallel_Tempering(num_replicas = 4, num_iterations = 2000, exchange_interval = 50, temperature_ratio = 0.01, num_workers = num_workers)
+    stats = tempering.run(problem, 100.0, problem_args = (-10,))
+
+    # The hot replicas cross over to the higher peak, and hand it down
+    assert stats.best_score == 50
+    assert stats.best_state[0] == 10
+    assert stats.final_score > 0
+
+    assert stats.num_iterations == 4 * 2000
+    assert stats.num_evaluations == stats.num_scored == 4 * 2000
+    assert stats.num_uphill_accepted <= stats.num_uphill
+    assert stats.num_exchanges_accepted <= stats.num_exchanges == 40 * 3 // 2
+
+def test_workers_do_not_change_the_run():
+
+    results = []
+    for num_workers in [1, 2]:
+        np.random.seed(3)
+        problem = Two_Peak_Problem(x = -10)
+        tempering = Parallel_Tempering(num_replicas = 4, num_iterations = 500, exchange_interval = 50, temperature_ratio = 0.01, num_workers = num_workers)
+        stats = tempering.run(problem, 100.0, problem_args = (-10,))
+        results.append((stats.best_score, stats.final_score, stats.num_accepted, stats.num_exchanges_accepted, np.random.randint(0, 2**31 - 1)))
+
+    # The same seeds reach the replicas whichever process runs them, and the
+    # global random state is left the same
+    assert results[0] == results[1]
@@ -0,0 +1,97 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_record.py
+# Description:  Checks that the moves of Repressor_Proposal_Generator never 
+#               leave the repressor parameter bounds.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from record import Repressor_Proposal_Generator, PROPOSAL_MODES, YMAX_UPPER_BOUND, YMIN_LOWER_BOUND, K_LOWER_BOUND, K_UPPER_BOUND, n_UPPER_BOUND
+
+'''
+Function:       inside_bounds
+Args:           params: Array of [ymax, ymin, K, n] rows
+Return:         Boolean array of whether each row is inside the bounds
+'''
+def inside_bounds(params):
+
+    return (params[:, 0] <= YMAX_UPPER_BOUND) & (params[:, 1] >= YMIN_LOWER_BOUND) & \
+           (params[:, 2] >= K_LOWER_BOUND) & (params[:, 2] <= K_UPPER_BOUND) & (params[:, 3] <= n_UPPER_BOUND)
+
+'''
+Function:       make_params
+Args:           num_rows: Number of [ymax, ymin, K, n] rows
+                seed: Seed of the random rows
+Return:         Array of rows inside the bounds - half of them right at a bound
+'''
+def make_params(num_rows, seed):
+
+    rng = np.random.default_rng(seed)
+    params = np.column_stack([rng.uniform(1, 4, num_rows), rng.uniform(0.005, 0.1, num_rows),
+                              rng.uniform(0.05, 0.5, num_rows), rng.uniform(1.5, 4, num_rows)])
+
+    edges = [YMAX_UPPER_BOUND, YMIN_LOWER_BOUND, K_LOWER_BOUND, K_UPPER_BOUND, n_UPPER_BOUND]
+    columns = [0, 1, 2, 2, 3]
+    for row in range(0, num_rows // 2):
+        params[row, columns[row % 5]] = edges[row % 5]
+
+    return params
+
+@pytest.mark.parametrize("mode", PROPOSAL_MODES)
+def test_proposals_stay_inside_bounds(mode):
+
+    params = make_params(200, seed = 0)
+    assert np.all(inside_bounds(params))
+
+    proposals = Repressor_Proposal_Generator(mode = mode, seed = 1)
+    for _ in range(0, 200):
+        new_params, valid_state_generated = proposals.propose(params)
+
+        assert np.any(valid_state_generated)
+        assert np.all(inside_bounds(new_params))
+        assert np.array_equal(new_params[~valid_state_generated], params[~valid_state_generated])
+
+        params = new_params
+
+@pytest.mark.parametrize("mode", PROPOSAL_MODES)
+def test_proposals_repeat_from_seed(mode):
+
+    params = make_params(20, seed = 2)
+
+    first = Repressor_Proposal_Generator(mode = mode, seed = 3)
+    second = Repressor_Proposal_Generator(mode = mode, seed = 4)
+    second.propose(params)
+    second.seed(3)
+
+    for _ in range(0, 5):
+        first_params, first_valid = first.propose(params)
+        second_params, second_valid = second.propose(params)
+        assert np.array_equal(first_params, second_params)
+        assert np.array_equal(first_valid, second_valid)
+        params = first_params
+
+def test_truncated_moves_match_retry_moves():
+
+    # Many rows, half of them on a bound, where the retries matter most
+    params = make_params(40000, seed = 5)
+
+    moves = {}
+    for mode in PROPOSAL_MODES:
+        new_params, valid_state_generated = Repressor_Proposal_Generator(mode = mode, seed = 6).propose(params)
+        moves[mode] = (new_params != params)[valid_state_generated], np.log(new_params / params)[valid_state_generated]
+
+    retry_changed, retry_log_ratios = moves["retry"]
+    truncated_changed, truncated_log_ratios = moves["truncated"]
+
+    # How often each column changes, and by how much on average, agree to
+    # within a few standard errors
+    num_rows = len(retry_changed)
+    frequency = retry_changed.mean(axis = 0)
+    assert np.all(np.abs(truncated_changed.mean(axis = 0) - frequency) < 5 * np.sqrt(2 * frequency * (1 - frequency) / num_rows))
+    assert np.all(np.abs(truncated_log_ratios.mean(axis = 0) - retry_log_ratios.mean(axis = 0)) < 5 * np.sqrt(2 / num_rows) * retry_log_ratios.std(axis = 0))
@@ -0,0 +1,146 @@
+# ------------------------------------------------------------------------------
+# Project: Genetic Circuit Optimization with Cello and Simulated Annealing
+# EC/BE552 Computational Synthetic Biology for Engineers
+# Homework 1
+#
+# Module: test_simulated_annealing.py
+# Description:  Checks Annealing_Engine, Lockstep_Engine and the cooling 
+#               schedules on a toy problem: a walk over the integers, scored 
+#               by -(x - 7)^2, where negative x is not an acceptable state.
+# Status:   Operational.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from simulated_annealing import Annealing_Engine, Lockstep_Engine, Annealing_Result, Step_Schedule, Exponential_Schedule, make_schedule, COOLING_SCHEDULES
+
+'''
+Class:          Walk_Problem
+Description:    Toy problem object for Annealing_Engine.  Moves x by +-1, or
+                by nothing (not a valid move).  Records every state it was
+                asked to score.
+'''
+class Walk_Problem():
+
+    def __init__(self, x = 0, seed = 0):
+        self.x = x
+        self.saved_x = x
+        self.rng = np.random.default_rng(seed)
+        self.scored_states = []
+
+    def score(self):
+        return -(self.x - 7) ** 2
+
+    def save(self):
+        self.saved_x = self.x
+
+    def restore(self):
+        self.x = self.saved_x
+
+    def propose(self):
+        step = self.rng.integers(-1, 2)
+        self.x += step
+        return step != 0
+
+    def evaluate(self):
+        if self.x < 0:
+            return None
+        self.scored_states.append(self.x)
+        return self.score()
+
+    def get_state(self):
+        return self.x
+
+'''
+Class:          Walk_Population_Problem
+Description:    Walk_Problem for Lockstep_Engine - every chain moves by +-1,
+                or by nothing (not a valid move).
+'''
+class Walk_Population_Problem():
+
+    def __init__(self, x = 0, seed = 0):
+        self.x = x
+        self.rng = np.random.default_rng(seed)
+
+    def score(self):
+        return -(self.x - 7) ** 2
+
+    def get_state(self):
+        return np.array([self.x])
+
+    def propose_population(self, states):
+        steps = self.rng.integers(-1, 2, size = states.shape)
+        return states + steps, steps[:, 0] != 0
+
+    def evaluate_population(self, states):
+        return -(states[:, 0] - 7.0) ** 2, states[:, 0] >= 0
+
+@pytest.mark.parametrize("schedule", sorted(COOLING_SCHEDULES))
+def test_engine_bookkeeping(schedule):
+
+    np.random.seed(0)
+    problem = Walk_Problem()
+    stats = Annealing_Engine(make_schedule(schedule), num_iterations = 500).run(problem, initial_temperature = 5.0)
+
+    # The problem is left in the final state, and the best one was visited
+    # (or is the initial state, x = 0)
+    assert problem.score() == stats.final_score
+    assert stats.best_score == max([-49] + [-(x - 7) ** 2 for x in problem.scored_states])
+    assert -(stats.best_state - 7) ** 2 == stats.best_score
+
+    assert stats.num_iterations == 500
+    assert stats.num_scored == len(problem.scored_states)
+    assert stats.num_scored <= stats.num_evaluations <= stats.num_iterations
+    assert stats.num_uphill_accepted <= stats.num_uphill <= stats.num_scored
+    assert stats.num_accepted <= stats.num_scored
+
+def test_engine_finds_optimum():
+
+    np.random.seed(1)
+    stats = Annealing_Engine(Step_Schedule(), num_iterations = 2000).run(Walk_Problem(x = 30), initial_temperature = 10.0)
+
+    assert stats.best_score == 0
+    assert stats.best_state == 7
+
+def test_cold_engine_never_accepts_worse():
+
+    np.random.seed(2)
+    stats = Annealing_Engine(Exponential_Schedule(), num_iterations = 300).run(Walk_Problem(x = 20), initial_temperature = 1e-12)
+
+    assert stats.num_uphill > 0
+    assert stats.num_uphill_accepted == 0
+
+def test_step_schedule_halves_every_tenth():
+
+    schedule = Step_Schedule()
+    stats = Annealing_Result()
+    temperature = schedule.start(8.0, 100)
+
+    temperatures = []
+    for iteration in range(0, 100):
+        temperature = schedule.update(temperature, iteration, stats)
+        temperatures.append(temperature)
+        stats.num_scored += 1
+
+    assert temperatures[0] == temperatures[9] == 8.0
+    assert temperatures[10] == 4.0
+    assert temperatures[99] == 8.0 * 0.5 ** 9
+
+def test_unknown_schedule():
+
+    with pytest.raises(ValueError):
+        make_schedule("linear")
+
+def test_lockstep_engine_draws_from_rng():
+
+    results = []
+    for global_seed in [0, 1]:
+        np.random.seed(global_seed)
+        engine = Lockstep_Engine(Step_Schedule(), num_iterations = 300, num_chains = 8, rng = np.random.default_rng(3))
+        stats = engine.run(Walk_Population_Problem(x = 20), initial_temperature = 5.0)
+        results.append((stats.best_score, stats.num_accepted, stats.num_uphill_accepted, stats.final_score))
+
+    # The run depends on rng only, not on the global random state
+    assert results[0] == results[1]
+    assert results[0][2] > 0